@@ -0,0 +1,176 @@
+# audit_queries.py
+"""
+Query plan auditor.
+
+Seeds a scratch MongoDB database with synthetic catalog, registry, analytics,
+job and staging data, creates the registered indexes and runs explain() for
+every query shape in bot/parts/query_shapes.py. Exits with status 1 if any plan
+is a collection scan or examines too many documents per result, so it can gate CI:
+
+    python audit_queries.py
+    python audit_queries.py --mongo-url mongodb://localhost:27017 --docs 5000 --max-ratio 5
+
+The scratch database is dropped afterwards unless --keep is given.
+"""
+
+import sys
+import uuid
+import random
+import argparse
+import logging
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from pymongo import MongoClient
+
+logging.basicConfig(
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    level=logging.INFO,
+    handlers=[logging.StreamHandler(sys.stdout)]
+)
+logger = logging.getLogger(__name__)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Explain every registered query shape and fail on bad plans.")
+    parser.add_argument("--mongo-url", default="mongodb://localhost:27017",
+                        help="MongoDB server to seed (use a local or throwaway instance).")
+    parser.add_argument("--database", default="kannada_query_audit", help="Scratch database name.")
+    parser.add_argument("--docs", type=int, default=2000, help="Documents to seed per collection.")
+    parser.add_argument("--max-ratio", type=float, default=10.0,
+                        help="Maximum documents examined per document returned.")
+    parser.add_argument("--shape", action="append", help="Only audit the named shape (repeatable).")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch database afterwards.")
+    return parser.parse_args()
+
+
+def seed(database, count: int) -> dict:
+    """Fills the scratch database with realistic data and returns sample values for the shapes."""
+    now = datetime.utcnow()
+    rng = random.Random(42)
+    sample = {"now": now}
+
+    registry, stats = [], []
+    for collection_name in ("movies", "series", "shows"):
+        docs = []
+        for i in range(count):
+            media = [{
+                "msg_id": str(uuid.uuid4()),
+                "dedup_key": f"fuid:{collection_name}-{i}-{q}",
+                "quality": q,
+                "season": 1 + i % 3,
+                "episode": 1 + i % 20,
+            } for q in ("480P", "720P", "1080P")]
+            docs.append({
+                "_id": ObjectId(),
+                "name": f"{collection_name.title()} Title {i}",
+                "year": 1990 + i % 35,
+                "media_files": media,
+                "created_at": now - timedelta(minutes=i),
+                "updated_at": now,
+            })
+        database[collection_name].insert_many(docs)
+        for doc in docs:
+            registry.extend({
+                "dedup_key": m["dedup_key"],
+                "msg_id": m["msg_id"],
+                "channel_id": -1001000000000 - rng.randint(0, 3),
+                "original_msg_id": rng.randint(1, 100000),
+            } for m in doc["media_files"])
+            stats.append({
+                "_id": str(doc["_id"]),
+                "collection": collection_name,
+                "score": rng.random() * 100,
+                "score_at": now - timedelta(hours=rng.randint(0, 24 * 60)),
+            })
+        if collection_name == "movies":
+            sample.update(
+                content_id=docs[count // 2]["_id"],
+                content_ids=[doc["_id"] for doc in docs[:20]],
+                msg_id=docs[count // 2]["media_files"][1]["msg_id"],
+                msg_ids=[m["msg_id"] for doc in docs[:7] for m in doc["media_files"]],
+                name=docs[count // 2]["name"],
+                year=docs[count // 2]["year"],
+                dedup_keys=[m["dedup_key"] for doc in docs[:7] for m in doc["media_files"]],
+                stats_id=str(docs[0]["_id"]),
+            )
+    database.media_registry.insert_many(registry)
+    database.content_stats.insert_many(stats)
+
+    # Mostly finished jobs, a few waiting or scheduled for later, a handful with dead workers
+    jobs = []
+    for i in range(count):
+        roll = rng.random()
+        status = "done" if roll < 0.9 else "pending" if roll < 0.98 else "running"
+        jobs.append({
+            "_id": ObjectId(),
+            "kind": rng.choice(["deliver_media", "finalize_item", "finalize_series"]),
+            "status": status,
+            "priority": rng.randint(0, 2),
+            "run_at": now + timedelta(seconds=rng.randint(-3600, 3600)),
+            "lease_until": now - timedelta(seconds=30) if status == "running" else None,
+            "worker": "audit:1" if status != "pending" else None,
+        })
+    database.jobs.insert_many(jobs)
+    sample.update(job_id=jobs[0]["_id"], worker="audit:1")
+
+    genres, actors = ["action", "drama", "comedy", "thriller"], ["yash", "sudeep", "darshan", "rakshit shetty"]
+    database.subscribers.insert_many([{
+        "_id": 100000 + i,
+        "all": rng.random() < 0.3,
+        "genres": rng.sample(genres, rng.randint(0, 2)),
+        "actors": rng.sample(actors, rng.randint(0, 1)),
+    } for i in range(count)])
+    sample["subscriber_after"] = 100000 + count // 2
+    database.broadcasts.insert_many([{"status": "done" if i else "running"} for i in range(20)])
+
+    database.catalog_stats.insert_one({"_id": "catalog", "computed_at": now})
+    database.schema_migrations.insert_one({"_id": 2, "status": "done"})
+
+    database.import_checkpoints.insert_many([{"_id": uuid.uuid4().hex, "last_row": i} for i in range(50)])
+    sample["import_id"] = database.import_checkpoints.find_one()["_id"]
+
+    ingest_ids = [uuid.uuid4().hex for _ in range(5)]
+    for ingest_id in ingest_ids:
+        database.ingest_staging.insert_many([
+            {"ingest_id": ingest_id, "dedup_key": f"fuid:{ingest_id}-{i}", "season": 1 + i // 100, "episode": i % 100}
+            for i in range(count // 5)
+        ])
+    sample["ingest_id"] = ingest_ids[2]
+    sample["staging_after"] = database.ingest_staging.find_one({"ingest_id": ingest_ids[2]})["_id"]
+    return sample
+
+
+def main():
+    args = parse_args()
+    from bot.parts.query_shapes import ensure_query_indexes, audit_all
+
+    client = MongoClient(args.mongo_url, serverSelectionTimeoutMS=5000)
+    client.drop_database(args.database)
+    database = client[args.database]
+    try:
+        logger.info("Seeding %s with %s documents per collection...", args.database, args.docs)
+        sample = seed(database, args.docs)
+        created = ensure_query_indexes(database)
+        logger.info("Created %s indexes from the query shape registry.", len(created))
+
+        reports = audit_all(database, sample, args.max_ratio, args.shape)
+        failures = 0
+        for report in reports:
+            status = "FAIL" if report["problems"] else "ok"
+            failures += bool(report["problems"])
+            print(
+                f"{status:4} {report['shape']:24} {report['collection']:18} "
+                f"examined={report['examined']:<6} returned={report['returned']:<6} "
+                f"{'>'.join(report['stages'])}"
+                + (f"  <- {', '.join(report['problems'])}" if report["problems"] else "")
+            )
+        print(f"\n{len(reports)} plans checked, {failures} failed.")
+    finally:
+        if not args.keep:
+            client.drop_database(args.database)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
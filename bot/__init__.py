@@ -8,7 +8,6 @@ should be treated as a package. This allows files from outside the
 directory (like main.py) to import modules from inside it (like handlers.py).
 """
 
-# This line imports the handlers.py file, making it accessible to main.py.
-# When handlers.py is imported, it in turn imports all the bot's command
-# functions from the 'parts' directory, registering them with the client.
-from . import handlers
+# The handlers are deliberately NOT imported here. Importing them pulls in
+# pymongo and every part module, so main.py imports `bot.handlers` itself
+# (timed as a startup phase) and light modules like `bot.startup` stay cheap.
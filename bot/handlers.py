@@ -12,21 +12,36 @@ logger = logging.getLogger(__name__)
 # If a file doesn't exist yet, you can comment out the import.
 
 try:
+    # Rate limiting middleware (runs before every user-facing handler)
+    from .parts.rate_limiter import *
+
     # Part 1 & 3: Core functions, User Search System & File Serving
     from .parts.core_bot_functionality import *
     from .parts.user_features import *
+    from .parts.season_packs import *
+    from .parts.inline_search import *
+    from .parts.analytics import *
+    from .parts.subscriptions import *
 
     # Part 2: Admin Upload System & Details Collection
+    from .parts.conversation import *
     from .parts.admin_upload import *
     from .parts.details_collection import *
+    from .parts.series_ingest import *
+    from .parts.link_verifier import *
+    from .parts.catalog_stats import *
+    from .parts.bulk_import import *
 
     # Part 4: Blog Integration
     from .parts.blogger_integration import *
 
+    # Background jobs (run by worker.py when JOB_QUEUE_ENABLED is set)
+    from .parts.job_queue import *
+
     logger.info("Successfully imported all feature modules from bot/parts/.")
 
 except ImportError as e:
-    logger.error(f"FATAL: Failed to import a module from bot/parts/. Error: {e}")
+    logger.error("FATAL: Failed to import a module from bot/parts/. Error: %s", e)
     logger.error("Please ensure all part files (core_bot_functionality.py, admin_upload.py, etc.) exist in the bot/parts/ directory.")
 
 
@@ -42,7 +57,7 @@ def initialize_bot_components():
         logger.info("🚀 All bot components initialized successfully!")
         return True
     except Exception as e:
-        logger.error(f"❌ Error initializing bot components: {e}")
+        logger.error("❌ Error initializing bot components: %s", e)
         return False
 
 # Auto-initialize when imported
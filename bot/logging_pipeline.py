@@ -0,0 +1,153 @@
+# bot/logging_pipeline.py
+"""
+Non-blocking logging for the bot and workers.
+
+Log calls only put the record on an in-memory queue. A listener thread
+formats it (as a JSON line or as text) and writes it to stdout, so slow
+stdout never stalls the event loop. Records from chatty loggers can be
+sampled before they are queued, and `instrument` adds one structured
+record per handled update (handler, user, latency, outcome).
+"""
+
+import atexit
+import functools
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Dict
+
+from config import Config
+
+# Extra fields copied into JSON records when a log call passes them via `extra=`
+STRUCTURED_FIELDS = ("handler", "user_id", "latency_ms", "outcome", "job_id", "kind")
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Renders a record as one JSON object per line."""
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for field in STRUCTURED_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queues records untouched. The stock QueueHandler formats the message in the
+    calling thread; here %-style arguments are only merged in the listener thread.
+    """
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def parse_sampling(spec: str) -> Dict[str, float]:
+    """Parses "bot.timing=0.1,bot.parts.inline_search=0.5" into {logger prefix: keep rate}."""
+    rates = {}
+    for item in spec.split(","):
+        if "=" in item:
+            name, rate = item.split("=", 1)
+            rates[name.strip()] = float(rate)
+    return rates
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps only a fraction of INFO and DEBUG records from the configured loggers
+    (matched by name prefix, longest first). Warnings and errors are never dropped.
+    """
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = sorted(rates.items(), key=lambda item: -len(item[0]))
+        self._cache: Dict[str, float] = {}
+
+    def rate_for(self, name: str) -> float:
+        rate = self._cache.get(name)
+        if rate is None:
+            rate = next((r for prefix, r in self.rates if name == prefix or name.startswith(prefix + ".")), 1.0)
+            self._cache[name] = rate
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rate_for(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+
+def setup_logging(level: str = Config.LOG_LEVEL, fmt: str = Config.LOG_FORMAT):
+    """Routes all logging through a queue to a stdout writer thread. Call once at process start."""
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonFormatter() if fmt == "json" else logging.Formatter(TEXT_FORMAT))
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = DeferredQueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(parse_sampling(Config.LOG_SAMPLING)))
+
+    root = logging.getLogger()
+    root.handlers[:] = [queue_handler]
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    # Drain whatever is still queued when the process exits
+    atexit.register(_listener.stop)
+    return _listener
+
+
+# --- Handler Instrumentation ---
+timing_logger = logging.getLogger("bot.timing")
+
+
+def instrument(func):
+    """
+    Wraps a Pyrogram handler and logs one structured record per update with the
+    handler name, user id, latency and outcome. Apply it below the @Client decorators.
+    """
+    name = func.__name__
+
+    @functools.wraps(func)
+    async def wrapper(client, update, *args, **kwargs):
+        started = time.perf_counter()
+        outcome = "ok"
+        try:
+            return await func(client, update, *args, **kwargs)
+        except Exception as e:
+            # Pyrogram's StopPropagation/ContinuePropagation are flow control, not failures
+            outcome = "error" if not type(e).__name__.endswith("Propagation") else "stopped"
+            raise
+        finally:
+            if timing_logger.isEnabledFor(logging.INFO):
+                latency_ms = round((time.perf_counter() - started) * 1000, 1)
+                user = getattr(update, "from_user", None)
+                timing_logger.info(
+                    "%s %s in %sms", name, outcome, latency_ms,
+                    extra={
+                        "handler": name,
+                        "user_id": getattr(user, "id", None),
+                        "latency_ms": latency_ms,
+                        "outcome": outcome,
+                    }
+                )
+    return wrapper
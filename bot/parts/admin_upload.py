@@ -2,17 +2,22 @@
 
 import logging
 import re
-from typing import List
+import unicodedata
+from collections import Counter
+from typing import AsyncIterator, List, Optional
 from pyrogram import Client, filters
 from pyrogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
 from pyrogram.errors import MessageNotModified
 
 # FIX: Added the missing import for Config
 from config import Config
-from .core_bot_functionality import get_user_session, format_file_size
+from .core_bot_functionality import get_user_session, format_file_size, MediaProcessor
+from .conversation import text_step
 
 logger = logging.getLogger(__name__)
 
+RESULTS_PER_PAGE = 10
+
 # --- Helper: Extract Quality ---
 def extract_quality(text: str) -> str:
     """Extracts video quality from text (filename or caption)."""
@@ -49,7 +54,7 @@ async def upload_command(client: Client, message: Message):
         ])
         await message.reply_text(welcome_text, reply_markup=keyboard)
     except Exception as e:
-        logger.error(f"Error in upload_command: {e}")
+        logger.error("Error in upload_command: %s", e)
         await message.reply_text("❌ An error occurred while starting the upload process.")
 
 
@@ -60,8 +65,8 @@ async def handle_upload_type(client: Client, callback_query: CallbackQuery):
     try:
         user_id = callback_query.from_user.id
         session = get_user_session(user_id)
+        session.advance("waiting_for_names")
         session.entertainment_type = callback_query.data.split("_", 1)[1]
-        session.current_step = "waiting_for_names"
 
         type_map = {
             "movies": "Movie(s)", "webseries": "Web Series",
@@ -76,29 +81,22 @@ async def handle_upload_type(client: Client, callback_query: CallbackQuery):
             "- For a single item: `KGF Chapter 2`\n"
             "- For multiple items, separate them with a comma: `Kantara, RRR, Vikrant Rona`"
         )
-        keyboard = InlineKeyboardMarkup([[InlineKeyboardButton("❌ Cancel", callback_data="cancel_upload")]])
-        await callback_query.message.edit_text(prompt_text, reply_markup=keyboard)
+        buttons = [[InlineKeyboardButton("❌ Cancel", callback_data="cancel_upload")]]
+        if session.entertainment_type in ("webseries", "tvseries"):
+            # Long serials can have more episodes than channel search returns
+            buttons.insert(0, [InlineKeyboardButton("📚 Full History Scan", callback_data="scan_mode")])
+        await callback_query.message.edit_text(prompt_text, reply_markup=InlineKeyboardMarkup(buttons))
         await callback_query.answer()
     except Exception as e:
-        logger.error(f"Error in handle_upload_type: {e}")
+        logger.error("Error in handle_upload_type: %s", e)
         await callback_query.answer("❌ An error occurred.", show_alert=True)
 
 
 # --- Step 2: Handle Name Input ---
-@Client.on_message(filters.text & filters.user(Config.ADMIN_IDS) & filters.private)
-async def handle_name_input(client: Client, message: Message):
+@text_step("waiting_for_names")
+async def handle_name_input(client: Client, message: Message, session: MediaProcessor):
     """Handles the text message containing the names to be processed."""
     user_id = message.from_user.id
-    session = get_user_session(user_id)
-
-    # Ensure this handler only runs when the bot is expecting names
-    if session.current_step != "waiting_for_names":
-        # Check for other steps that might handle text input
-        if session.current_step == "collecting_details":
-            from .details_collection import handle_detail_input
-            await handle_detail_input(client, message)
-        return
-
     try:
         names_input = message.text.strip()
         names = [name.strip() for name in names_input.split(",") if name.strip()]
@@ -109,7 +107,7 @@ async def handle_name_input(client: Client, message: Message):
 
         session.names_to_process = names
         session.current_name_index = 0
-        session.current_step = "processing_names"
+        session.advance("processing_names")
 
         await message.reply_text(
             f"✅ **Names Received:** {len(names)}\n"
@@ -119,7 +117,7 @@ async def handle_name_input(client: Client, message: Message):
         # Start processing the first name
         await process_next_name(client, message, user_id)
     except Exception as e:
-        logger.error(f"Error in handle_name_input: {e}")
+        logger.error("Error in handle_name_input: %s", e)
         await message.reply_text("❌ An error occurred while processing the names.")
 
 
@@ -144,11 +142,27 @@ async def process_next_name(client: Client, message: Message, user_id: int):
         )
     )
 
+    if session.scan_mode:
+        from .series_ingest import ingest_series_item # Avoid circular import
+        try:
+            await ingest_series_item(client, progress_msg, user_id, current_name)
+        except Exception as e:
+            logger.error("Error scanning history for '%s': %s", current_name, e)
+            await progress_msg.edit_text(f"❌ An error occurred while scanning for `{current_name}`. Moving to next.")
+            session.current_name_index += 1
+            await process_next_name(client, message, user_id)
+        return
+
     try:
-        # Search in channels
-        search_results = await search_in_channels(client, current_name)
+        # Open a result stream; pages are filled from it lazily as the admin browses
+        session.search_results[current_name] = []
+        session.selected_media[current_name] = set()
+        session.result_groups[current_name] = {}
+        session.result_streams[current_name] = iter_channel_results(client, current_name)
+        session.current_page = 0
+        await fill_results(session, current_name, RESULTS_PER_PAGE + 1)
 
-        if not search_results:
+        if not session.search_results[current_name]:
             session.unavailable_list.append(current_name)
             await progress_msg.edit_text(
                 f"❌ **No results found for:** `{current_name}`\n"
@@ -159,77 +173,195 @@ async def process_next_name(client: Client, message: Message, user_id: int):
             await process_next_name(client, message, user_id)
             return
 
-        # Store results and reset pagination for the new item
-        session.search_results[current_name] = search_results
-        session.current_page = 0
-        session.total_pages = (len(search_results) - 1) // 10 + 1
-        
-        # All search results are considered 'selected' by default
-        session.selected_media[current_name] = list(range(len(search_results)))
-
         await show_search_results(client, progress_msg, user_id, current_name)
 
     except Exception as e:
-        logger.error(f"Error in process_next_name for '{current_name}': {e}")
+        logger.error("Error in process_next_name for '%s': %s", current_name, e)
         await progress_msg.edit_text(f"❌ An error occurred while processing `{current_name}`. Moving to next.")
         session.current_name_index += 1
         await process_next_name(client, message, user_id)
 
 
-async def search_in_channels(client: Client, search_term: str) -> List[dict]:
-    """Searches for a term across all configured admin channels."""
-    results = []
-    pattern = re.compile(re.escape(search_term), re.IGNORECASE)
+def compile_search_pattern(search_term: str):
+    """Compiles the case-insensitive pattern a file name or caption must contain to match a search."""
+    return re.compile(re.escape(search_term), re.IGNORECASE)
+
+
+def matches_search(pattern, file_name: str, caption: str) -> bool:
+    """True if the file name or caption matches a compiled search pattern."""
+    return bool(pattern.search(file_name or "") or pattern.search(caption or ""))
+
+
+def normalize_file_name(file_name: str) -> str:
+    """
+    Lowercases a file name and drops separators and punctuation. Letters and digits
+    of every script are kept, with their combining marks (e.g. Kannada vowel signs).
+    """
+    return "".join(ch for ch in (file_name or "").lower() if ch.isalnum() or unicodedata.category(ch).startswith("M"))
+
+
+def media_dedup_key(result: dict) -> str:
+    """
+    Identifies the underlying file of a search result. Telegram's file_unique_id is
+    the same for every repost of a file; size + normalized file name is the fallback.
+    """
+    if result.get("file_unique_id"):
+        return f"fuid:{result['file_unique_id']}"
+    normalized_name = normalize_file_name(result.get("file_name"))
+    if normalized_name and result.get("size_bytes"):
+        return f"name:{result['size_bytes']}:{normalized_name}"
+    return f"msg:{result['channel_id']}:{result['message_id']}"
+
+
+def source_rank(result: dict) -> tuple:
+    """Sort key for copies of one file: earlier channels in CHANNEL_IDS win, then the newest post."""
+    channel_id = result["channel_id"]
+    channel_rank = Config.CHANNEL_IDS.index(channel_id) if channel_id in Config.CHANNEL_IDS else len(Config.CHANNEL_IDS)
+    return channel_rank, -result["message_id"]
+
+
+class ResultDeduper:
+    """Collapses reposts of the same file into one result, keeping the other copies as fallbacks."""
+    def __init__(self):
+        self.by_key = {}
+
+    def add(self, result: dict) -> bool:
+        """Registers a result. Returns True if it is a new file, False if it was merged into an existing one."""
+        key = media_dedup_key(result)
+        result["dedup_key"] = key
+        result.setdefault("fallbacks", [])
+        kept = self.by_key.get(key)
+        if kept is None:
+            self.by_key[key] = result
+            return True
+
+        copy = {"channel_id": result["channel_id"], "message_id": result["message_id"], "link": result.get("link")}
+        if source_rank(result) < source_rank(kept):
+            # The new copy is preferred: swap the source into the kept result
+            kept["fallbacks"].append({"channel_id": kept["channel_id"], "message_id": kept["message_id"], "link": kept.get("link")})
+            kept.update(copy)
+        else:
+            kept["fallbacks"].append(copy)
+        return False
+
+
+def dedupe_results(results: List[dict]) -> List[dict]:
+    """Returns one result per distinct file, in first-seen order."""
+    deduper = ResultDeduper()
+    return [result for result in results if deduper.add(result)]
+
+
+def build_search_result(msg: Message, channel_id: int) -> dict:
+    """Describes a channel message holding a video or document as a search result."""
+    media = msg.video or msg.document
+    file_name = getattr(media, 'file_name', '') or ""
+    caption = msg.caption or ""
+    file_size_bytes = getattr(media, 'file_size', 0)
+    return {
+        "message_id": msg.id,
+        "channel_id": channel_id,
+        "caption": caption,
+        "file_name": file_name,
+        "file_unique_id": getattr(media, 'file_unique_id', None),
+        "size_bytes": file_size_bytes,
+        "size_str": format_file_size(file_size_bytes),
+        "quality": extract_quality(file_name + " " + caption),
+        "file_type": "video" if msg.video else "document",
+        "link": msg.link
+    }
+
+
+async def iter_channel_results(client: Client, search_term: str) -> AsyncIterator[dict]:
+    """
+    Streams matching files from all configured admin channels as they are found,
+    merging reposts of the same file. SEARCH_LIMIT_PER_CHANNEL caps each channel (0 = no cap).
+    """
+    deduper = ResultDeduper()
+    pattern = compile_search_pattern(search_term)
 
     for channel_id in Config.CHANNEL_IDS:
         try:
-            async for msg in client.search_messages(chat_id=channel_id, query=search_term, limit=50):
+            async for msg in client.search_messages(chat_id=channel_id, query=search_term, limit=Config.SEARCH_LIMIT_PER_CHANNEL):
                 if msg.video or msg.document:
-                    file_name = getattr(msg.video or msg.document, 'file_name', '') or ""
-                    caption = msg.caption or ""
-                    
-                    if pattern.search(file_name) or pattern.search(caption):
-                        file_size_bytes = getattr(msg.video or msg.document, 'file_size', 0)
-                        
-                        results.append({
-                            "message_id": msg.id,
-                            "channel_id": channel_id,
-                            "caption": caption,
-                            "file_name": file_name,
-                            "size_bytes": file_size_bytes,
-                            "size_str": format_file_size(file_size_bytes),
-                            "quality": extract_quality(file_name + " " + caption),
-                            "file_type": "video" if msg.video else "document",
-                            "link": msg.link
-                        })
+                    result = build_search_result(msg, channel_id)
+                    if matches_search(pattern, result["file_name"], result["caption"]) and deduper.add(result):
+                        yield result
         except Exception as e:
-            logger.error(f"Could not search in channel {channel_id}: {e}")
-    return results
+            logger.error("Could not search in channel %s: %s", channel_id, e)
+
+
+async def search_in_channels(client: Client, search_term: str) -> List[dict]:
+    """Searches for a term across all configured admin channels, merging reposts of the same file."""
+    return [result async for result in iter_channel_results(client, search_term)]
+
+
+# --- Lazy Result Buffer & Selection ---
+async def fill_results(session, name: str, upto: Optional[int] = None):
+    """
+    Pulls results from the item's stream until `upto` results are buffered, or
+    until it is exhausted when `upto` is None. New results start out selected
+    and are indexed into their quality and season groups.
+    """
+    from .details_collection import extract_season_episode # Avoid circular import
+
+    stream = session.result_streams.get(name)
+    results = session.search_results[name]
+    selected = session.selected_media[name]
+    groups = session.result_groups[name]
+    while stream is not None and (upto is None or len(results) < upto):
+        try:
+            result = await stream.__anext__()
+        except StopAsyncIteration:
+            session.result_streams.pop(name, None)
+            break
+        index = len(results)
+        results.append(result)
+        selected.add(index)
+        groups.setdefault(f"q:{result['quality']}", set()).add(index)
+        if session.entertainment_type != "movies":
+            season, _ = extract_season_episode(result["file_name"] + result["caption"])
+            groups.setdefault(f"s:{season}", set()).add(index)
+
+
+def page_info(session, name: str) -> tuple:
+    """Returns (total pages as text, whether a next page exists) for the current page."""
+    loaded = len(session.search_results.get(name, []))
+    exhausted = name not in session.result_streams
+    pages = max(1, (loaded - 1) // RESULTS_PER_PAGE + 1)
+    has_next = (session.current_page + 1) * RESULTS_PER_PAGE < loaded
+    return (str(pages) if exhausted else f"{pages}+"), has_next
+
+
+async def ensure_page_loaded(session, name: str):
+    """Buffers the current page plus one result, so we know whether a next page exists."""
+    await fill_results(session, name, (session.current_page + 1) * RESULTS_PER_PAGE + 1)
 
 
 async def show_search_results(client: Client, message: Message, user_id: int, current_name: str):
     """Displays paginated search results to the admin for confirmation."""
     session = get_user_session(user_id)
+    await ensure_page_loaded(session, current_name)
     results = session.search_results.get(current_name, [])
-    selected_indices = session.selected_media.get(current_name, [])
+    selected = session.selected_media.get(current_name, set())
     
     if not results:
         await message.edit_text(f"No results found for `{current_name}`.")
         return
 
-    start_idx = session.current_page * 10
-    end_idx = start_idx + 10
-    page_results = results[start_idx:end_idx]
+    start_idx = session.current_page * RESULTS_PER_PAGE
+    page_results = results[start_idx:start_idx + RESULTS_PER_PAGE]
+    total_pages, has_next = page_info(session, current_name)
 
     text = f"🔍 **Search Results for:** `{current_name}`\n"
-    text += f"📄 **Page {session.current_page + 1}/{session.total_pages}** | ✅ **{len(selected_indices)} files selected**\n\n"
+    text += f"📄 **Page {session.current_page + 1}/{total_pages}** | ✅ **{len(selected)} files selected**\n\n"
 
     for i, result in enumerate(page_results, start=start_idx):
-        status_icon = "✅" if i in selected_indices else "❌"
+        status_icon = "✅" if i in selected else "❌"
         display_name = result["file_name"] if result["file_name"] else "No Filename"
+        copies = f" | +{len(result['fallbacks'])} copies" if result.get("fallbacks") else ""
         text += (
             f"**{i+1}.** {status_icon} `{display_name[:50]}`\n"
-            f"   - Quality: {result['quality']} | Size: {result['size_str']}\n"
+            f"   - Quality: {result['quality']} | Size: {result['size_str']}{copies}\n"
         )
     
     text += "\nAre these the correct files for this item?"
@@ -238,7 +370,7 @@ async def show_search_results(client: Client, message: Message, user_id: int, cu
     nav_buttons = []
     if session.current_page > 0:
         nav_buttons.append(InlineKeyboardButton("⬅️ Previous", callback_data=f"prev_page_{current_name}"))
-    if session.current_page < session.total_pages - 1:
+    if has_next:
         nav_buttons.append(InlineKeyboardButton("Next ➡️", callback_data=f"next_page_{current_name}"))
     
     if nav_buttons:
@@ -254,7 +386,7 @@ async def show_search_results(client: Client, message: Message, user_id: int, cu
     except MessageNotModified:
         pass
     except Exception as e:
-        logger.error(f"Error in show_search_results: {e}")
+        logger.error("Error in show_search_results: %s", e)
         await client.send_message(user_id, text, reply_markup=InlineKeyboardMarkup(buttons))
 
 
@@ -267,104 +399,142 @@ async def handle_search_action(client: Client, callback_query: CallbackQuery):
     data = callback_query.data
     
     try:
-        action, name = data.split("_", 1)
+        action, name = re.match(r"^(correct|wrong|prev_page|next_page)_(.+)$", data, re.DOTALL).groups()
 
         if action == "correct":
             await callback_query.answer("✅ Correct! Moving to the next item...")
+            # Files not browsed yet are selected by default, so collect them before moving on
+            await fill_results(session, name)
             session.current_name_index += 1
             await process_next_name(client, callback_query.message, user_id)
 
         elif action == "wrong":
             await callback_query.answer("Select files to remove.")
+            # Bulk selection works on the whole result set
+            await fill_results(session, name)
             await show_removal_options(client, callback_query.message, user_id, name)
 
         elif action in ["prev_page", "next_page"]:
-            session.current_page += -1 if action == "prev_page" else 1
+            session.current_page = max(0, session.current_page + (-1 if action == "prev_page" else 1))
             await show_search_results(client, callback_query.message, user_id, name)
             await callback_query.answer()
 
     except Exception as e:
-        logger.error(f"Error in handle_search_action: {e}")
+        logger.error("Error in handle_search_action: %s", e)
         await callback_query.answer("❌ An error occurred.", show_alert=True)
 
 
 # --- Step 4a: File Removal Flow ---
 async def show_removal_options(client: Client, message: Message, user_id: int, current_name: str):
-    """Shows a grid of file numbers for the admin to deselect."""
+    """Shows a grid of file numbers for the admin to deselect, plus bulk toggles by quality and season."""
     session = get_user_session(user_id)
     results = session.search_results.get(current_name, [])
-    selected_indices = session.selected_media.get(current_name, [])
+    selected = session.selected_media.get(current_name, set())
+    groups = session.result_groups.get(current_name, {})
     
-    start_idx = session.current_page * 10
-    end_idx = min(start_idx + 10, len(results))
+    start_idx = session.current_page * RESULTS_PER_PAGE
+    end_idx = min(start_idx + RESULTS_PER_PAGE, len(results))
+    total_pages, has_next = page_info(session, current_name)
 
     text = (
         f"❌ **Modify Selection for:** `{current_name}`\n"
-        f"📄 **Page {session.current_page + 1}/{session.total_pages}**\n\n"
-        "Click on a number to toggle its selection (✅/❌)."
+        f"📄 **Page {session.current_page + 1}/{total_pages}** | ✅ **{len(selected)}/{len(results)} selected**\n\n"
+        "Click on a number to toggle its selection (✅/❌).\n"
+        "Use the quality/season buttons to toggle whole groups at once."
     )
     
     buttons = []
     row = []
     for i in range(start_idx, end_idx):
-        status_icon = "✅" if i in selected_indices else "❌"
+        status_icon = "✅" if i in selected else "❌"
         row.append(InlineKeyboardButton(f"{i+1} {status_icon}", callback_data=f"remove_{current_name}_{i}"))
         if len(row) == 5:
             buttons.append(row)
             row = []
     if row:
         buttons.append(row)
+
+    # Bulk toggles: ✅ when every file in the group is selected
+    group_buttons = []
+    kind_counts = Counter(key[0] for key in groups)
+    for key in sorted(groups, key=group_sort_key):
+        kind, value = key.split(":", 1)
+        if kind_counts[kind] < 2:
+            continue # A single group would just mean "toggle everything"
+        label = value if kind == "q" else f"S{value}"
+        icon = "✅" if groups[key] <= selected else "❌"
+        group_buttons.append(InlineKeyboardButton(f"{label} {icon}", callback_data=f"bulk_{current_name}_{key}"))
+    for i in range(0, len(group_buttons), 4):
+        buttons.append(group_buttons[i:i + 4])
         
     nav_buttons = []
     if session.current_page > 0:
         nav_buttons.append(InlineKeyboardButton("⬅️", callback_data=f"nav_remove_{current_name}_prev"))
     nav_buttons.append(InlineKeyboardButton("✅ Done", callback_data=f"done_remove_{current_name}"))
-    if session.current_page < session.total_pages - 1:
+    if has_next:
         nav_buttons.append(InlineKeyboardButton("➡️", callback_data=f"nav_remove_{current_name}_next"))
     
     buttons.append(nav_buttons)
     
-    await message.edit_text(text, reply_markup=InlineKeyboardMarkup(buttons))
+    try:
+        await message.edit_text(text, reply_markup=InlineKeyboardMarkup(buttons))
+    except MessageNotModified:
+        pass
+
+
+def group_sort_key(key: str) -> tuple:
+    """Orders bulk toggles: qualities first, then seasons numerically."""
+    kind, value = key.split(":", 1)
+    return (kind == "s", int(value) if value.isdigit() else 0, value)
 
 
-@Client.on_callback_query(filters.regex(r"^(remove_|done_remove_|nav_remove_)") & filters.user(Config.ADMIN_IDS))
+@Client.on_callback_query(filters.regex(r"^(remove_|done_remove_|nav_remove_|bulk_)") & filters.user(Config.ADMIN_IDS))
 async def handle_removal_action(client: Client, callback_query: CallbackQuery):
-    """Handles toggling file selections, navigating, or finishing removal."""
+    """Handles toggling file selections (one at a time or by group), navigating, or finishing removal."""
     user_id = callback_query.from_user.id
     session = get_user_session(user_id)
     data = callback_query.data
     
     try:
-        parts = data.split("_")
-        action = parts[0]
+        action, rest = re.match(r"^(remove|done_remove|nav_remove|bulk)_(.+)$", data, re.DOTALL).groups()
         
         if action == "remove":
-            name, index_str = parts[1], parts[2]
+            name, index_str = rest.rsplit("_", 1)
             index = int(index_str)
-            selected_indices = session.selected_media.get(name, [])
-            if index in selected_indices:
-                selected_indices.remove(index)
+            selected = session.selected_media.setdefault(name, set())
+            if index in selected:
+                selected.discard(index)
                 await callback_query.answer(f"File #{index+1} removed.")
             else:
-                selected_indices.append(index)
+                selected.add(index)
                 await callback_query.answer(f"File #{index+1} added back.")
-            
-            session.selected_media[name] = sorted(selected_indices)
+            await show_removal_options(client, callback_query.message, user_id, name)
+
+        elif action == "bulk":
+            name, key = rest.rsplit("_", 1)
+            group = session.result_groups.get(name, {}).get(key, set())
+            selected = session.selected_media.setdefault(name, set())
+            if group <= selected:
+                selected -= group
+                await callback_query.answer(f"Deselected {len(group)} files.")
+            else:
+                selected |= group
+                await callback_query.answer(f"Selected {len(group)} files.")
             await show_removal_options(client, callback_query.message, user_id, name)
 
         elif action == "nav_remove":
-            name, direction = parts[1], parts[2]
-            session.current_page += -1 if direction == "prev" else 1
+            name, direction = rest.rsplit("_", 1)
+            session.current_page = max(0, session.current_page + (-1 if direction == "prev" else 1))
             await show_removal_options(client, callback_query.message, user_id, name)
             await callback_query.answer()
 
         elif action == "done_remove":
-            name = parts[1]
+            name = rest
             await callback_query.answer("Selection updated.")
             await show_search_results(client, callback_query.message, user_id, name)
             
     except Exception as e:
-        logger.error(f"Error in handle_removal_action: {e}")
+        logger.error("Error in handle_removal_action: %s", e)
         await callback_query.answer("❌ An error occurred.", show_alert=True)
         
 
@@ -0,0 +1,218 @@
+# bot/parts/analytics.py
+
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+
+from bson import ObjectId
+from pymongo import UpdateOne
+from pyrogram import Client, filters
+from pyrogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
+
+from config import Config
+from ..logging_pipeline import instrument
+from .core_bot_functionality import db, read_db
+
+logger = logging.getLogger(__name__)
+
+content_stats = db.content_stats
+
+VIEW_WEIGHT = 1
+DOWNLOAD_WEIGHT = 3
+
+
+def ensure_stats_indexes():
+    """Creates the index used to load recent activity for trending. Blocking."""
+    content_stats.create_index("score_at")
+
+
+# --- Write-Behind Counter Buffer ---
+# Counts accumulate here on the hot path and are written as one bulk batch per flush.
+_views: Dict[str, int] = defaultdict(int)
+_downloads: Dict[str, int] = defaultdict(int)
+_media_downloads: Dict[Tuple[str, str], int] = defaultdict(int)
+_collections: Dict[str, str] = {}
+
+
+def record_view(content_id: str, collection_name: str):
+    """Counts a detail view. O(1), no I/O."""
+    _views[content_id] += 1
+    _collections[content_id] = collection_name
+
+
+def record_download(content_id: str, media_id: str, collection_name: str):
+    """Counts a file request. O(1), no I/O."""
+    _downloads[content_id] += 1
+    _media_downloads[(content_id, media_id)] += 1
+    _collections[content_id] = collection_name
+
+
+def take_counters() -> Tuple[dict, dict, dict, dict]:
+    """
+    Swaps in empty buffers and returns copies of the filled ones. Runs on the event
+    loop, like every record_* call, so no count can land in a buffer being written.
+    """
+    global _views, _downloads, _media_downloads, _collections
+    taken = (dict(_views), dict(_downloads), dict(_media_downloads), dict(_collections))
+    _views, _downloads, _media_downloads, _collections = defaultdict(int), defaultdict(int), defaultdict(int), {}
+    return taken
+
+
+def restore_counters(views: dict, downloads: dict, media_downloads: dict, collections: dict):
+    """Puts counts that couldn't be written back into the buffers for the next flush. Runs on the event loop."""
+    for content_id, count in views.items():
+        _views[content_id] += count
+    for content_id, count in downloads.items():
+        _downloads[content_id] += count
+    for key, count in media_downloads.items():
+        _media_downloads[key] += count
+    for content_id, collection_name in collections.items():
+        _collections.setdefault(content_id, collection_name)
+
+
+def write_counters(views: dict, downloads: dict, media_downloads: dict, collections: dict) -> int:
+    """
+    Writes taken counts as a single unordered bulk write and returns the number of
+    titles updated. Each title's trending score is decayed to now before the new
+    activity is added. Blocking.
+    """
+    per_media = defaultdict(dict)
+    for (content_id, media_id), count in media_downloads.items():
+        per_media[content_id][media_id] = count
+
+    now = datetime.utcnow()
+    half_life_ms = Config.TRENDING_HALF_LIFE_HOURS * 3600 * 1000
+    ops = []
+    for content_id in set(views) | set(downloads):
+        activity = views.get(content_id, 0) * VIEW_WEIGHT + downloads.get(content_id, 0) * DOWNLOAD_WEIGHT
+        decayed_score = {"$multiply": [
+            {"$ifNull": ["$score", 0]},
+            {"$pow": [0.5, {"$divide": [{"$subtract": [now, {"$ifNull": ["$score_at", now]}]}, half_life_ms]}]}
+        ]}
+        fields = {
+            "collection": collections.get(content_id),
+            "views": {"$add": [{"$ifNull": ["$views", 0]}, views.get(content_id, 0)]},
+            "downloads": {"$add": [{"$ifNull": ["$downloads", 0]}, downloads.get(content_id, 0)]},
+            "score": {"$add": [decayed_score, activity]},
+            "score_at": now,
+        }
+        for media_id, count in per_media.get(content_id, {}).items():
+            fields[f"media_downloads.{media_id}"] = {"$add": [{"$ifNull": [f"$media_downloads.{media_id}", 0]}, count]}
+        ops.append(UpdateOne({"_id": content_id}, [{"$set": fields}], upsert=True))
+
+    if ops:
+        content_stats.bulk_write(ops, ordered=False)
+    return len(ops)
+
+
+async def flush_counters() -> int:
+    """Writes all buffered counts off the event loop and returns the number of titles updated."""
+    counters = take_counters()
+    try:
+        return await asyncio.to_thread(write_counters, *counters)
+    except Exception as e:
+        logger.error("Failed to flush counter updates, keeping them for the next flush: %s", e)
+        restore_counters(*counters)
+        return 0
+
+
+# --- Trending Rankings ---
+_trending: List[dict] = []
+_trending_refreshed_at = 0.0
+
+
+def refresh_trending():
+    """Recomputes the time-decayed trending list from content_stats. Blocking."""
+    global _trending, _trending_refreshed_at
+    now = datetime.utcnow()
+    half_life = Config.TRENDING_HALF_LIFE_HOURS * 3600
+    since = now - timedelta(days=Config.TRENDING_WINDOW_DAYS)
+
+    scored = []
+    for stat in content_stats.find({"score_at": {"$gte": since}}, {"score": 1, "score_at": 1, "collection": 1}):
+        age = (now - stat["score_at"]).total_seconds()
+        scored.append((stat["score"] * 0.5 ** (age / half_life), stat["_id"], stat.get("collection")))
+    scored.sort(reverse=True)
+    top = scored[:Config.TRENDING_SIZE]
+
+    # Resolve names with one query per collection
+    ids_by_collection = defaultdict(list)
+    for _, content_id, collection_name in top:
+        if collection_name:
+            ids_by_collection[collection_name].append(ObjectId(content_id))
+    names = {}
+    for collection_name, ids in ids_by_collection.items():
+        for doc in read_db[collection_name].find({"_id": {"$in": ids}}, {"name": 1, "year": 1}):
+            names[str(doc["_id"])] = doc
+
+    _trending = [
+        {"id": content_id, "name": names[content_id].get("name"), "year": names[content_id].get("year"), "score": score}
+        for score, content_id, _ in top if content_id in names
+    ]
+    _trending_refreshed_at = time.monotonic()
+
+
+def trending_snapshot() -> dict:
+    """The trending list with its age, for an on-disk snapshot."""
+    return {"trending": list(_trending), "age": time.monotonic() - _trending_refreshed_at if _trending_refreshed_at else None}
+
+
+def restore_trending(state: dict):
+    global _trending, _trending_refreshed_at
+    if state["age"] is not None:
+        _trending = state["trending"]
+        _trending_refreshed_at = time.monotonic() - state["age"]
+
+
+async def analytics_loop():
+    """Flushes the counter buffer and refreshes trending rankings on their intervals."""
+    last_trending = 0.0
+    while True:
+        await asyncio.sleep(Config.COUNTER_FLUSH_INTERVAL)
+        try:
+            await flush_counters()
+            if time.monotonic() - last_trending >= Config.TRENDING_REFRESH_INTERVAL:
+                await asyncio.to_thread(refresh_trending)
+                last_trending = time.monotonic()
+        except Exception as e:
+            logger.error("Error in analytics_loop: %s", e)
+
+
+# --- /trending Command ---
+@Client.on_message(filters.command("trending") & filters.private)
+@Client.on_callback_query(filters.regex("^trending$"))
+@instrument
+async def trending_command(client: Client, update: Message | CallbackQuery):
+    """Shows the precomputed trending titles."""
+    try:
+        if not _trending_refreshed_at:
+            await asyncio.to_thread(refresh_trending)
+
+        if _trending:
+            text = "🔥 **Trending Now**\n\nThe most viewed and downloaded titles right now:"
+        else:
+            text = "🔥 **Trending Now**\n\nNothing is trending yet. Check back soon!"
+        buttons = [
+            [InlineKeyboardButton(
+                f"{rank}. {item['name']}" + (f" ({item['year']})" if item.get("year") else ""),
+                callback_data=f"view_content_{item['id']}"
+            )]
+            for rank, item in enumerate(_trending, start=1)
+        ]
+        buttons.append([InlineKeyboardButton("⬅️ Back to Main Menu", callback_data="back_to_main")])
+        keyboard = InlineKeyboardMarkup(buttons)
+
+        if isinstance(update, Message):
+            await update.reply_text(text, reply_markup=keyboard)
+        else:
+            await update.message.edit_text(text, reply_markup=keyboard)
+            await update.answer()
+    except Exception as e:
+        logger.error("Error in trending_command: %s", e)
+        if isinstance(update, Message):
+            await update.reply_text("❌ An error occurred. Please try again later.")
+        else:
+            await update.answer("❌ An error occurred.", show_alert=True)
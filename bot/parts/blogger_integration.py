@@ -3,6 +3,7 @@
 import logging
 import aiohttp
 from config import Config
+from .core_bot_functionality import media_quality_label, media_size_label
 
 logger = logging.getLogger(__name__)
 
@@ -35,54 +36,60 @@ async def update_blogger_site(client, message, content_doc: dict, ent_type: str)
         success = await publish_post(title, html_content, labels)
         
         if success:
-            logger.info(f"Successfully published '{title}' to Blogger.")
+            logger.info("Successfully published '%s' to Blogger.", title)
             # Optionally send a confirmation to the admin
             # await client.send_message(message.chat.id, f"✅ Successfully published '{title}' to the blog.")
         else:
-            logger.error(f"Failed to publish '{title}' to Blogger.")
+            logger.error("Failed to publish '%s' to Blogger.", title)
             # await client.send_message(message.chat.id, f"❌ Failed to publish '{title}' to the blog.")
 
     except Exception as e:
-        logger.error(f"Error in update_blogger_site: {e}")
+        logger.error("Error in update_blogger_site: %s", e)
+
+def load_blog_template(path: str = 'templates/blog_template.html') -> str:
+    """Reads the HTML template used for every post."""
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+def render_blog_html(template: str, content: dict) -> str:
+    """Populates an already loaded template with content details."""
+    # --- Populate Placeholders ---
+    # Basic Info
+    template = template.replace("{{POST_TITLE}}", content.get('name', ''))
+    template = template.replace("{{POSTER_URL}}", content.get('poster_url', ''))
+    template = template.replace("{{YEAR}}", str(content.get('year', 'N/A')))
+    template = template.replace("{{LANGUAGE}}", content.get('language', 'N/A'))
+    template = template.replace("{{GENRE}}", ", ".join(content.get('genre', [])))
+    template = template.replace("{{ACTORS}}", ", ".join(content.get('actors', [])))
+    template = template.replace("{{DESCRIPTION}}", content.get('description', ''))
+
+    # Download Buttons (files whose source posts are gone are left out)
+    download_buttons_html = ""
+    for media in content.get('media_files', []):
+        if media.get('dead'):
+            continue
+        url = f"https://t.me/{Config.BOT_USERNAME}?start=media-{media['msg_id']}"
+        download_buttons_html += f"""
+        <a href="{url}" class="download-btn" target="_blank">
+            <div class="download-info">
+                <div class="download-quality">{media_quality_label(media)}</div>
+                <div class="download-size">{media_size_label(media)}</div>
+            </div>
+            <i class="fas fa-download download-icon"></i>
+        </a>
+        """
+    return template.replace("{{DOWNLOAD_BUTTONS}}", download_buttons_html)
 
 def generate_blog_html(content: dict) -> str:
     """Reads the HTML template and populates it with content details."""
     try:
-        with open('templates/blog_template.html', 'r', encoding='utf-8') as f:
-            template = f.read()
-
-        # --- Populate Placeholders ---
-        # Basic Info
-        template = template.replace("{{POST_TITLE}}", content.get('name', ''))
-        template = template.replace("{{POSTER_URL}}", content.get('poster_url', ''))
-        template = template.replace("{{YEAR}}", str(content.get('year', 'N/A')))
-        template = template.replace("{{LANGUAGE}}", content.get('language', 'N/A'))
-        template = template.replace("{{GENRE}}", ", ".join(content.get('genre', [])))
-        template = template.replace("{{ACTORS}}", ", ".join(content.get('actors', [])))
-        template = template.replace("{{DESCRIPTION}}", content.get('description', ''))
-        
-        # Download Buttons
-        download_buttons_html = ""
-        for media in content.get('media_files', []):
-            url = f"https://t.me/{Config.BOT_USERNAME}?start=media-{media['msg_id']}"
-            download_buttons_html += f"""
-            <a href="{url}" class="download-btn" target="_blank">
-                <div class="download-info">
-                    <div class="download-quality">{media['quality']}</div>
-                    <div class="download-size">{media['size']}</div>
-                </div>
-                <i class="fas fa-download download-icon"></i>
-            </a>
-            """
-        template = template.replace("{{DOWNLOAD_BUTTONS}}", download_buttons_html)
-        
-        return template
+        return render_blog_html(load_blog_template(), content)
 
     except FileNotFoundError:
         logger.error("Could not find blog_template.html in the /templates directory.")
         return f"<h1>{content.get('name')}</h1><p>Error: Blog template not found.</p>"
     except Exception as e:
-        logger.error(f"Error generating blog HTML: {e}")
+        logger.error("Error generating blog HTML: %s", e)
         return f"<h1>{content.get('name')}</h1><p>Error generating blog content.</p>"
 
 async def publish_post(title: str, content: str, labels: list) -> bool:
@@ -105,8 +112,8 @@ async def publish_post(title: str, content: str, labels: list) -> bool:
                     return True
                 else:
                     error_text = await response.text()
-                    logger.error(f"Blogger API Error ({response.status}): {error_text}")
+                    logger.error("Blogger API Error (%s): %s", response.status, error_text)
                     return False
     except Exception as e:
-        logger.error(f"HTTP error while publishing to Blogger: {e}")
+        logger.error("HTTP error while publishing to Blogger: %s", e)
         return False
@@ -0,0 +1,356 @@
+# bot/parts/bulk_import.py
+
+import asyncio
+import csv
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+
+from pymongo import UpdateOne
+from pyrogram import Client, filters
+from pyrogram.types import Message
+
+from config import Config
+from .core_bot_functionality import db, get_collection_by_type, format_file_size
+from .admin_upload import (
+    compile_search_pattern, matches_search, search_in_channels, extract_quality, dedupe_results
+)
+from .details_collection import build_media_entries, build_content_doc
+from .media_registry import assign_registered_ids, register_media
+from .caching import invalidate_content
+
+logger = logging.getLogger(__name__)
+
+import_checkpoints = db.import_checkpoints
+
+VALID_TYPES = ("movies", "webseries", "tvseries", "shows")
+# Column names accepted in import files, mapped onto the fields the chat flow collects
+DETAIL_FIELDS = ("name", "year", "language", "genre", "actors", "poster_link", "description",
+                 "director", "seasons", "episodes")
+COLUMN_ALIASES = {"poster_url": "poster_link", "poster": "poster_link", "plot": "description",
+                  "title": "name", "cast": "actors", "genres": "genre"}
+
+
+# --- Streaming Readers ---
+def iter_rows(path: str) -> Iterator[Tuple[int, Dict]]:
+    """Yields (row_number, row) pairs from a CSV or JSONL file without loading it into memory."""
+    if path.lower().endswith((".jsonl", ".ndjson", ".json")):
+        with open(path, "r", encoding="utf-8") as f:
+            for row_number, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield row_number, {"__error__": f"invalid JSON: {e}"}
+                    continue
+                if not isinstance(row, dict):
+                    row = {"__error__": f"expected a JSON object, got {type(row).__name__}"}
+                yield row_number, row
+    else:
+        with open(path, "r", encoding="utf-8-sig", newline="") as f:
+            # Row 1 is the header, so data rows start at 2
+            for row_number, row in enumerate(csv.DictReader(f), start=2):
+                yield row_number, row
+
+
+def read_batch(rows: Iterator[Tuple[int, Dict]], size: int, after: int = 0) -> List[Tuple[int, Dict]]:
+    """Reads the next `size` rows numbered past `after` from an iter_rows iterator. Blocking."""
+    batch = []
+    for row_number, row in rows:
+        if row_number <= after:
+            continue
+        batch.append((row_number, row))
+        if len(batch) >= size:
+            break
+    return batch
+
+
+def file_fingerprint(path: str) -> str:
+    """A content hash identifying an import file, so re-running the same file resumes it."""
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# --- Validation ---
+def validate_row(row: Dict, default_type: Optional[str] = None) -> Tuple[str, Dict, str]:
+    """
+    Normalizes an import row into (entertainment_type, details, search_term).
+    Raises ValueError with a readable reason for rows that can't be imported.
+    """
+    if not isinstance(row, dict):
+        raise ValueError(f"expected a row object, got {type(row).__name__}")
+    if "__error__" in row:
+        raise ValueError(row["__error__"])
+
+    row = {COLUMN_ALIASES.get(k.strip().lower(), k.strip().lower()): v for k, v in row.items() if k}
+    ent_type = (row.get("type") or default_type or "").strip().lower()
+    if ent_type not in VALID_TYPES:
+        raise ValueError(f"unknown type '{ent_type}' (expected one of {', '.join(VALID_TYPES)})")
+
+    details = {}
+    for field in DETAIL_FIELDS:
+        value = row.get(field)
+        if isinstance(value, list):
+            value = ", ".join(str(v) for v in value)
+        value = str(value).strip() if value is not None else ""
+        if value and value.lower() not in ("none", "skip", "unknown", "n/a"):
+            details[field] = value
+
+    if not details.get("name"):
+        raise ValueError("missing name")
+    if details.get("year") and not details["year"].isdigit():
+        raise ValueError(f"invalid year '{details['year']}'")
+
+    search_term = str(row.get("search") or details["name"]).strip()
+    return ent_type, details, search_term
+
+
+# --- File Matching ---
+class LocalCatalog:
+    """
+    An offline index of channel files loaded from a JSONL export, one file per line:
+    {"channel_id", "message_id", "file_name", "caption", "size_bytes", "file_unique_id", "file_type", "link"}.
+    Lookups use a token index to find candidates, then the same pattern check as search_in_channels.
+    """
+    def __init__(self, path: str):
+        self.files = []
+        self.token_index = {}
+        from .inline_search import normalize_text
+
+        self._normalize = normalize_text
+        for _, entry in iter_rows(path):
+            if "__error__" in entry:
+                continue
+            file_name = entry.get("file_name") or ""
+            caption = entry.get("caption") or ""
+            size_bytes = int(entry.get("size_bytes") or 0)
+            result = {
+                "message_id": int(entry["message_id"]),
+                "channel_id": int(entry["channel_id"]),
+                "caption": caption,
+                "file_name": file_name,
+                "size_bytes": size_bytes,
+                "size_str": format_file_size(size_bytes),
+                "quality": extract_quality(file_name + " " + caption),
+                "file_unique_id": entry.get("file_unique_id"),
+                "file_type": entry.get("file_type") or "document",
+                "link": entry.get("link") or ""
+            }
+            position = len(self.files)
+            self.files.append(result)
+            for token in set(normalize_text(file_name + " " + caption).split()):
+                self.token_index.setdefault(token, []).append(position)
+
+    def search(self, search_term: str) -> List[dict]:
+        tokens = self._normalize(search_term).split()
+        if not tokens:
+            return []
+        # Start from the rarest token to keep the candidate set small
+        postings = sorted((self.token_index.get(t, []) for t in tokens), key=len)
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates &= set(posting)
+        pattern = compile_search_pattern(search_term)
+        # Copies are returned fresh each time since dedupe_results annotates them
+        return dedupe_results([
+            dict(self.files[i]) for i in sorted(candidates)
+            if matches_search(pattern, self.files[i]["file_name"], self.files[i]["caption"])
+        ])
+
+
+async def match_files(search_term: str, client: Optional[Client], catalog: Optional[LocalCatalog]) -> List[dict]:
+    """Finds the channel files for a title, preferring the local catalog when one is loaded."""
+    if catalog is not None:
+        return catalog.search(search_term)
+    if client is not None:
+        return await search_in_channels(client, search_term)
+    return []
+
+
+# --- Import Runner ---
+async def run_import(
+    path: str,
+    client: Optional[Client] = None,
+    catalog: Optional[LocalCatalog] = None,
+    default_type: Optional[str] = None,
+    progress: Optional[Callable[[Dict], Awaitable[None]]] = None
+) -> Dict:
+    """
+    Streams an import file, matching and validating rows in batches and
+    bulk-upserting each batch. Progress is checkpointed per batch, so running
+    the same file again continues after the last committed row.
+    """
+    import_id = await asyncio.to_thread(file_fingerprint, path)
+    checkpoint = await asyncio.to_thread(import_checkpoints.find_one, {"_id": import_id}) or {}
+    resume_after = checkpoint.get("last_row", 0)
+    stats = {
+        "import_id": import_id,
+        "file": os.path.basename(path),
+        "rows": checkpoint.get("rows", 0),
+        "saved": checkpoint.get("saved", 0),
+        "invalid": checkpoint.get("invalid", 0),
+        "unmatched": checkpoint.get("unmatched", 0),
+        "errors": checkpoint.get("errors", []),
+        "resumed_from": resume_after,
+        "done": False
+    }
+
+    last_row = resume_after
+    # The file is read batch by batch in a thread, so a slow disk never stalls the event loop
+    rows = iter_rows(path)
+    try:
+        while True:
+            batch = await asyncio.to_thread(read_batch, rows, Config.IMPORT_BATCH_SIZE, resume_after)
+            if not batch:
+                break
+            await _import_batch(batch, client, catalog, default_type, stats)
+            last_row = batch[-1][0]
+            if len(batch) < Config.IMPORT_BATCH_SIZE:
+                break
+            await _save_checkpoint(import_id, last_row, stats)
+            if progress:
+                await progress(stats)
+    finally:
+        rows.close()
+
+    stats["done"] = True
+    await _save_checkpoint(import_id, last_row, stats)
+
+    # Newly imported titles must show up in inline search and rendered views
+    invalidate_content()
+
+    if progress:
+        await progress(stats)
+    return stats
+
+
+async def _import_batch(batch, client, catalog, default_type, stats):
+    """Validates, matches and bulk-upserts one batch of rows."""
+    docs_by_collection: Dict[str, List[Dict]] = {}
+
+    for row_number, row in batch:
+        stats["rows"] += 1
+        try:
+            ent_type, details, search_term = validate_row(row, default_type)
+        except ValueError as e:
+            stats["invalid"] += 1
+            _note_error(stats, f"row {row_number}: {e}")
+            continue
+
+        matched = await match_files(search_term, client, catalog)
+        if not matched:
+            stats["unmatched"] += 1
+            _note_error(stats, f"row {row_number}: no files for '{search_term}'")
+            continue
+
+        media_files = build_media_entries(matched, ent_type)
+        doc = build_content_doc(details, details["name"], media_files, ent_type)
+        # Every series type shares one collection, so group docs by the collection name
+        collection = get_collection_by_type(ent_type)
+        docs_by_collection.setdefault(collection.name, []).append(doc)
+
+    for collection_name, docs in docs_by_collection.items():
+        try:
+            await asyncio.to_thread(assign_registered_ids, docs)
+            ops = [UpdateOne({"name": doc["name"], "year": doc["year"]}, {"$set": doc}, upsert=True) for doc in docs]
+            await asyncio.to_thread(db[collection_name].bulk_write, ops, ordered=False)
+            await asyncio.to_thread(register_media, docs, collection_name)
+            stats["saved"] += len(ops)
+        except Exception as e:
+            logger.error("Bulk upsert into %s failed: %s", collection_name, e)
+            _note_error(stats, f"bulk write to {collection_name} failed: {e}")
+
+
+def _note_error(stats: Dict, error: str):
+    """Keeps the first few row errors for the final report."""
+    if len(stats["errors"]) < Config.IMPORT_MAX_REPORTED_ERRORS:
+        stats["errors"].append(error)
+
+
+async def _save_checkpoint(import_id: str, last_row: int, stats: Dict):
+    await asyncio.to_thread(
+        import_checkpoints.update_one,
+        {"_id": import_id},
+        {"$set": {
+            "last_row": last_row,
+            "file": stats["file"],
+            "rows": stats["rows"],
+            "saved": stats["saved"],
+            "invalid": stats["invalid"],
+            "unmatched": stats["unmatched"],
+            "errors": stats["errors"],
+            "done": stats["done"],
+            "updated_at": datetime.utcnow()
+        }},
+        upsert=True
+    )
+
+
+def format_import_report(stats: Dict) -> str:
+    """Human-readable progress/summary text for an import."""
+    status = "✅ **Import Completed!**" if stats["done"] else "⏳ **Import in Progress...**"
+    text = f"{status}\n\n📄 **File:** `{stats['file']}`\n"
+    if stats["resumed_from"]:
+        text += f"↩️ **Resumed after row:** {stats['resumed_from']}\n"
+    text += (
+        f"📊 **Rows Processed:** {stats['rows']}\n"
+        f"💾 **Saved:** {stats['saved']}\n"
+        f"❓ **No Files Found:** {stats['unmatched']}\n"
+        f"⚠️ **Invalid Rows:** {stats['invalid']}\n"
+    )
+    if stats["done"] and stats["errors"]:
+        text += "\n**First Issues:**\n" + "\n".join(f"• `{e}`" for e in stats["errors"][:10])
+    return text
+
+
+# --- Command: /import ---
+@Client.on_message(filters.command("import") & filters.user(Config.ADMIN_IDS) & filters.private)
+async def import_command(client: Client, message: Message):
+    """
+    Imports a CSV/JSONL catalog. Send the file with `/import [type]` as its caption,
+    or reply `/import [type]` to a previously sent file.
+    """
+    document = message.document or (message.reply_to_message.document if message.reply_to_message else None)
+    if not document:
+        await message.reply_text(
+            "📥 **Bulk Import**\n\n"
+            "Send a `.csv` or `.jsonl` file with `/import` as the caption, or reply `/import` to one.\n"
+            "Columns: `type, name, year, language, genre, actors, poster_link, description, director, seasons, episodes, search`.\n"
+            "Add a type (`/import movies`) to use it for rows without a `type` column.\n\n"
+            "Sending the same file again resumes an interrupted import."
+        )
+        return
+
+    default_type = message.command[1].lower() if len(message.command) > 1 else None
+    status_msg = await message.reply_text("⏳ **Downloading import file...**")
+    path = None
+    try:
+        path = await (message.reply_to_message or message).download(
+            file_name=os.path.join("temp_data", "imports", document.file_name or document.file_unique_id)
+        )
+
+        async def report_progress(stats):
+            try:
+                await status_msg.edit_text(format_import_report(stats))
+            except Exception:
+                pass  # Unchanged text or a transient edit error shouldn't stop the import
+
+        catalog = None
+        if Config.IMPORT_CATALOG_PATH and os.path.exists(Config.IMPORT_CATALOG_PATH):
+            catalog = await asyncio.to_thread(LocalCatalog, Config.IMPORT_CATALOG_PATH)
+
+        await run_import(path, client=client, catalog=catalog, default_type=default_type, progress=report_progress)
+    except Exception as e:
+        logger.error("Error in import_command: %s", e, exc_info=True)
+        await status_msg.edit_text("❌ The import stopped with an error. Send the same file again to resume.")
+    finally:
+        if path and os.path.exists(path):
+            os.remove(path)
@@ -0,0 +1,76 @@
+# bot/parts/caching.py
+
+import logging
+import time
+from collections import OrderedDict
+from typing import Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """
+    A small LRU cache whose entries also expire after a fixed number of seconds.
+    Used to keep hot, recomputable results (search pages, rendered views) in memory.
+    """
+    def __init__(self, maxsize: int = 1024, ttl: float = 300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+
+    def get(self, key, default=None):
+        """Returns the cached value for a key, or default if missing or expired."""
+        item = self._data.get(key)
+        if item is None:
+            return default
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key, value):
+        """Stores a value, evicting the least recently used entry when full."""
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        """Removes a key from the cache and returns its value."""
+        item = self._data.pop(key, None)
+        return default if item is None else item[1]
+
+    def items(self) -> list:
+        """Returns (key, value) pairs of the entries that haven't expired, least recently used first."""
+        now = time.monotonic()
+        return [(key, value) for key, (expires_at, value) in list(self._data.items()) if expires_at >= now]
+
+    def clear(self):
+        """Drops every cached entry."""
+        self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+# --- Content Invalidation ---
+# Callbacks run whenever a content document is added, changed or removed.
+# Each receives the content id as a string, or None when everything may have changed.
+_invalidators: List[Callable[[Optional[str]], None]] = []
+
+
+def register_invalidator(callback: Callable[[Optional[str]], None]):
+    """Registers a cache invalidation callback. Usable as a decorator."""
+    _invalidators.append(callback)
+    return callback
+
+
+def invalidate_content(content_id: Optional[str] = None):
+    """Tells every registered cache that a content document changed."""
+    for callback in _invalidators:
+        try:
+            callback(content_id)
+        except Exception as e:
+            logger.error("Cache invalidator %s failed: %s", callback.__name__, e)
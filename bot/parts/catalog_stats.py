@@ -0,0 +1,166 @@
+# bot/parts/catalog_stats.py
+
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from pyrogram import Client, filters
+from pyrogram.types import Message
+
+from config import Config
+from .core_bot_functionality import db, read_db, format_file_size, media_quality_label
+
+logger = logging.getLogger(__name__)
+
+# The latest snapshot is stored here so every bot instance shares one computation
+stats_snapshots = db.catalog_stats
+SNAPSHOT_ID = "catalog"
+
+CONTENT_TYPES = {"movies": "🎬 Movies", "series": "📺 Series", "shows": "🎭 Shows"}
+
+# One pass over a content collection, split into the dashboard's sections
+CATALOG_PIPELINE = [
+    {"$project": {
+        "is_dubbed": 1,
+        "media_files.quality": 1,
+        "media_files.channel_id": 1,
+        "media_files.size_bytes": 1,
+        "media_files.dead": 1,
+    }},
+    {"$facet": {
+        "titles": [
+            {"$group": {"_id": None, "count": {"$sum": 1}, "dubbed": {"$sum": {"$cond": ["$is_dubbed", 1, 0]}}}}
+        ],
+        "qualities": [
+            {"$unwind": "$media_files"},
+            {"$group": {
+                "_id": "$media_files.quality",
+                "files": {"$sum": 1},
+                "dead": {"$sum": {"$cond": [{"$eq": ["$media_files.dead", True]}, 1, 0]}}
+            }}
+        ],
+        "channels": [
+            {"$unwind": "$media_files"},
+            {"$group": {
+                "_id": "$media_files.channel_id",
+                "files": {"$sum": 1},
+                "bytes": {"$sum": {"$ifNull": ["$media_files.size_bytes", 0]}}
+            }}
+        ],
+    }}
+]
+
+_snapshot: Optional[Dict] = None
+
+
+def compute_catalog_stats() -> Dict:
+    """Runs the aggregation over every content collection and merges the results. Blocking."""
+    titles = {}
+    dubbed = 0
+    qualities = defaultdict(int)
+    dead = 0
+    channels = defaultdict(lambda: {"files": 0, "bytes": 0})
+
+    for collection_name in CONTENT_TYPES:
+        # Heavy reads go to the read profile (secondaries when available)
+        result = next(read_db[collection_name].aggregate(CATALOG_PIPELINE, allowDiskUse=True))
+        title_counts = result["titles"][0] if result["titles"] else {"count": 0, "dubbed": 0}
+        titles[collection_name] = title_counts["count"]
+        dubbed += title_counts["dubbed"]
+        for group in result["qualities"]:
+            # Legacy text labels and compact quality codes are merged under one label
+            qualities[media_quality_label({"quality": group["_id"]})] += group["files"]
+            dead += group["dead"]
+        for group in result["channels"]:
+            channel = channels[str(group["_id"])]
+            channel["files"] += group["files"]
+            channel["bytes"] += group["bytes"]
+
+    return {
+        "_id": SNAPSHOT_ID,
+        "titles": titles,
+        "dubbed": dubbed,
+        "qualities": dict(qualities),
+        "files": sum(qualities.values()),
+        "dead_files": dead,
+        "channels": dict(channels),
+        "subscribers": db.subscribers.estimated_document_count(),
+        "computed_at": datetime.utcnow(),
+    }
+
+
+def refresh_catalog_stats() -> Dict:
+    """
+    Recomputes the snapshot unless another instance stored a fresh one within
+    STATS_REFRESH_INTERVAL. Returns the current snapshot. Blocking.
+    """
+    global _snapshot
+    stored = stats_snapshots.find_one({"_id": SNAPSHOT_ID})
+    fresh_after = datetime.utcnow() - timedelta(seconds=Config.STATS_REFRESH_INTERVAL)
+    if stored and stored["computed_at"] > fresh_after:
+        _snapshot = stored
+        return stored
+
+    started = time.monotonic()
+    snapshot = compute_catalog_stats()
+    stats_snapshots.replace_one({"_id": SNAPSHOT_ID}, snapshot, upsert=True)
+    _snapshot = snapshot
+    logger.info("Catalog stats computed in %.2fs.", time.monotonic() - started)
+    return snapshot
+
+
+async def catalog_stats_loop():
+    """Keeps the snapshot fresh in the background."""
+    while True:
+        try:
+            await asyncio.to_thread(refresh_catalog_stats)
+        except Exception as e:
+            logger.error("Error in catalog_stats_loop: %s", e)
+        await asyncio.sleep(Config.STATS_REFRESH_INTERVAL)
+
+
+def format_catalog_stats(snapshot: Dict) -> str:
+    """Renders the admin dashboard."""
+    total_titles = sum(snapshot["titles"].values())
+    age_minutes = int((datetime.utcnow() - snapshot["computed_at"]).total_seconds() // 60)
+
+    text = "📊 **Catalog Statistics**\n\n"
+    text += f"📚 **Titles:** {total_titles}\n"
+    for collection_name, label in CONTENT_TYPES.items():
+        text += f"   {label}: {snapshot['titles'].get(collection_name, 0)}\n"
+    dubbed_share = snapshot["dubbed"] / total_titles * 100 if total_titles else 0
+    text += f"🗣️ **Dubbed:** {snapshot['dubbed']} ({dubbed_share:.1f}%)\n\n"
+
+    text += f"💾 **Files:** {snapshot['files']}\n"
+    for quality, count in sorted(snapshot["qualities"].items(), key=lambda item: -item[1]):
+        text += f"   {quality}: {count}\n"
+    text += f"💀 **Dead links:** {snapshot['dead_files']}\n\n"
+
+    text += "📡 **Storage per Channel:**\n"
+    for channel_id, usage in sorted(snapshot["channels"].items(), key=lambda item: -item[1]["bytes"]):
+        text += f"   `{channel_id}`: {usage['files']} files, {format_file_size(usage['bytes'])}\n"
+
+    text += f"\n🔔 **Subscribers:** {snapshot['subscribers']}\n"
+    text += f"\n🕒 Updated {age_minutes} min ago."
+    return text
+
+
+# --- /stats Command ---
+@Client.on_message(filters.command("stats") & filters.user(Config.ADMIN_IDS) & filters.private)
+async def stats_command(client: Client, message: Message):
+    """Shows the precomputed catalog dashboard. Never aggregates on demand."""
+    try:
+        snapshot = _snapshot
+        if snapshot is None:
+            # Another instance may already have stored one
+            snapshot = await asyncio.to_thread(stats_snapshots.find_one, {"_id": SNAPSHOT_ID})
+        if snapshot is None:
+            await message.reply_text("⏳ Statistics are still being computed. Please try again in a minute.")
+            return
+        await message.reply_text(format_catalog_stats(snapshot))
+    except Exception as e:
+        logger.error("Error in stats_command: %s", e)
+        await message.reply_text("❌ An error occurred while loading statistics.")
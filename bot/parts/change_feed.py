@@ -0,0 +1,164 @@
+# bot/parts/change_feed.py
+"""
+Keeps the in-memory caches of every instance coherent with the catalog.
+
+Content written by another replica, a worker process or a CLI tool never runs
+this process's invalidators, so each instance follows a change feed and runs
+them itself. With a replica set the feed is a MongoDB change stream on the
+content collections, which also reports deletes. Elsewhere (a standalone
+server) the content collections are polled for documents whose updated_at is
+past a high-water mark; deletes are noticed from a shrinking document count
+and invalidate every cache. Changes arriving together are applied as one
+batch, and a burst larger than CHANGE_FEED_MAX_BATCH (a bulk import, a
+migration) invalidates everything once instead of title by title. The
+instance that made a change sees it again through the feed, which is
+harmless: every invalidator is idempotent.
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Set, Tuple
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+from config import Config
+from .caching import invalidate_content
+from .core_bot_functionality import db, CONTENT_COLLECTIONS
+
+logger = logging.getLogger(__name__)
+
+CONTENT_NAMES = [collection.name for collection in CONTENT_COLLECTIONS]
+STREAM_PIPELINE = [
+    {"$match": {
+        "ns.coll": {"$in": CONTENT_NAMES},
+        "operationType": {"$in": ["insert", "update", "replace", "delete"]},
+    }},
+    {"$project": {"documentKey": 1}},
+]
+# Seconds a change stream waits on the server for new events before returning an empty batch
+STREAM_AWAIT_SECONDS = 5
+RECONNECT_DELAY = 10
+
+
+def apply_changes(content_ids: Set[str], catalog_wide: bool = False):
+    """Runs the local invalidators for titles changed anywhere."""
+    if catalog_wide or len(content_ids) > Config.CHANGE_FEED_MAX_BATCH:
+        logger.info("Change feed: %s titles changed, invalidating every cache.", len(content_ids) or 'many')
+        invalidate_content()
+        return
+    for content_id in content_ids:
+        invalidate_content(content_id)
+
+
+# --- Change Streams ---
+def next_stream_batch(stream) -> Set[str]:
+    """
+    Waits up to STREAM_AWAIT_SECONDS for changes and returns the ids of every
+    changed title available right now. Stops early past CHANGE_FEED_MAX_BATCH. Blocking.
+    """
+    content_ids = set()
+    while len(content_ids) <= Config.CHANGE_FEED_MAX_BATCH:
+        change = stream.try_next()
+        if change is None:
+            break
+        content_ids.add(str(change["documentKey"]["_id"]))
+    return content_ids
+
+
+async def stream_changes():
+    """
+    Follows a change stream on the database, reconnecting after errors. Raises
+    OperationFailure if the server can't open change streams at all.
+    """
+    resume_token = None
+    while True:
+        try:
+            stream = await asyncio.to_thread(
+                db.watch, STREAM_PIPELINE, resume_after=resume_token,
+                max_await_time_ms=STREAM_AWAIT_SECONDS * 1000
+            )
+        except OperationFailure as e:
+            if resume_token is None:
+                raise
+            # The resume point fell off the oplog, so changes were missed
+            logger.warning("Change stream could not resume, invalidating every cache: %s", e)
+            apply_changes(set(), catalog_wide=True)
+            resume_token = None
+            continue
+        except PyMongoError as e:
+            logger.error("Error opening change stream, retrying in %ss: %s", RECONNECT_DELAY, e)
+            await asyncio.sleep(RECONNECT_DELAY)
+            continue
+
+        try:
+            with stream:
+                while stream.alive:
+                    content_ids = await asyncio.to_thread(next_stream_batch, stream)
+                    resume_token = stream.resume_token
+                    if content_ids:
+                        apply_changes(content_ids)
+        except PyMongoError as e:
+            logger.error("Change stream interrupted, resuming in %ss: %s", RECONNECT_DELAY, e)
+            await asyncio.sleep(RECONNECT_DELAY)
+
+
+# --- Polling ---
+class UpdatePoller:
+    """
+    Finds changed titles by their updated_at. Every poll re-reads CHANGE_FEED_POLL_LAG
+    seconds behind the newest timestamp seen, so writes that commit late or come from
+    an instance with a slightly slow clock aren't missed; titles already seen at the
+    same updated_at are skipped.
+    """
+    def __init__(self):
+        self.high_water = datetime.utcnow()
+        self.seen: Dict[str, datetime] = {}  # content id -> updated_at already applied
+        self.counts: Dict[str, int] = {}
+
+    def poll(self) -> Tuple[Set[str], bool]:
+        """Returns (changed content ids, whether titles were deleted). Blocking."""
+        since = self.high_water - timedelta(seconds=Config.CHANGE_FEED_POLL_LAG)
+        content_ids, deleted = set(), False
+        for collection in CONTENT_COLLECTIONS:
+            cursor = collection.find({"updated_at": {"$gte": since}}, {"updated_at": 1}).sort("updated_at", 1)
+            for doc in cursor:
+                content_id = str(doc["_id"])
+                if self.seen.get(content_id) != doc["updated_at"]:
+                    self.seen[content_id] = doc["updated_at"]
+                    content_ids.add(content_id)
+                self.high_water = max(self.high_water, doc["updated_at"])
+
+            count = collection.estimated_document_count()
+            deleted |= count < self.counts.get(collection.name, count)
+            self.counts[collection.name] = count
+
+        cutoff = self.high_water - timedelta(seconds=Config.CHANGE_FEED_POLL_LAG)
+        self.seen = {cid: updated_at for cid, updated_at in self.seen.items() if updated_at >= cutoff}
+        return content_ids, deleted
+
+
+async def poll_changes():
+    """Polls the content collections every CHANGE_FEED_POLL_INTERVAL seconds."""
+    poller = UpdatePoller()
+    while True:
+        try:
+            content_ids, deleted = await asyncio.to_thread(poller.poll)
+            if content_ids or deleted:
+                apply_changes(content_ids, catalog_wide=deleted)
+        except Exception as e:
+            logger.error("Error in poll_changes: %s", e)
+        await asyncio.sleep(Config.CHANGE_FEED_POLL_INTERVAL)
+
+
+async def change_feed_loop():
+    """Follows the change feed in the configured CHANGE_FEED_MODE ("auto" picks streams when available)."""
+    if Config.CHANGE_FEED_MODE in ("auto", "stream"):
+        try:
+            await stream_changes()
+        except OperationFailure as e:
+            if Config.CHANGE_FEED_MODE == "stream":
+                logger.error("Change streams are not available, caches only follow local writes: %s", e)
+                return
+            logger.info("Change streams are not available (%s), polling updated_at instead.", e)
+    await poll_changes()
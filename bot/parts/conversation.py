@@ -0,0 +1,53 @@
+# bot/parts/conversation.py
+"""
+Routes an admin's text replies to the handler of their session's current step.
+
+Steps that expect text register a handler with `@text_step(step)`. A single
+message handler looks the step up in a dict, so each reply costs one lookup,
+and it only matches while a step is waiting for text. Other admin messages,
+commands included, fall through to their own handlers. Replies from the same
+admin are handled one at a time under the session lock.
+"""
+
+import logging
+from typing import Callable, Dict
+
+from pyrogram import Client, filters
+from pyrogram.types import Message
+
+from config import Config
+from .core_bot_functionality import user_sessions, get_user_session
+
+logger = logging.getLogger(__name__)
+
+# step -> coroutine(client, message, session)
+TEXT_STEP_HANDLERS: Dict[str, Callable] = {}
+
+
+def text_step(step: str):
+    """Decorator registering a coroutine as the text reply handler for a conversation step."""
+    def decorator(func):
+        TEXT_STEP_HANDLERS[step] = func
+        return func
+    return decorator
+
+
+async def _awaiting_text(_, __, message: Message) -> bool:
+    session = user_sessions.get(message.from_user.id)
+    return session is not None and session.current_step in TEXT_STEP_HANDLERS
+
+awaiting_text = filters.create(_awaiting_text)
+
+
+@Client.on_message(
+    filters.text & filters.private & filters.user(Config.ADMIN_IDS) & ~filters.regex(r"^/") & awaiting_text
+)
+async def route_admin_text(client: Client, message: Message):
+    """Dispatches an admin's reply to the handler of their current step."""
+    session = get_user_session(message.from_user.id)
+    async with session.lock:
+        # The step may have moved on while this reply waited for the lock
+        handler = TEXT_STEP_HANDLERS.get(session.current_step)
+        if handler is None:
+            return
+        await handler(client, message, session)
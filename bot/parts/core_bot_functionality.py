@@ -1,5 +1,6 @@
 # bot/parts/core_bot_functionality.py
 
+import asyncio
 import logging
 import math
 from pymongo import MongoClient
@@ -7,44 +8,122 @@ from pyrogram import Client, filters
 from pyrogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton
 
 from config import Config
+from ..logging_pipeline import instrument
 
 # --- Setup ---
 logger = logging.getLogger(__name__)
 
 # --- Database Connection ---
+# Two connection profiles share the same database:
+# - the write profile (primary, majority write concern) for admin uploads, imports and queues;
+# - the read profile (secondary-preferred, tight timeouts, its own pool) for user-facing lookups.
+# connect=False defers the first connection to the first operation, so importing
+# this module never blocks. bot/startup.py pings the server off the event loop.
+def _write_concern_w(value: str):
+    """MongoDB accepts either a node count or a tag like 'majority' for w."""
+    return int(value) if value.isdigit() else value
+
 try:
-    mongo_client = MongoClient(Config.MONGO_URL)
+    mongo_client = MongoClient(
+        Config.MONGO_URL,
+        connect=False,
+        serverSelectionTimeoutMS=Config.MONGO_CONNECT_TIMEOUT_MS,
+        maxPoolSize=Config.MONGO_WRITE_POOL_SIZE,
+        w=_write_concern_w(Config.MONGO_WRITE_CONCERN),
+        wtimeoutMS=Config.MONGO_WRITE_TIMEOUT_MS
+    )
+    read_options = {}
+    if Config.MONGO_READ_MAX_STALENESS > 0:
+        read_options["maxStalenessSeconds"] = Config.MONGO_READ_MAX_STALENESS
+    read_client = MongoClient(
+        Config.MONGO_READ_URL or Config.MONGO_URL,
+        connect=False,
+        readPreference=Config.MONGO_READ_PREFERENCE,
+        maxPoolSize=Config.MONGO_READ_POOL_SIZE,
+        serverSelectionTimeoutMS=Config.MONGO_READ_TIMEOUT_MS,
+        socketTimeoutMS=Config.MONGO_READ_TIMEOUT_MS,
+        connectTimeoutMS=Config.MONGO_READ_TIMEOUT_MS,
+        **read_options
+    )
     db = mongo_client[Config.DATABASE_NAME]
     movies_collection = db.movies
     series_collection = db.series
     shows_collection = db.shows
-    logger.info("Successfully connected to MongoDB.")
+
+    read_db = read_client[Config.DATABASE_NAME]
+    movies_read = read_db.movies
+    series_read = read_db.series
+    shows_read = read_db.shows
+
+    CONTENT_COLLECTIONS = (movies_collection, series_collection, shows_collection)
+    READ_CONTENT_COLLECTIONS = (movies_read, series_read, shows_read)
+    logger.info("MongoDB clients configured.")
 except Exception as e:
-    logger.error(f"Error connecting to MongoDB: {e}")
+    logger.error("Error configuring MongoDB clients: %s", e)
     # The bot will likely fail to start, which is intended if the DB is down.
 
+# Version of the content document format written by the bot (see migrations.py)
+CONTENT_SCHEMA_VERSION = 2
+
+# Indexes backing the bot's lookups, created at startup (create_index is idempotent)
+CONTENT_INDEXES = [
+    [("media_files.msg_id", 1)],
+    [("name", 1), ("year", 1)],
+    [("created_at", -1)],
+    [("updated_at", -1)],
+]
+
+def ensure_indexes():
+    """Creates any missing indexes on the content collections. Blocking."""
+    for collection in CONTENT_COLLECTIONS:
+        for keys in CONTENT_INDEXES:
+            collection.create_index(keys)
+    logger.info("MongoDB indexes verified.")
+
 # --- Session Management ---
+# Steps of the upload conversation and the steps each one may move to. Text replies
+# are routed by step (see conversation.py); reset_data() returns to None from anywhere.
+UPLOAD_STEPS = {
+    None: ("waiting_for_names",),
+    "waiting_for_names": ("waiting_for_names", "processing_names"),
+    "processing_names": ("collecting_details",),
+    "collecting_details": (),
+}
+
 class MediaProcessor:
     """A class to hold the state of an admin's upload session."""
     def __init__(self):
+        # Serializes the admin's text replies so quick successive answers can't interleave
+        self.lock = asyncio.Lock()
         self.reset_data()
 
+    def advance(self, step: str):
+        """Moves the conversation to the next step, rejecting transitions UPLOAD_STEPS doesn't declare."""
+        if step not in UPLOAD_STEPS[self.current_step]:
+            raise ValueError(f"Invalid upload step transition: {self.current_step} -> {step}")
+        self.current_step = step
+
     def reset_data(self):
         """Resets all session data to default values."""
         self.entertainment_type = None
         self.names_to_process = []
         self.current_name_index = 0
         self.search_results = {}
-        self.selected_media = {}
+        self.selected_media = {}   # name -> set of selected result indices
+        self.result_streams = {}   # name -> async generator still producing results
+        self.result_groups = {}    # name -> {"q:<quality>" / "s:<season>": set of indices}
+        self.scan_mode = False     # full history scan instead of search (long series)
+        self.staged_items = {}     # name -> SeriesIngest whose files wait in the staging collection
         self.details = {}
         self.unavailable_list = []
         self.current_step = None # e.g., 'waiting_for_names', 'collecting_details'
         self.current_page = 0
-        self.total_pages = 0
         # For details collection
+        self.detail_names = []     # confirmed names, fixed when details collection starts
+        self.detail_fields = ()    # fields asked for every item, fixed by the content type
         self.current_detail_index = 0
         self.current_field_index = 0
-        logger.info("MediaProcessor session data has been reset.")
+        logger.debug("MediaProcessor session data has been reset.")
 
 
 # Global dictionary to store session objects for each admin user
@@ -57,6 +136,16 @@ def get_user_session(user_id: int) -> MediaProcessor:
     return user_sessions[user_id]
 
 # --- Helper Functions ---
+# The event loop only keeps weak references to tasks, so detached tasks are held here until they finish
+_detached_tasks = set()
+
+def run_detached(coro) -> asyncio.Task:
+    """Starts a coroutine that nobody awaits, keeping a reference so it isn't garbage collected mid-run."""
+    task = asyncio.create_task(coro)
+    _detached_tasks.add(task)
+    task.add_done_callback(_detached_tasks.discard)
+    return task
+
 def format_file_size(size_bytes: int) -> str:
     """Formats file size into a human-readable string."""
     if size_bytes is None or size_bytes == 0:
@@ -67,6 +156,27 @@ def format_file_size(size_bytes: int) -> str:
     s = round(size_bytes / p, 2)
     return f"{s} {size_names[i]}"
 
+# Media quality is stored as an integer code (the vertical resolution) so it can be
+# sorted and filtered numerically; 0 means the quality couldn't be detected
+QUALITY_LABELS = {0: "HD", 360: "360P", 480: "480P", 720: "720P", 1080: "1080P", 2160: "4K"}
+QUALITY_CODES = {label: code for code, label in QUALITY_LABELS.items()}
+QUALITY_CODES["UNKNOWN"] = 0
+
+def quality_code(label) -> int:
+    """Converts a quality label such as "720P" to its stored code. Codes pass through."""
+    if isinstance(label, int):
+        return label
+    return QUALITY_CODES.get(str(label or "").upper(), 0)
+
+def media_quality_label(media: dict) -> str:
+    """Display label for a media entry's quality, for both the compact and the legacy format."""
+    quality = media.get("quality")
+    return QUALITY_LABELS.get(quality, "HD") if isinstance(quality, int) else (quality or "HD")
+
+def media_size_label(media: dict) -> str:
+    """Display size for a media entry; compact entries only store size_bytes."""
+    return media.get("size") or format_file_size(media.get("size_bytes"))
+
 def get_collection_by_type(entertainment_type: str):
     """Returns the appropriate MongoDB collection based on the entertainment type."""
     collections = {
@@ -77,18 +187,9 @@ def get_collection_by_type(entertainment_type: str):
     }
     return collections.get(entertainment_type, movies_collection)
 
-# --- Core Command Handlers ---
-@Client.on_message(filters.command("start") & filters.private)
-async def start_command(client: Client, message: Message):
-    """Handles the /start command."""
-    try:
-        # Check if it's a deep link for a media request
-        if len(message.command) > 1 and message.command[1].startswith("media-"):
-            from .user_features import handle_media_request # Avoid circular import
-            await handle_media_request(client, message)
-            return
-
-        welcome_text = """
+# --- Static Menus ---
+# These never change while the bot runs, so they are built once at import time.
+WELCOME_TEXT = """
 🎬 **Welcome to the Kannada Entertainment Bot!** 🎬
 
 Your ultimate destination for Kannada Movies, Web Series, TV Shows, and much more.
@@ -100,26 +201,22 @@ Your ultimate destination for Kannada Movies, Web Series, TV Shows, and much mor
 
 Ready to dive in? Choose an option below to get started!
         """
-        keyboard = InlineKeyboardMarkup([
-            [InlineKeyboardButton("🔍 Search Content", callback_data="search_content")],
-            [
-                InlineKeyboardButton("📺 Latest Movies", callback_data="latest_movies"),
-                InlineKeyboardButton("🎭 Latest Series", callback_data="latest_series")
-            ],
-            [InlineKeyboardButton("🌐 Visit Our Blog", url=Config.BLOG_URL)],
-            [InlineKeyboardButton("ℹ️ Help", callback_data="help_menu")]
-        ])
-        await message.reply_text(welcome_text, reply_markup=keyboard)
-    except Exception as e:
-        logger.error(f"Error in start_command: {e}")
-        await message.reply_text("❌ An error occurred. Please try again later.")
 
+START_KEYBOARD = InlineKeyboardMarkup([
+    [InlineKeyboardButton("🔍 Search Content", callback_data="search_content")],
+    [
+        InlineKeyboardButton("⚡ Quick Search", switch_inline_query_current_chat=""),
+        InlineKeyboardButton("🔥 Trending", callback_data="trending")
+    ],
+    [
+        InlineKeyboardButton("📺 Latest Movies", callback_data="latest_movies"),
+        InlineKeyboardButton("🎭 Latest Series", callback_data="latest_series")
+    ],
+    [InlineKeyboardButton("🌐 Visit Our Blog", url=Config.BLOG_URL)],
+    [InlineKeyboardButton("ℹ️ Help", callback_data="help_menu")]
+])
 
-@Client.on_message(filters.command("help") & filters.private)
-async def help_command(client: Client, message: Message):
-    """Handles the /help command."""
-    try:
-        help_text = """
+HELP_TEXT = """
 ℹ️ **Bot Help & Features**
 
 This bot helps you discover and download Kannada entertainment content easily.
@@ -128,7 +225,10 @@ This bot helps you discover and download Kannada entertainment content easily.
 • `/start` - Welcome message and main menu.
 • `/search` - The main way to find content. You can search by name, actor, genre, year, or for dubbed content.
 • `/latest` - Quickly see the most recently added movies and series.
+• `/trending` - See what everyone is watching right now.
+• `/subscribe` - Get notified about new uploads (all, or by genre or actor).
 • `/help` - Shows this help message.
+• `@{bot} <name>` - Search instantly from any chat (inline mode).
 
 **Features:**
 ✅ **Smart Search:** Find exactly what you're looking for.
@@ -138,12 +238,40 @@ This bot helps you discover and download Kannada entertainment content easily.
 ✅ **Blog Integration:** Visit our blog for a web-based browsing experience.
 
 If you encounter any issues, please contact an admin.
-        """
-        keyboard = InlineKeyboardMarkup([
-            [InlineKeyboardButton("🔍 Start Searching", callback_data="search_content")],
-            [InlineKeyboardButton("🌐 Visit Our Blog", url=Config.BLOG_URL)]
-        ])
-        await message.reply_text(help_text, reply_markup=keyboard)
+        """.replace("{bot}", Config.BOT_USERNAME or "bot")
+
+HELP_KEYBOARD = InlineKeyboardMarkup([
+    [InlineKeyboardButton("🔍 Start Searching", callback_data="search_content")],
+    [InlineKeyboardButton("🌐 Visit Our Blog", url=Config.BLOG_URL)]
+])
+
+# --- Core Command Handlers ---
+@Client.on_message(filters.command("start") & filters.private)
+@instrument
+async def start_command(client: Client, message: Message):
+    """Handles the /start command."""
+    try:
+        # Check if it's a deep link for a media request
+        if len(message.command) > 1 and message.command[1].startswith("media-"):
+            from .user_features import handle_media_request # Avoid circular import
+            await handle_media_request(client, message)
+            return
+        if len(message.command) > 1 and message.command[1].startswith("pack-"):
+            from .season_packs import handle_pack_request # Avoid circular import
+            await handle_pack_request(client, message)
+            return
+
+        await message.reply_text(WELCOME_TEXT, reply_markup=START_KEYBOARD)
+    except Exception as e:
+        logger.error("Error in start_command: %s", e)
+        await message.reply_text("❌ An error occurred. Please try again later.")
+
+
+@Client.on_message(filters.command("help") & filters.private)
+async def help_command(client: Client, message: Message):
+    """Handles the /help command."""
+    try:
+        await message.reply_text(HELP_TEXT, reply_markup=HELP_KEYBOARD)
     except Exception as e:
-        logger.error(f"Error in help_command: {e}")
+        logger.error("Error in help_command: %s", e)
         await message.reply_text("❌ An error occurred. Please try again later.")
@@ -1,32 +1,72 @@
 # bot/parts/details_collection.py
 
+import asyncio
 import logging
 import uuid
 from typing import List, Dict
 from datetime import datetime
 import re
 
-from pyrogram import Client, filters
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pyrogram import Client
 from pyrogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
 
 # The missing import is added here
 from config import Config
-from .core_bot_functionality import get_user_session, get_collection_by_type
+from .core_bot_functionality import (
+    get_user_session, get_collection_by_type, quality_code, CONTENT_SCHEMA_VERSION, MediaProcessor
+)
+from .conversation import text_step
+from .job_queue import job_handler, enqueue_job
+from .admin_upload import dedupe_results
+from .media_registry import assign_registered_ids, register_media
+from .caching import invalidate_content
 
 logger = logging.getLogger(__name__)
 
 # A temporary dictionary to hold media while waiting for admin quality selection
 temp_media_for_quality_check = {}
 
+def confirmed_names(session) -> List[str]:
+    """Names with selected search results or a staged history scan, in the order they were entered."""
+    return [
+        name for name in session.names_to_process
+        if session.selected_media.get(name) or name in session.staged_items
+    ]
+
 # --- Step 5: Start Details Collection ---
+BASE_FIELDS = ("name", "year", "language", "genre", "actors", "poster_link", "description")
+# Fields asked for each item, by entertainment type
+DETAIL_FIELDS = {
+    "movies": BASE_FIELDS + ("director",),
+    "webseries": BASE_FIELDS + ("seasons", "episodes"),
+    "tvseries": BASE_FIELDS + ("seasons", "episodes"),
+    "shows": BASE_FIELDS + ("seasons", "episodes"),
+}
+DETAIL_PROMPTS = {
+    "year": "📅 **Release Year** (e.g., `2023`):",
+    "language": "🗣️ **Language(s)** (e.g., `Kannada`, `Kannada Dub`):",
+    "genre": "🎭 **Genre(s)** (comma-separated, e.g., `Action, Thriller`):",
+    "actors": "👥 **Main Actors** (comma-separated):",
+    "poster_link": "🖼️ **Poster URL** (direct link to an image):",
+    "description": "📖 **Plot/Description**:",
+    "director": "🎬 **Director's Name**:",
+    "seasons": "📺 **Total Seasons**:",
+    "episodes": "📋 **Total Episodes**:",
+}
+SKIP_VALUES = {"none", "skip", "unknown", "n/a"}
+
 async def ask_for_details(client: Client, message: Message, user_id: int):
     """Initiates the process of collecting details for the processed items."""
     session = get_user_session(user_id)
-    session.current_step = "collecting_details"
-    
-    processed_names = [name for i, name in enumerate(session.names_to_process) if session.selected_media.get(name)]
+    session.advance("collecting_details")
+
+    # The items and their fields are fixed for the rest of the conversation
+    session.detail_names = confirmed_names(session)
+    session.detail_fields = DETAIL_FIELDS.get(session.entertainment_type, DETAIL_FIELDS["shows"])
 
-    if not processed_names:
+    if not session.detail_names:
         summary_text = "✅ **Search Process Completed!**\n\nNo items with selected files were found."
         if session.unavailable_list:
             summary_text += f"\n\n**Unavailable Items:**\n`{', '.join(session.unavailable_list)}`"
@@ -36,7 +76,7 @@ async def ask_for_details(client: Client, message: Message, user_id: int):
 
     summary_text = (
         f"✅ **Search Process Completed!**\n\n"
-        f"Now collecting details for the **{len(processed_names)}** item(s) you confirmed.\n\n"
+        f"Now collecting details for the **{len(session.detail_names)}** item(s) you confirmed.\n\n"
         "💡 **Tip:** If you don't know a detail, just send `none`, `skip`, or `unknown`."
     )
     await client.send_message(user_id, summary_text)
@@ -50,88 +90,52 @@ async def ask_for_details(client: Client, message: Message, user_id: int):
 async def collect_next_detail(client: Client, message: Message, user_id: int):
     """Asks the admin for the next piece of information required."""
     session = get_user_session(user_id)
-    
-    processed_names = [name for i, name in enumerate(session.names_to_process) if session.selected_media.get(name)]
-
-    # Check if we are done with all items
-    if session.current_detail_index >= len(processed_names):
-        await finalize_upload(client, message, user_id)
-        return
-
-    current_item_name = processed_names[session.current_detail_index]
-    ent_type = session.entertainment_type
 
-    # Define fields based on entertainment type
-    base_fields = ["name", "year", "language", "genre", "actors", "poster_link", "description"]
-    if ent_type == "movies":
-        fields = base_fields + ["director"]
-    else: # Series, Shows
-        fields = base_fields + ["seasons", "episodes"]
-    
     # Check if we are done with all fields for the current item
-    if session.current_field_index >= len(fields):
+    if session.current_field_index >= len(session.detail_fields):
         session.current_detail_index += 1
         session.current_field_index = 0
-        await collect_next_detail(client, message, user_id) # Move to next item
+
+    # Check if we are done with all items
+    if session.current_detail_index >= len(session.detail_names):
+        await finalize_upload(client, message, user_id)
         return
 
-    current_field = fields[session.current_field_index]
-    
-    prompts = {
-        "name": f"📝 **Full Name** (default: `{current_item_name}`):",
-        "year": "📅 **Release Year** (e.g., `2023`):",
-        "language": "🗣️ **Language(s)** (e.g., `Kannada`, `Kannada Dub`):",
-        "genre": "🎭 **Genre(s)** (comma-separated, e.g., `Action, Thriller`):",
-        "actors": "👥 **Main Actors** (comma-separated):",
-        "poster_link": "🖼️ **Poster URL** (direct link to an image):",
-        "description": "📖 **Plot/Description**:",
-        "director": "🎬 **Director's Name**:",
-        "seasons": "📺 **Total Seasons**:",
-        "episodes": "📋 **Total Episodes**:",
-    }
+    current_item_name = session.detail_names[session.current_detail_index]
+    current_field = session.detail_fields[session.current_field_index]
+
+    progress_text = f"📊 **Collecting Details for:** `{current_item_name}` ({session.current_detail_index + 1}/{len(session.detail_names)})\n\n"
+    if current_field == "name":
+        prompt_text = f"📝 **Full Name** (default: `{current_item_name}`):"
+    else:
+        prompt_text = DETAIL_PROMPTS.get(current_field, f"Enter {current_field.replace('_', ' ')}:")
 
-    progress_text = f"📊 **Collecting Details for:** `{current_item_name}` ({session.current_detail_index + 1}/{len(processed_names)})\n\n"
-    prompt_text = prompts.get(current_field, f"Enter {current_field.replace('_', ' ')}:")
-    
     await client.send_message(user_id, progress_text + prompt_text)
 
 # --- Step 6: Handle Detail Input ---
-@Client.on_message(filters.text & filters.user(Config.ADMIN_IDS) & filters.private)
-async def handle_detail_input(client: Client, message: Message):
+@text_step("collecting_details")
+async def handle_detail_input(client: Client, message: Message, session: MediaProcessor):
     """Handles the admin's text responses for each detail."""
-    user_id = message.from_user.id
-    session = get_user_session(user_id)
-
-    if session.current_step != "collecting_details":
-        return
-
     try:
         value = message.text.strip()
-        if value.lower() in ["none", "skip", "unknown", "n/a"]:
+        if value.lower() in SKIP_VALUES:
             value = None # Use None to represent unknown values
 
         # --- Get current context ---
-        processed_names = [name for i, name in enumerate(session.names_to_process) if session.selected_media.get(name)]
-        current_item_name = processed_names[session.current_detail_index]
-        ent_type = session.entertainment_type
-        
-        base_fields = ["name", "year", "language", "genre", "actors", "poster_link", "description"]
-        fields = base_fields + (["director"] if ent_type == "movies" else ["seasons", "episodes"])
-        current_field = fields[session.current_field_index]
+        current_item_name = session.detail_names[session.current_detail_index]
+        current_field = session.detail_fields[session.current_field_index]
 
-        # Initialize details dict for the item if it doesn't exist
-        if current_item_name not in session.details:
-            session.details[current_item_name] = {"original_search_name": current_item_name}
+        # Store the value, creating the item's details on its first answer
+        session.details.setdefault(
+            current_item_name, {"original_search_name": current_item_name}
+        )[current_field] = value
 
-        # Store the value
-        session.details[current_item_name][current_field] = value
-        
         # Move to the next field
         session.current_field_index += 1
-        await collect_next_detail(client, message, user_id)
+        await collect_next_detail(client, message, message.from_user.id)
 
     except Exception as e:
-        logger.error(f"Error in handle_detail_input: {e}")
+        logger.error("Error in handle_detail_input: %s", e)
         await message.reply_text("❌ An error occurred. Please try providing the detail again.")
 
 # --- Step 7: Finalize and Save to DB ---
@@ -142,83 +146,49 @@ async def finalize_upload(client: Client, message: Message, user_id: int):
     
     saved_count = 0
     error_count = 0
+    queued_count = 0
 
     try:
         # Loop through all the details we collected
         for item_name, details in session.details.items():
             try:
-                collection = get_collection_by_type(session.entertainment_type)
-                
-                # Prepare media files, checking for quality
-                media_files_raw = [session.search_results[item_name][i] for i in session.selected_media[item_name]]
-                processed_media_files = []
-
-                for media in media_files_raw:
-                    unique_id = str(uuid.uuid4())
-                    
-                    if media["quality"] == "UNKNOWN":
-                        logger.warning(f"Quality for '{media['file_name']}' is UNKNOWN. Defaulting to 'HD'.")
-                        media["quality"] = "HD"
-
-                    # For series, extract season/episode info
-                    season, episode = 1, 1
-                    if session.entertainment_type != "movies":
-                        season, episode = extract_season_episode(media["file_name"] + media["caption"])
-
-                    processed_media_files.append({
-                        "msg_id": unique_id,
-                        "original_msg_id": media["message_id"],
-                        "channel_id": media["channel_id"],
-                        "file_name": media["file_name"],
-                        "caption": media["caption"],
-                        "quality": media["quality"],
-                        "size": media["size_str"],
-                        "telegram_link": media["link"],
-                        "season": season,
-                        "episode": episode
-                    })
-
-                # --- Construct the database document ---
-                doc = {
-                    "name": details.get("name") or item_name,
-                    "year": int(details["year"]) if details.get("year", "").isdigit() else None,
-                    "language": details.get("language"),
-                    "is_dubbed": "dub" in (details.get("language") or "").lower(),
-                    "genre": [g.strip() for g in details.get("genre", "").split(",")] if details.get("genre") else [],
-                    "actors": [a.strip() for a in details.get("actors", "").split(",")] if details.get("actors") else [],
-                    "poster_url": details.get("poster_link"),
-                    "description": details.get("description"),
-                    "media_files": processed_media_files,
-                    "created_at": datetime.utcnow(),
-                    "updated_at": datetime.utcnow()
-                }
-
-                if session.entertainment_type == "movies":
-                    doc["director"] = details.get("director")
+                ingest = session.staged_items.get(item_name)
+                if ingest:
+                    # History scans keep their files in staging and are merged in chunks
+                    doc = build_content_doc(details, item_name, [], session.entertainment_type)
+                    if Config.JOB_QUEUE_ENABLED:
+                        await asyncio.to_thread(
+                            enqueue_job, "finalize_series",
+                            {"doc": doc, "ent_type": session.entertainment_type, "ingest_id": ingest.ingest_id}, priority=1
+                        )
+                        queued_count += 1
+                    else:
+                        from .series_ingest import save_staged_series # Avoid circular import
+                        await save_staged_series(client, message, doc, session.entertainment_type, ingest.ingest_id)
+                        saved_count += 1
+                    continue
+
+                media_files_raw = [session.search_results[item_name][i] for i in sorted(session.selected_media[item_name])]
+                processed_media_files = build_media_entries(media_files_raw, session.entertainment_type)
+                doc = build_content_doc(details, item_name, processed_media_files, session.entertainment_type)
+
+                if Config.JOB_QUEUE_ENABLED:
+                    # Persistence and publishing run in a worker process (see worker.py)
+                    await asyncio.to_thread(enqueue_job, "finalize_item", {"doc": doc, "ent_type": session.entertainment_type}, priority=1)
+                    queued_count += 1
                 else:
-                    doc["total_seasons"] = int(details.get("seasons")) if details.get("seasons", "").isdigit() else None
-                    doc["total_episodes"] = int(details.get("episodes")) if details.get("episodes", "").isdigit() else None
-                    doc["seasons_data"] = organize_episodes_by_season(processed_media_files)
-
-                # Insert or update in the database
-                collection.update_one(
-                    {"name": doc["name"], "year": doc["year"]},
-                    {"$set": doc},
-                    upsert=True
-                )
-                saved_count += 1
-                
-                # --- Trigger Blogger Update ---
-                from .blogger_integration import update_blogger_site
-                await update_blogger_site(client, message, doc, session.entertainment_type)
+                    await save_content_item(client, message, doc, session.entertainment_type)
+                    saved_count += 1
 
             except Exception as item_error:
-                logger.error(f"Error saving item '{item_name}': {item_error}")
+                logger.error("Error saving item '%s': %s", item_name, item_error)
                 error_count += 1
 
         # --- Final Report ---
         completion_text = f"✅ **Upload Process Completed!**\n\n"
         completion_text += f"💾 **Saved to Database:** {saved_count} items\n"
+        if queued_count > 0:
+            completion_text += f"📬 **Queued for Saving:** {queued_count} items\n"
         if error_count > 0:
             completion_text += f"❌ **Errors:** {error_count} items failed to save.\n"
         if session.unavailable_list:
@@ -228,11 +198,115 @@ async def finalize_upload(client: Client, message: Message, user_id: int):
         await progress_msg.edit_text(completion_text)
 
     except Exception as e:
-        logger.error(f"Critical error in finalize_upload: {e}")
+        logger.error("Critical error in finalize_upload: %s", e)
         await progress_msg.edit_text("❌ A critical error occurred during the finalization process. Check logs.")
     finally:
         session.reset_data()
 
+def build_media_entries(media_files_raw: List[Dict], ent_type: str) -> List[Dict]:
+    """Turns selected channel search results into the media entries stored on a content document."""
+    processed_media_files = []
+    # Merge any reposts of the same file that slipped through, keeping one entry per file
+    for media in dedupe_results(media_files_raw):
+        unique_id = str(uuid.uuid4())
+
+        if media["quality"] == "UNKNOWN":
+            logger.warning("Quality for '%s' is UNKNOWN. Defaulting to 'HD'.", media['file_name'])
+
+        # For series, extract season/episode info
+        season, episode = 1, 1
+        if ent_type != "movies":
+            season, episode = extract_season_episode(media["file_name"] + media["caption"])
+
+        processed_media_files.append({
+            "msg_id": unique_id,
+            "original_msg_id": media["message_id"],
+            "channel_id": media["channel_id"],
+            "file_name": media["file_name"],
+            # Compact format: integer quality code and byte size, labels are derived when rendering
+            "quality": quality_code(media["quality"]),
+            "size_bytes": int(media.get("size_bytes") or 0),
+            "file_unique_id": media.get("file_unique_id"),
+            "dedup_key": media["dedup_key"],
+            # Other channels holding the same file, tried in order if the preferred copy fails
+            "fallbacks": [
+                {"channel_id": copy["channel_id"], "original_msg_id": copy["message_id"]}
+                for copy in media.get("fallbacks", [])
+            ],
+            "season": season,
+            "episode": episode
+        })
+    return processed_media_files
+
+def _as_int(value) -> int | None:
+    """Parses a collected detail as an integer, or None if it was skipped or isn't a number."""
+    value = str(value or "").strip()
+    return int(value) if value.isdigit() else None
+
+def build_content_doc(details: Dict, item_name: str, media_files: List[Dict], ent_type: str) -> Dict:
+    """Builds the database document for one item from its collected details and media entries."""
+    doc = {
+        "name": details.get("name") or item_name,
+        "year": _as_int(details.get("year")),
+        "language": details.get("language"),
+        "is_dubbed": "dub" in (details.get("language") or "").lower(),
+        "genre": [g.strip() for g in details.get("genre", "").split(",")] if details.get("genre") else [],
+        "actors": [a.strip() for a in details.get("actors", "").split(",")] if details.get("actors") else [],
+        "poster_url": details.get("poster_link"),
+        "description": details.get("description"),
+        "media_files": media_files,
+        "schema_version": CONTENT_SCHEMA_VERSION,
+        "created_at": datetime.utcnow(),
+        "updated_at": datetime.utcnow()
+    }
+
+    if ent_type == "movies":
+        doc["director"] = details.get("director")
+    else:
+        doc["total_seasons"] = _as_int(details.get("seasons"))
+        doc["total_episodes"] = _as_int(details.get("episodes"))
+        doc["seasons_data"] = organize_episodes_by_season(media_files)
+    return doc
+
+async def save_content_item(client: Client, message: Message | None, doc: Dict, ent_type: str):
+    """Upserts a content document, refreshes dependent caches and publishes it to the blog."""
+    collection = get_collection_by_type(ent_type)
+
+    # Keep deep links stable for files that were already registered
+    await asyncio.to_thread(assign_registered_ids, [doc])
+
+    # Insert or update in the database
+    content_id, is_new = await asyncio.to_thread(upsert_content_doc, collection, doc)
+    await asyncio.to_thread(register_media, [doc], collection.name)
+
+    # Rendered views and search indexes must pick up the new version
+    invalidate_content(str(content_id))
+
+    # --- Trigger Blogger Update ---
+    from .blogger_integration import update_blogger_site
+    await update_blogger_site(client, message, doc, ent_type)
+
+    if is_new:
+        from .subscriptions import announce_new_content # Avoid circular import
+        await announce_new_content(client, doc, str(content_id))
+
+def upsert_content_doc(collection, doc: Dict):
+    """Upserts a content document by name and year. Returns (its _id, whether it was new). Blocking."""
+    new_id = ObjectId()
+    before = collection.find_one_and_update(
+        {"name": doc["name"], "year": doc["year"]},
+        {"$set": doc, "$setOnInsert": {"_id": new_id}},
+        projection={"_id": 1},
+        upsert=True,
+        return_document=ReturnDocument.BEFORE
+    )
+    return (new_id, True) if before is None else (before["_id"], False)
+
+@job_handler("finalize_item")
+async def finalize_item_job(client: Client, payload: Dict, job: Dict):
+    """Worker-side persistence and publishing of one finalized upload item."""
+    await save_content_item(client, None, payload["doc"], payload["ent_type"])
+
 def extract_season_episode(text: str) -> (int, int):
     """Extracts season and episode number from text using regex."""
     text = text.lower()
@@ -242,11 +316,15 @@ def extract_season_episode(text: str) -> (int, int):
     return 1, 1
 
 def organize_episodes_by_season(media_files: List[Dict]) -> Dict:
-    """Organizes a flat list of media files into a nested dictionary by season and episode."""
+    """
+    Organizes a flat list of media files into a nested dictionary by season and episode.
+    Episodes reference their files by msg_id; the entries themselves live in media_files.
+    """
     seasons = {}
     for media in media_files:
-        season_num = media.get("season", 1)
-        episode_num = media.get("episode", 1)
+        # MongoDB documents only allow string keys
+        season_num = str(media.get("season", 1))
+        episode_num = str(media.get("episode", 1))
 
         if season_num not in seasons:
             seasons[season_num] = {"episodes": {}}
@@ -254,5 +332,5 @@ def organize_episodes_by_season(media_files: List[Dict]) -> Dict:
         if episode_num not in seasons[season_num]["episodes"]:
             seasons[season_num]["episodes"][episode_num] = {"files": []}
         
-        seasons[season_num]["episodes"][episode_num]["files"].append(media)
+        seasons[season_num]["episodes"][episode_num]["files"].append(media["msg_id"])
     return seasons
@@ -0,0 +1,383 @@
+# bot/parts/inline_search.py
+
+import asyncio
+import bisect
+import heapq
+import logging
+import re
+import time
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from bson import ObjectId
+from pyrogram import Client
+from pyrogram.types import (
+    InlineQuery, InlineQueryResultArticle, InputTextMessageContent,
+    InlineKeyboardMarkup, InlineKeyboardButton
+)
+
+from config import Config
+from ..logging_pipeline import instrument
+from .caching import TTLCache, register_invalidator
+from .core_bot_functionality import CONTENT_COLLECTIONS, READ_CONTENT_COLLECTIONS, media_quality_label, media_size_label, run_detached
+from .suggestions import SymSpell, edit_distance
+
+logger = logging.getLogger(__name__)
+
+# Only the fields needed to render an inline result are loaded into the index
+INDEX_PROJECTION = {
+    "name": 1, "year": 1, "language": 1, "genre": 1, "poster_url": 1, "actors": 1,
+    "media_files.msg_id": 1, "media_files.quality": 1, "media_files.size": 1, "media_files.size_bytes": 1,
+    "media_files.dead": 1,
+    "created_at": 1
+}
+MAX_DOWNLOAD_BUTTONS = 8
+
+
+def normalize_text(text: str) -> str:
+    """Lowercases text and collapses everything that isn't a letter or digit into single spaces."""
+    return " ".join(re.sub(r"[^\w]+", " ", (text or "").lower()).split())
+
+
+# --- Title Index ---
+class TitleIndex:
+    """
+    An in-memory token index over the titles and actor names in the movies/series/shows
+    collections, with a spelling index over the same tokens for "did you mean" corrections.
+    """
+    def __init__(self):
+        self.entries = {}        # content_id -> entry dict
+        self.token_ids = {}      # token -> set of content ids
+        self.sorted_tokens = []  # sorted token list for prefix lookups
+        self.latest = []         # content ids, newest first
+        self.spelling = SymSpell()
+        self.built_at = 0.0
+
+    @staticmethod
+    def make_entry(doc: dict, collection_name: str) -> dict:
+        """Builds the compact index entry for a content document."""
+        return {
+            "id": str(doc["_id"]),
+            "name": doc.get("name") or "Untitled",
+            "norm_name": normalize_text(doc.get("name")),
+            "norm_actors": normalize_text(" ".join(doc.get("actors") or [])),
+            "year": doc.get("year"),
+            "language": doc.get("language"),
+            "genre": doc.get("genre") or [],
+            "poster_url": doc.get("poster_url"),
+            "collection": collection_name,
+            "media": [
+                (m.get("msg_id"), media_quality_label(m), media_size_label(m))
+                for m in [m for m in doc.get("media_files") or [] if not m.get("dead")][:MAX_DOWNLOAD_BUTTONS]
+            ],
+            "created_at": doc.get("created_at"),
+            "result": None,  # the rendered InlineQueryResultArticle, built on first use
+        }
+
+    @staticmethod
+    def entry_tokens(entry: dict) -> set:
+        """The searchable tokens of an entry: its title words and its actors' names."""
+        return set(entry["norm_name"].split()) | set(entry["norm_actors"].split())
+
+    @classmethod
+    def build(cls) -> "TitleIndex":
+        """Loads every content document and builds a fresh index. Blocking; run it off the event loop."""
+        index = cls()
+        for collection in READ_CONTENT_COLLECTIONS:
+            for doc in collection.find({}, INDEX_PROJECTION):
+                entry = cls.make_entry(doc, collection.name)
+                index.entries[entry["id"]] = entry
+                for token in cls.entry_tokens(entry):
+                    index.token_ids.setdefault(token, set()).add(entry["id"])
+        index.sorted_tokens = sorted(index.token_ids)
+        for token, ids in index.token_ids.items():
+            index.spelling.add(token, len(ids))
+        index.latest = sorted(
+            index.entries,
+            key=lambda cid: index.entries[cid]["created_at"] or datetime.min,
+            reverse=True
+        )
+        index.built_at = time.monotonic()
+        return index
+
+    def upsert(self, doc: dict, collection_name: str):
+        """Adds or replaces a single title in place, keeping the spelling index in step."""
+        entry = self.make_entry(doc, collection_name)
+        old = self.entries.get(entry["id"])
+        old_tokens = self.entry_tokens(old) if old else set()
+        new_tokens = self.entry_tokens(entry)
+
+        for token in old_tokens - new_tokens:
+            self.token_ids[token].discard(entry["id"])
+            self.spelling.remove(token)
+            if not self.token_ids[token]:
+                # No title uses it anymore, so prefix scans and snapshots shouldn't carry it
+                del self.token_ids[token]
+                del self.sorted_tokens[bisect.bisect_left(self.sorted_tokens, token)]
+        for token in new_tokens - old_tokens:
+            if token not in self.token_ids:
+                self.token_ids[token] = set()
+                bisect.insort(self.sorted_tokens, token)
+            self.token_ids[token].add(entry["id"])
+            self.spelling.add(token)
+
+        self.entries[entry["id"]] = entry
+        if old is None:
+            self.latest.insert(0, entry["id"])
+
+    def _ids_for_prefix(self, prefix: str) -> set:
+        """Returns the ids of all titles containing a token that starts with the prefix."""
+        ids = set()
+        pos = bisect.bisect_left(self.sorted_tokens, prefix)
+        while pos < len(self.sorted_tokens) and self.sorted_tokens[pos].startswith(prefix):
+            ids |= self.token_ids[self.sorted_tokens[pos]]
+            pos += 1
+        return ids
+
+    def search(self, norm_query: str) -> List[str]:
+        """Returns ranked content ids whose titles match every query token (the last one as a prefix)."""
+        if not norm_query:
+            return list(self.latest)
+
+        tokens = norm_query.split()
+        matches = None
+        for i, token in enumerate(tokens):
+            ids = self._ids_for_prefix(token) if i == len(tokens) - 1 else set(self.token_ids.get(token, ()))
+            matches = ids if matches is None else matches & ids
+            if not matches:
+                return []
+
+        def rank(cid):
+            entry = self.entries[cid]
+            name = entry["norm_name"]
+            return (
+                name != norm_query,
+                not name.startswith(norm_query),
+                -(entry["year"] or 0),
+                name
+            )
+        return sorted(matches, key=rank)
+
+    def suggest(self, norm_query: str, limit: int = Config.SUGGESTION_COUNT) -> List[str]:
+        """
+        Returns up to `limit` corrected queries that have matches, e.g. "kanthara" -> "kantara".
+        Unknown tokens are replaced by their closest known tokens; the last token is left
+        alone while it still prefixes a known one, since the user may still be typing it.
+        """
+        tokens = norm_query.split()
+        options = []
+        for i, token in enumerate(tokens):
+            known = bool(self.token_ids.get(token)) or (i == len(tokens) - 1 and self._ids_for_prefix(token))
+            options.append([token] if known else self.spelling.lookup(token))
+            if not options[-1]:
+                return []
+
+        # Combinations are tried best first by total edit distance, and at most
+        # SUGGESTION_MAX_TRIES of them: their number grows exponentially with the tokens
+        costs = [
+            [edit_distance(token, option, Config.SUGGESTION_MAX_DISTANCE) for option in token_options]
+            for token, token_options in zip(tokens, options)
+        ]
+        start = (0,) * len(options)
+        heap, seen = [(sum(c[0] for c in costs), start)], {start}
+        suggestions, tries = [], 0
+        while heap and tries < Config.SUGGESTION_MAX_TRIES:
+            cost, picks = heapq.heappop(heap)
+            tries += 1
+            corrected = " ".join(options[i][j] for i, j in enumerate(picks))
+            if corrected != norm_query and self.search(corrected):
+                suggestions.append(corrected)
+                if len(suggestions) >= limit:
+                    break
+            for i, j in enumerate(picks):
+                if j + 1 < len(options[i]):
+                    following = picks[:i] + (j + 1,) + picks[i + 1:]
+                    if following not in seen:
+                        seen.add(following)
+                        heapq.heappush(heap, (cost - costs[i][j] + costs[i][j + 1], following))
+        return suggestions
+
+
+_title_index: Optional[TitleIndex] = None
+_index_stale = True
+_rebuild_task: Optional[asyncio.Task] = None
+_query_cache = TTLCache(maxsize=Config.INLINE_QUERY_CACHE_SIZE, ttl=Config.INLINE_QUERY_CACHE_TTL)
+
+
+async def rebuild_title_index() -> TitleIndex:
+    """Rebuilds the title index in a worker thread and swaps it in atomically."""
+    global _title_index, _index_stale
+    started = time.monotonic()
+    _index_stale = False
+    index = await asyncio.to_thread(TitleIndex.build)
+    _title_index = index
+    _query_cache.clear()
+    logger.info("Inline title index built with %s titles in %.2fs.", len(index.entries), time.monotonic() - started)
+    return index
+
+
+def title_index_snapshot() -> Optional[dict]:
+    """
+    A copy of the live index as plain data for an on-disk snapshot, or None while it is
+    missing or stale. Taken on the event loop, so no incremental update lands mid-copy.
+    """
+    index = _title_index
+    if index is None or _index_stale:
+        return None
+    return {
+        # Rendered articles are rebuilt on first use
+        "entries": {cid: dict(entry, result=None) for cid, entry in index.entries.items()},
+        "token_ids": {token: set(ids) for token, ids in index.token_ids.items()},
+        "sorted_tokens": list(index.sorted_tokens),
+        "latest": list(index.latest),
+        "spelling": index.spelling.copy(),
+        "age": time.monotonic() - index.built_at,
+    }
+
+
+def restore_title_index(state: dict):
+    """Swaps in an index loaded from a snapshot. It keeps its original age for INLINE_INDEX_REFRESH."""
+    global _title_index, _index_stale
+    index = TitleIndex()
+    index.entries = state["entries"]
+    index.token_ids = state["token_ids"]
+    index.sorted_tokens = state["sorted_tokens"]
+    index.latest = state["latest"]
+    index.spelling = state["spelling"]
+    index.built_at = time.monotonic() - state["age"]
+    _title_index = index
+    _index_stale = False
+    _query_cache.clear()
+
+
+def load_content_doc(content_id: str) -> Optional[Tuple[dict, str]]:
+    """Reads one title from the primary, which already has the write that triggered the update. Blocking."""
+    for collection in CONTENT_COLLECTIONS:
+        doc = collection.find_one({"_id": ObjectId(content_id)}, INDEX_PROJECTION)
+        if doc:
+            return doc, collection.name
+    return None
+
+
+async def update_title_index(content_id: str):
+    """Applies a single saved title to the live index without a full rebuild."""
+    global _index_stale
+    try:
+        loaded = await asyncio.to_thread(load_content_doc, content_id)
+        if loaded and _title_index is not None:
+            _title_index.upsert(*loaded)
+            _query_cache.clear()
+    except Exception as e:
+        logger.error("Error updating title index for %s, scheduling a rebuild: %s", content_id, e)
+        _index_stale = True
+
+
+@register_invalidator
+def invalidate_title_index(content_id: Optional[str] = None):
+    """
+    Applies a single changed title incrementally. When everything may have changed, marks
+    the index as stale instead and the next inline query triggers a background rebuild.
+    """
+    global _index_stale
+    _query_cache.clear()
+    if content_id is None or _title_index is None:
+        _index_stale = True
+        return
+    try:
+        run_detached(update_title_index(content_id))
+    except RuntimeError:
+        # Called outside the event loop, fall back to a rebuild
+        _index_stale = True
+
+
+async def get_title_index() -> TitleIndex:
+    """Returns the current index, building it on first use and refreshing stale ones in the background."""
+    global _rebuild_task
+    if _title_index is None:
+        return await rebuild_title_index()
+
+    expired = time.monotonic() - _title_index.built_at > Config.INLINE_INDEX_REFRESH
+    if (_index_stale or expired) and (_rebuild_task is None or _rebuild_task.done()):
+        # Keep answering from the old index while the new one is built
+        _rebuild_task = asyncio.create_task(rebuild_title_index())
+    return _title_index
+
+
+# --- Result Rendering ---
+def render_result(entry: dict) -> InlineQueryResultArticle:
+    """Builds the inline article for an index entry, with one deep-link button per file."""
+    if entry["result"] is not None:
+        return entry["result"]
+
+    year = entry["year"] or "N/A"
+    genre = ", ".join(entry["genre"])
+    text = f"🎬 **{entry['name']}** ({year})\n\n"
+    text += f"🗣️ **Language:** {entry['language'] or 'N/A'}\n"
+    if genre:
+        text += f"🎭 **Genre:** {genre}\n"
+    if entry["poster_url"]:
+        text += f"[​]({entry['poster_url']})"
+
+    buttons = [
+        [InlineKeyboardButton(
+            f"📥 {quality} ({size})",
+            url=f"https://t.me/{Config.BOT_USERNAME}?start=media-{msg_id}"
+        )]
+        for msg_id, quality, size in entry["media"] if msg_id
+    ]
+
+    entry["result"] = InlineQueryResultArticle(
+        id=entry["id"],
+        title=f"{entry['name']} ({year})",
+        description=" | ".join(filter(None, [entry["language"], genre])),
+        input_message_content=InputTextMessageContent(text),
+        thumb_url=entry["poster_url"],
+        reply_markup=InlineKeyboardMarkup(buttons) if buttons else None
+    )
+    return entry["result"]
+
+
+# --- Inline Query Handler ---
+@Client.on_inline_query()
+@instrument
+async def inline_search(client: Client, inline_query: InlineQuery):
+    """Answers `@bot <query>` with matching titles, paged by offset."""
+    try:
+        query = normalize_text(inline_query.query)
+        offset = int(inline_query.offset) if inline_query.offset.isdigit() else 0
+        page_size = Config.INLINE_RESULTS_PER_PAGE
+
+        index = await get_title_index()
+        cached = _query_cache.get(query)
+        if cached is None:
+            ranked_ids, correction = index.search(query), None
+            if not ranked_ids and query:
+                # Zero hits: answer with the closest spelling instead of an empty list
+                suggestions = index.suggest(query)
+                if suggestions:
+                    correction = suggestions[0]
+                    ranked_ids = index.search(correction)
+            cached = (ranked_ids, correction)
+            _query_cache.set(query, cached)
+        ranked_ids, correction = cached
+
+        page_ids = ranked_ids[offset:offset + page_size]
+        results = [render_result(index.entries[cid]) for cid in page_ids if cid in index.entries]
+        next_offset = str(offset + page_size) if offset + page_size < len(ranked_ids) else ""
+
+        if not results and not offset:
+            switch_pm_text = "🔍 No matches. Open the bot to search"
+        elif correction:
+            switch_pm_text = f"🔤 Showing results for \"{correction}\""
+        else:
+            switch_pm_text = ""
+        await inline_query.answer(
+            results,
+            cache_time=Config.INLINE_CACHE_TIME,
+            is_personal=False,
+            next_offset=next_offset,
+            switch_pm_text=switch_pm_text,
+            switch_pm_parameter="start" if switch_pm_text else ""
+        )
+    except Exception as e:
+        logger.error("Error in inline_search: %s", e, exc_info=True)
@@ -0,0 +1,194 @@
+# bot/parts/job_queue.py
+
+import asyncio
+import logging
+import os
+import socket
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from pymongo import ReturnDocument
+
+from config import Config
+from .core_bot_functionality import db
+
+logger = logging.getLogger(__name__)
+
+jobs_collection = db.jobs
+
+# kind -> coroutine(client, payload, job)
+JOB_HANDLERS: Dict[str, Callable] = {}
+
+
+class RetryJob(Exception):
+    """Raised by a job handler to have the job retried after a specific delay (e.g. a FloodWait)."""
+    def __init__(self, delay: float, reason: str = ""):
+        super().__init__(reason or f"retry in {delay}s")
+        self.delay = delay
+
+
+def job_handler(kind: str):
+    """Decorator registering a coroutine as the handler for a job kind."""
+    def decorator(func):
+        JOB_HANDLERS[kind] = func
+        return func
+    return decorator
+
+
+def ensure_job_indexes():
+    """Creates the indexes used to claim jobs. Blocking."""
+    jobs_collection.create_index([("status", 1), ("kind", 1), ("priority", -1), ("run_at", 1)])
+    jobs_collection.create_index([("status", 1), ("lease_until", 1)])
+
+
+# --- Producer Side ---
+def enqueue_job(kind: str, payload: dict, priority: int = 0, delay: float = 0, max_attempts: Optional[int] = None):
+    """Stores a new pending job and returns its id. Blocking."""
+    now = datetime.utcnow()
+    result = jobs_collection.insert_one({
+        "kind": kind,
+        "payload": payload,
+        "status": "pending",
+        "priority": priority,
+        "attempts": 0,
+        "max_attempts": max_attempts or Config.JOB_MAX_ATTEMPTS,
+        "run_at": now + timedelta(seconds=delay),
+        "lease_until": None,
+        "worker": None,
+        "last_error": None,
+        "created_at": now,
+        "updated_at": now
+    })
+    return result.inserted_id
+
+
+# --- Consumer Side ---
+def claim_job(worker_id: str, kinds: Optional[List[str]] = None) -> Optional[dict]:
+    """
+    Atomically claims the next runnable job with find-and-modify. Pending jobs
+    are claimed once due; running jobs are reclaimed once their lease expires
+    (the worker holding them died).
+    """
+    now = datetime.utcnow()
+    query = {"$or": [
+        {"status": "pending", "run_at": {"$lte": now}},
+        {"status": "running", "lease_until": {"$lt": now}}
+    ]}
+    if kinds:
+        query["kind"] = {"$in": kinds}
+
+    return jobs_collection.find_one_and_update(
+        query,
+        {
+            "$set": {
+                "status": "running",
+                "worker": worker_id,
+                "lease_until": now + timedelta(seconds=Config.JOB_LEASE_SECONDS),
+                "updated_at": now
+            },
+            "$inc": {"attempts": 1}
+        },
+        sort=[("priority", -1), ("run_at", 1)],
+        return_document=ReturnDocument.AFTER
+    )
+
+
+def extend_lease(job_id, worker_id: str) -> bool:
+    """Pushes the lease forward. Returns False if the job was taken over by another worker."""
+    result = jobs_collection.update_one(
+        {"_id": job_id, "worker": worker_id, "status": "running"},
+        {"$set": {"lease_until": datetime.utcnow() + timedelta(seconds=Config.JOB_LEASE_SECONDS)}}
+    )
+    return result.modified_count == 1
+
+
+def checkpoint_job(job_id, checkpoint: dict):
+    """Saves resumable progress so a retried job can continue where it stopped."""
+    jobs_collection.update_one(
+        {"_id": job_id},
+        {"$set": {"payload.checkpoint": checkpoint, "updated_at": datetime.utcnow()}}
+    )
+
+
+def complete_job(job_id, worker_id: str):
+    """Marks a job as done."""
+    jobs_collection.update_one(
+        {"_id": job_id, "worker": worker_id},
+        {"$set": {"status": "done", "lease_until": None, "updated_at": datetime.utcnow()}}
+    )
+
+
+def fail_job(job: dict, worker_id: str, error: Exception):
+    """Schedules a retry with exponential backoff, or marks the job failed once attempts run out."""
+    now = datetime.utcnow()
+    if isinstance(error, RetryJob):
+        # A requested retry (e.g. a FloodWait) isn't a failure, so it doesn't use up an attempt
+        update = {"status": "pending", "lease_until": None, "run_at": now + timedelta(seconds=error.delay),
+                  "last_error": str(error)[:500], "updated_at": now}
+        jobs_collection.update_one({"_id": job["_id"], "worker": worker_id}, {"$set": update, "$inc": {"attempts": -1}})
+        return
+
+    delay = Config.JOB_RETRY_BASE_DELAY * (2 ** (job["attempts"] - 1))
+    if job["attempts"] >= job["max_attempts"]:
+        update = {"status": "failed", "lease_until": None}
+    else:
+        update = {"status": "pending", "lease_until": None, "run_at": now + timedelta(seconds=delay)}
+    update.update({"last_error": str(error)[:500], "updated_at": now})
+    jobs_collection.update_one({"_id": job["_id"], "worker": worker_id}, {"$set": update})
+
+
+async def run_job(client, job: dict, worker_id: str):
+    """Runs a claimed job, renewing its lease while the handler works."""
+    if job["attempts"] > job["max_attempts"]:
+        # Reclaimed after its last allowed attempt crashed the previous worker
+        await asyncio.to_thread(fail_job, job, worker_id, Exception("Lease expired on the final attempt"))
+        return
+
+    handler = JOB_HANDLERS.get(job["kind"])
+    if handler is None:
+        await asyncio.to_thread(fail_job, job, worker_id, Exception(f"No handler for job kind '{job['kind']}'"))
+        return
+
+    async def heartbeat():
+        while True:
+            await asyncio.sleep(Config.JOB_LEASE_SECONDS / 3)
+            await asyncio.to_thread(extend_lease, job["_id"], worker_id)
+
+    heartbeat_task = asyncio.create_task(heartbeat())
+    started = time.perf_counter()
+    outcome = "ok"
+    try:
+        await handler(client, job["payload"], job)
+        await asyncio.to_thread(complete_job, job["_id"], worker_id)
+    except Exception as e:
+        outcome = "retry" if isinstance(e, RetryJob) or job["attempts"] < job["max_attempts"] else "failed"
+        logger.error("Job %s (%s) failed on attempt %s: %s", job["_id"], job["kind"], job["attempts"], e)
+        await asyncio.to_thread(fail_job, job, worker_id, e)
+    finally:
+        heartbeat_task.cancel()
+        latency_ms = round((time.perf_counter() - started) * 1000, 1)
+        logger.info(
+            "Job %s (%s) %s in %sms", job["_id"], job["kind"], outcome, latency_ms,
+            extra={"job_id": str(job["_id"]), "kind": job["kind"], "latency_ms": latency_ms, "outcome": outcome}
+        )
+
+
+async def worker_loop(client, worker_id: str, kinds: Optional[List[str]] = None):
+    """Claims and runs jobs forever, sleeping between polls when the queue is empty."""
+    while True:
+        try:
+            job = await asyncio.to_thread(claim_job, worker_id, kinds)
+        except Exception as e:
+            logger.error("Could not claim a job: %s", e)
+            job = None
+
+        if job is None:
+            await asyncio.sleep(Config.JOB_POLL_INTERVAL)
+            continue
+        await run_job(client, job, worker_id)
+
+
+def make_worker_id() -> str:
+    """A worker id unique to this host and process."""
+    return f"{socket.gethostname()}:{os.getpid()}"
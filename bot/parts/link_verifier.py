@@ -0,0 +1,189 @@
+# bot/parts/link_verifier.py
+
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Set, Tuple
+
+from pyrogram import Client, filters
+from pyrogram.errors import FloodWait
+from pyrogram.types import Message
+
+from config import Config
+from .core_bot_functionality import db, run_detached
+from .media_registry import media_registry, backfill_registry
+from .caching import invalidate_content
+
+logger = logging.getLogger(__name__)
+
+_verify_lock = asyncio.Lock()
+
+
+# --- Batched Existence Checks ---
+async def fetch_existing(client: Client, channel_id: int, message_ids: List[int]) -> Set[int]:
+    """
+    Returns which of the given channel posts still exist, using one get_messages
+    call per LINK_VERIFY_BATCH_SIZE ids. Pauses between calls so user traffic keeps
+    most of the bot's request budget.
+    """
+    existing = set()
+    for start in range(0, len(message_ids), Config.LINK_VERIFY_BATCH_SIZE):
+        batch = message_ids[start:start + Config.LINK_VERIFY_BATCH_SIZE]
+        while True:
+            try:
+                messages = await client.get_messages(channel_id, batch)
+                break
+            except FloodWait as e:
+                logger.warning("FloodWait of %ss while verifying channel %s.", e.value, channel_id)
+                await asyncio.sleep(e.value)
+        existing.update(msg.id for msg in messages if msg and not msg.empty)
+        await asyncio.sleep(Config.LINK_VERIFY_BATCH_DELAY)
+    return existing
+
+
+def load_registry_sources() -> Dict[int, List[dict]]:
+    """Groups every registered file by the channel of its preferred copy. Blocking."""
+    by_channel = defaultdict(list)
+    projection = {"msg_id": 1, "channel_id": 1, "original_msg_id": 1, "fallbacks": 1,
+                  "collection": 1, "content_name": 1, "file_name": 1, "dead": 1}
+    for entry in media_registry.find({}, projection).sort([("channel_id", 1), ("original_msg_id", 1)]):
+        by_channel[entry["channel_id"]].append(entry)
+    return by_channel
+
+
+async def find_dead_files(client: Client) -> Tuple[List[dict], List[dict]]:
+    """
+    Checks every registered file. A file is dead once neither its preferred copy nor
+    any fallback copy exists. Files missing from the registry are registered first.
+    Returns (dead entries, entries that came back).
+    """
+    await asyncio.to_thread(backfill_registry)
+    by_channel = await asyncio.to_thread(load_registry_sources)
+
+    # Pass 1: preferred copies, one channel at a time
+    missing = []
+    for channel_id, entries in by_channel.items():
+        existing = await fetch_existing(client, channel_id, [e["original_msg_id"] for e in entries])
+        missing.extend(e for e in entries if e["original_msg_id"] not in existing)
+
+    # Pass 2: fallback copies of the files whose preferred copy is gone
+    fallback_ids = defaultdict(set)
+    for entry in missing:
+        for copy in entry.get("fallbacks", []):
+            fallback_ids[copy["channel_id"]].add(copy["original_msg_id"])
+    alive_fallbacks = set()
+    for channel_id, message_ids in fallback_ids.items():
+        for message_id in await fetch_existing(client, channel_id, sorted(message_ids)):
+            alive_fallbacks.add((channel_id, message_id))
+
+    dead = [
+        entry for entry in missing
+        if not any((c["channel_id"], c["original_msg_id"]) in alive_fallbacks for c in entry.get("fallbacks", []))
+    ]
+    dead_ids = {entry["msg_id"] for entry in dead}
+    revived = [
+        entry for entries in by_channel.values() for entry in entries
+        if entry.get("dead") and entry["msg_id"] not in dead_ids
+    ]
+    return dead, revived
+
+
+# --- Marking ---
+def mark_files(entries: List[dict], dead: bool) -> Set[str]:
+    """
+    Sets or clears the dead flag on registry entries and on the matching media_files
+    of their content documents. Returns the ids of the affected content. Blocking.
+    """
+    if not entries:
+        return set()
+    now = datetime.utcnow()
+    msg_ids = [entry["msg_id"] for entry in entries]
+    if dead:
+        media_registry.update_many({"msg_id": {"$in": msg_ids}}, {"$set": {"dead": True, "dead_since": now}})
+    else:
+        media_registry.update_many({"msg_id": {"$in": msg_ids}}, {"$unset": {"dead": "", "dead_since": ""}})
+
+    content_ids = set()
+    by_collection = defaultdict(list)
+    for entry in entries:
+        by_collection[entry.get("collection")].append(entry["msg_id"])
+    for collection_name, ids in by_collection.items():
+        if not collection_name:
+            continue
+        collection = db[collection_name]
+        query = {"media_files.msg_id": {"$in": ids}}
+        content_ids.update(str(doc["_id"]) for doc in collection.find(query, {"_id": 1}))
+        collection.update_many(
+            query,
+            {"$set": {"media_files.$[m].dead": dead, "updated_at": now}},
+            array_filters=[{"m.msg_id": {"$in": ids}}]
+        )
+    return content_ids
+
+
+def format_dead_report(dead: List[dict], revived: List[dict]) -> str:
+    """Admin summary of a verification run."""
+    text = "🔗 **Link Check Finished**\n\n"
+    text += f"💀 **Unavailable files:** {len(dead)}\n"
+    if revived:
+        text += f"♻️ **Available again:** {len(revived)}\n"
+    for entry in dead[:Config.LINK_VERIFY_REPORT_LIMIT]:
+        text += f"\n• `{entry.get('content_name') or 'Unknown'}` - {(entry.get('file_name') or 'No Filename')[:40]}"
+    if len(dead) > Config.LINK_VERIFY_REPORT_LIMIT:
+        text += f"\n\n...and {len(dead) - Config.LINK_VERIFY_REPORT_LIMIT} more."
+    return text
+
+
+async def verify_links(client: Client, report_to: List[int] = None) -> Tuple[int, int]:
+    """
+    Runs one verification pass, hides dead files and tells the admins about new ones.
+    Returns (dead, revived) counts. Only one pass runs at a time.
+    """
+    async with _verify_lock:
+        dead, revived = await find_dead_files(client)
+        newly_dead = [entry for entry in dead if not entry.get("dead")]
+
+        changed = await asyncio.to_thread(mark_files, newly_dead, True)
+        changed |= await asyncio.to_thread(mark_files, revived, False)
+        for content_id in changed:
+            invalidate_content(content_id)
+        logger.info("Link check: %s dead (%s new), %s revived.", len(dead), len(newly_dead), len(revived))
+
+        recipients = Config.ADMIN_IDS if report_to is None else report_to
+        if newly_dead or revived or report_to:
+            report = format_dead_report(newly_dead if report_to is None else dead, revived)
+            for admin_id in recipients:
+                try:
+                    await client.send_message(admin_id, report)
+                except Exception as e:
+                    logger.warning("Could not send link report to %s: %s", admin_id, e)
+        return len(dead), len(revived)
+
+
+async def link_verifier_loop(client: Client):
+    """Verifies all source links every LINK_VERIFY_INTERVAL seconds."""
+    while True:
+        await asyncio.sleep(Config.LINK_VERIFY_INTERVAL)
+        try:
+            await verify_links(client)
+        except Exception as e:
+            logger.error("Error in link_verifier_loop: %s", e)
+
+
+# --- /verifylinks Command ---
+@Client.on_message(filters.command("verifylinks") & filters.user(Config.ADMIN_IDS) & filters.private)
+async def verify_links_command(client: Client, message: Message):
+    """Starts a verification pass now and reports the full result to the admin who asked."""
+    if _verify_lock.locked():
+        await message.reply_text("⏳ A link check is already running.")
+        return
+    await message.reply_text("🔗 Checking every source link in the background. You'll get a report when it's done.")
+
+    async def run():
+        try:
+            await verify_links(client, report_to=[message.from_user.id])
+        except Exception as e:
+            logger.error("Error in verify_links_command: %s", e)
+            await message.reply_text("❌ The link check failed. Check logs.")
+    run_detached(run())
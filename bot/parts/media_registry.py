@@ -0,0 +1,108 @@
+# bot/parts/media_registry.py
+
+import logging
+from datetime import datetime
+from typing import Dict, List
+
+from pymongo import UpdateOne
+
+from .core_bot_functionality import db, CONTENT_COLLECTIONS
+
+logger = logging.getLogger(__name__)
+
+# One document per distinct file (keyed by dedup_key, see admin_upload.media_dedup_key).
+# The unique index guarantees a file is only ever registered once, whichever
+# channels it was reposted in.
+media_registry = db.media_registry
+
+
+def ensure_registry_indexes():
+    """Creates the registry indexes. Blocking."""
+    media_registry.create_index("dedup_key", unique=True)
+    media_registry.create_index("msg_id")
+
+
+def assign_registered_ids(docs: List[Dict]):
+    """
+    Reuses the msg_id already registered for a file, so re-uploading a title
+    keeps its existing deep links working. Modifies the documents in place. Blocking.
+    """
+    keys = [m["dedup_key"] for doc in docs for m in doc.get("media_files", []) if m.get("dedup_key")]
+    if not keys:
+        return
+    known = {
+        entry["dedup_key"]: entry["msg_id"]
+        for entry in media_registry.find({"dedup_key": {"$in": keys}}, {"dedup_key": 1, "msg_id": 1})
+    }
+    for doc in docs:
+        changed = False
+        for media in doc.get("media_files", []):
+            if media.get("dedup_key") in known:
+                media["msg_id"] = known[media["dedup_key"]]
+                changed = True
+        if changed and "seasons_data" in doc:
+            from .details_collection import organize_episodes_by_season
+            doc["seasons_data"] = organize_episodes_by_season(doc["media_files"])
+
+
+def registry_fields(media: Dict, doc: Dict, collection_name: str) -> Dict:
+    """The registry entry of one media file of a content document."""
+    return {
+        "msg_id": media["msg_id"],
+        "file_unique_id": media.get("file_unique_id"),
+        "channel_id": media["channel_id"],
+        "original_msg_id": media["original_msg_id"],
+        "fallbacks": media.get("fallbacks", []),
+        "size_bytes": media.get("size_bytes"),
+        "file_name": media.get("file_name"),
+        "collection": collection_name,
+        "content_name": doc.get("name"),
+        "content_year": doc.get("year"),
+    }
+
+
+def register_media(docs: List[Dict], collection_name: str):
+    """Upserts a registry entry for every media file of the given content documents. Blocking."""
+    now = datetime.utcnow()
+    ops = []
+    for doc in docs:
+        for media in doc.get("media_files", []):
+            if not media.get("dedup_key"):
+                continue
+            ops.append(UpdateOne(
+                {"dedup_key": media["dedup_key"]},
+                {"$set": {**registry_fields(media, doc, collection_name), "updated_at": now}},
+                upsert=True
+            ))
+    if ops:
+        media_registry.bulk_write(ops, ordered=False)
+
+
+def backfill_registry() -> int:
+    """
+    Registers every media file of the content collections that has no registry entry
+    yet, such as titles saved before the registry existed. Files without a dedup_key
+    are keyed by their msg_id, so they never merge with another entry. Returns the
+    number of entries added. Blocking.
+    """
+    registered = {entry["msg_id"] for entry in media_registry.find({}, {"msg_id": 1, "_id": 0})}
+    now = datetime.utcnow()
+    ops = []
+    for collection in CONTENT_COLLECTIONS:
+        for doc in collection.find({}, {"name": 1, "year": 1, "media_files": 1}):
+            for media in doc.get("media_files") or []:
+                if media.get("msg_id") in registered or not media.get("original_msg_id"):
+                    continue
+                registered.add(media["msg_id"])
+                fields = registry_fields(media, doc, collection.name)
+                fields["updated_at"] = now
+                ops.append(UpdateOne(
+                    {"dedup_key": media.get("dedup_key") or f"legacy:{media['msg_id']}"},
+                    {"$setOnInsert": fields},
+                    upsert=True
+                ))
+    if ops:
+        result = media_registry.bulk_write(ops, ordered=False)
+        logger.info("Registered %s media files that were missing from the registry.", result.upserted_count)
+        return result.upserted_count
+    return 0
@@ -0,0 +1,195 @@
+# bot/parts/migrations.py
+"""
+Versioned migrations of the content documents.
+
+Each migration upgrades documents below its version to that version. Documents
+are streamed in _id order in batches, and the last migrated _id per collection
+is saved after every batch, so an interrupted run resumes where it stopped.
+Every rewrite is conditional on the document's old schema_version and its
+updated_at as read, so documents written in the new format by the bot in the
+meantime are left alone, and a concurrent update (a dead-link flag, a merged
+episode chunk) is never overwritten: the document is re-read and migrated
+again. Rewritten documents get a new updated_at. Run them with `python migrate.py`.
+"""
+
+import copy
+import logging
+import re
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import bson
+from pymongo import ReplaceOne
+
+from config import Config
+from .core_bot_functionality import db, CONTENT_COLLECTIONS, CONTENT_SCHEMA_VERSION, quality_code
+from .details_collection import organize_episodes_by_season
+
+logger = logging.getLogger(__name__)
+
+# One document per migration version with its status, checkpoints and counters
+schema_migrations = db.schema_migrations
+
+# version -> {"name", "transform"}; transform(doc) returns the upgraded document
+MIGRATIONS: Dict[int, Dict] = {}
+# Rewrites tried per batch when other writers keep changing its documents
+MIGRATION_ATTEMPTS = 3
+
+
+def migration(version: int, name: str):
+    """Decorator registering a document transform as the migration to `version`."""
+    def decorator(func: Callable[[Dict], Dict]):
+        MIGRATIONS[version] = {"name": name, "transform": func}
+        return func
+    return decorator
+
+
+# --- Migrations ---
+SIZE_UNITS = {"B": 1, "KB": 1024, "MB": 1024 ** 2, "GB": 1024 ** 3, "TB": 1024 ** 4}
+
+
+def parse_file_size(text: str) -> int:
+    """Inverse of format_file_size: "1.4 GB" -> bytes. Unparseable sizes are 0."""
+    match = re.match(r"\s*([\d.]+)\s*([KMGT]?B)\s*$", str(text or "").upper())
+    if not match:
+        return 0
+    return int(float(match.group(1)) * SIZE_UNITS[match.group(2)])
+
+
+@migration(2, "compact_media")
+def compact_media(doc: Dict) -> Dict:
+    """
+    Integer quality codes and byte sizes instead of display strings, no copy of
+    the caption or post link per file, and seasons_data referencing files by
+    msg_id instead of holding a second copy of every entry.
+    """
+    for media in doc.get("media_files") or []:
+        media["quality"] = quality_code(media.get("quality"))
+        media["size_bytes"] = int(media.get("size_bytes") or parse_file_size(media.get("size")))
+        for field in ("size", "caption", "telegram_link"):
+            media.pop(field, None)
+    if "seasons_data" in doc:
+        doc["seasons_data"] = organize_episodes_by_season(doc.get("media_files") or [])
+    return doc
+
+
+# --- Runner ---
+def pending_migrations() -> List[int]:
+    """Registered versions up to CONTENT_SCHEMA_VERSION that haven't finished yet. Blocking."""
+    done = {m["_id"] for m in schema_migrations.find({"status": "done"}, {"_id": 1})}
+    return sorted(v for v in MIGRATIONS if v <= CONTENT_SCHEMA_VERSION and v not in done)
+
+
+def migrate_batch(collection, docs: List[Dict], version: int, dry_run: bool) -> Dict:
+    """
+    Upgrades one batch of documents and returns its counters. Documents changed by
+    another writer between the read and the rewrite are re-read and tried again, up
+    to MIGRATION_ATTEMPTS times. Sizes are measured on the first read. Blocking.
+    """
+    transform = MIGRATIONS[version]["transform"]
+    counts = {"scanned": len(docs), "migrated": 0, "bytes_before": 0, "bytes_after": 0}
+    for attempt in range(MIGRATION_ATTEMPTS):
+        ops, ids = [], []
+        for doc in docs:
+            old_version = doc.get("schema_version")
+            if (old_version or 1) >= version:
+                continue
+            new_doc = transform(copy.deepcopy(doc))
+            new_doc["schema_version"] = version
+            # Lets the change feed and the snapshot stamp see the rewrite
+            new_doc["updated_at"] = datetime.utcnow()
+            if attempt == 0:
+                counts["bytes_before"] += len(bson.encode(doc))
+                counts["bytes_after"] += len(bson.encode(new_doc))
+            # A missing schema_version or updated_at matches None, so legacy documents are covered too.
+            # Every content write bumps updated_at, so a concurrent $set or $push makes this miss.
+            ops.append(ReplaceOne(
+                {"_id": doc["_id"], "schema_version": old_version, "updated_at": doc.get("updated_at")},
+                new_doc
+            ))
+            ids.append(doc["_id"])
+        if not ops:
+            break
+        if dry_run:
+            counts["migrated"] = len(ops)
+            break
+        result = collection.bulk_write(ops, ordered=False)
+        counts["migrated"] += result.modified_count
+        if result.matched_count == len(ops):
+            break
+        # Some documents changed since they were read; the ones already rewritten are skipped above
+        docs = list(collection.find({"_id": {"$in": ids}}))
+    else:
+        logger.warning("Migration %s: some documents in %s kept changing and were left for the next run.", version, collection.name)
+    return counts
+
+
+def run_migration(
+    version: int,
+    batch_size: int = Config.MIGRATION_BATCH_SIZE,
+    dry_run: bool = False,
+    progress: Optional[Callable[[Dict], None]] = None
+) -> Dict:
+    """
+    Runs one migration over every content collection, resuming from its saved
+    checkpoints. Returns its progress document. A dry run only measures. Blocking.
+    """
+    name = MIGRATIONS[version]["name"]
+    state = schema_migrations.find_one({"_id": version})
+    if state is None:
+        state = {
+            "_id": version, "name": name, "status": "running", "checkpoints": {},
+            "scanned": 0, "migrated": 0, "bytes_before": 0, "bytes_after": 0,
+            "started_at": datetime.utcnow()
+        }
+        if not dry_run:
+            schema_migrations.insert_one(state)
+    if state["status"] == "done":
+        return state
+
+    started = time.monotonic()
+    for collection in CONTENT_COLLECTIONS:
+        last_id = state["checkpoints"].get(collection.name)
+        while True:
+            query = {"_id": {"$gt": last_id}} if last_id is not None else {}
+            docs = list(collection.find(query).sort("_id", 1).limit(batch_size))
+            if not docs:
+                break
+            counts = migrate_batch(collection, docs, version, dry_run)
+            last_id = docs[-1]["_id"]
+            state["checkpoints"][collection.name] = last_id
+            for key, value in counts.items():
+                state[key] += value
+            if not dry_run:
+                schema_migrations.update_one(
+                    {"_id": version},
+                    {"$set": {f"checkpoints.{collection.name}": last_id, "updated_at": datetime.utcnow()},
+                     "$inc": counts}
+                )
+            if progress:
+                progress(state)
+
+    state["status"] = "done"
+    state["finished_at"] = datetime.utcnow()
+    if not dry_run:
+        schema_migrations.update_one(
+            {"_id": version}, {"$set": {"status": "done", "finished_at": state["finished_at"]}}
+        )
+    logger.info(
+        "Migration %s (%s) finished in %.1fs: "
+        "%s of %s documents rewritten.",
+        version, name, time.monotonic() - started, state['migrated'], state['scanned']
+    )
+    return state
+
+
+def format_migration_report(state: Dict) -> str:
+    """Human-readable summary of a migration's progress document."""
+    before, after = state["bytes_before"], state["bytes_after"]
+    saved = (1 - after / before) * 100 if before else 0
+    return (
+        f"Migration {state['_id']} ({state['name']}): {state['status']}\n"
+        f"  documents scanned: {state['scanned']}, rewritten: {state['migrated']}\n"
+        f"  rewritten documents: {before} -> {after} bytes ({saved:.1f}% smaller)"
+    )
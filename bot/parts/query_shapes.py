@@ -0,0 +1,380 @@
+# bot/parts/query_shapes.py
+"""
+Registry of every query shape the data layer issues, and the index each one relies on.
+
+`audit_queries.py` runs explain() for each shape against a seeded scratch database
+and fails on collection scans or wasteful plans. At startup `ensure_query_indexes`
+creates any registered index that is missing. When adding a new query, register its
+shape here.
+"""
+
+import logging
+from datetime import timedelta
+from typing import Dict, List, Optional
+
+from .core_bot_functionality import db
+
+logger = logging.getLogger(__name__)
+
+CONTENT = ("movies", "series", "shows")
+
+# Each shape describes one query as a find: updates, upserts and deletes are planned
+# like a find on the same filter. `filter` builds the query from sample values of the
+# seeded data (see audit_queries.py). `collscan_ok` marks deliberate full scans.
+QUERY_SHAPES: List[Dict] = [
+    # --- Content collections ---
+    {
+        "name": "content_by_id",
+        "used_by": "user_features.get_rendered_details, series_ingest.push_media_chunk, season_packs.load_series",
+        "collections": CONTENT,
+        "filter": lambda s: {"_id": s["content_id"]},
+    },
+    {
+        "name": "content_by_ids",
+        "used_by": "analytics.refresh_trending",
+        "collections": CONTENT,
+        "filter": lambda s: {"_id": {"$in": s["content_ids"]}},
+        "projection": {"name": 1, "year": 1},
+    },
+    {
+        "name": "content_by_media_id",
+        "used_by": "user_features.handle_media_request",
+        "collections": CONTENT,
+        "filter": lambda s: {"media_files.msg_id": s["msg_id"]},
+        "index": [("media_files.msg_id", 1)],
+    },
+    {
+        "name": "content_by_media_ids",
+        "used_by": "link_verifier.mark_files",
+        "collections": CONTENT,
+        "filter": lambda s: {"media_files.msg_id": {"$in": s["msg_ids"]}},
+        "index": [("media_files.msg_id", 1)],
+    },
+    {
+        "name": "content_by_name_year",
+        "used_by": "details_collection.save_content_item, bulk_import._import_batch (upsert key)",
+        "collections": CONTENT,
+        "filter": lambda s: {"name": s["name"], "year": s["year"]},
+        "index": [("name", 1), ("year", 1)],
+    },
+    {
+        "name": "content_latest_update",
+        "used_by": "snapshots.catalog_stamp",
+        "collections": CONTENT,
+        "filter": lambda s: {},
+        "projection": {"updated_at": 1},
+        "sort": [("updated_at", -1)],
+        "limit": 1,
+        "index": [("updated_at", -1)],
+    },
+    {
+        "name": "content_changed_since",
+        "used_by": "change_feed.UpdatePoller.poll",
+        "collections": CONTENT,
+        "filter": lambda s: {"updated_at": {"$gte": s["now"]}},
+        "projection": {"updated_at": 1},
+        "sort": [("updated_at", 1)],
+        "index": [("updated_at", -1)],
+    },
+    {
+        "name": "content_full_load",
+        "used_by": "inline_search.TitleIndex.build, recommendations.build_recommendations",
+        "collections": CONTENT,
+        "filter": lambda s: {},
+        "collscan_ok": True,  # the whole catalog is loaded into memory by design
+    },
+    {
+        "name": "content_registry_backfill",
+        "used_by": "media_registry.backfill_registry",
+        "collections": CONTENT,
+        "filter": lambda s: {},
+        "projection": {"name": 1, "year": 1, "media_files": 1},
+        "collscan_ok": True,  # once per link check, which contacts Telegram for every file anyway
+    },
+    {
+        "name": "content_catalog_stats",
+        "used_by": "catalog_stats.compute_catalog_stats (aggregation)",
+        "collections": CONTENT,
+        "filter": lambda s: {},
+        "projection": {"is_dubbed": 1, "media_files": 1},
+        "collscan_ok": True,  # scheduled full pass; /stats only reads the stored snapshot
+    },
+    {
+        "name": "content_id_range",
+        "used_by": "migrations.run_migration",
+        "collections": CONTENT,
+        "filter": lambda s: {"_id": {"$gt": s["content_id"]}},
+        "sort": [("_id", 1)],
+        "limit": 200,
+    },
+    {
+        "name": "content_replace_versioned",
+        "used_by": "migrations.migrate_batch (conditional replace)",
+        "collections": CONTENT,
+        "filter": lambda s: {"_id": s["content_id"], "schema_version": None, "updated_at": s["now"]},
+    },
+    # --- Media registry ---
+    {
+        "name": "registry_by_dedup_keys",
+        "used_by": "media_registry.assign_registered_ids",
+        "collections": ("media_registry",),
+        "filter": lambda s: {"dedup_key": {"$in": s["dedup_keys"]}},
+        "projection": {"dedup_key": 1, "msg_id": 1},
+        "index": [("dedup_key", 1)],
+    },
+    {
+        "name": "registry_by_msg_ids",
+        "used_by": "link_verifier.mark_files",
+        "collections": ("media_registry",),
+        "filter": lambda s: {"msg_id": {"$in": s["msg_ids"]}},
+        "index": [("msg_id", 1)],
+    },
+    {
+        "name": "registry_sources_by_channel",
+        "used_by": "link_verifier.load_registry_sources",
+        "collections": ("media_registry",),
+        "filter": lambda s: {},
+        "sort": [("channel_id", 1), ("original_msg_id", 1)],
+        "index": [("channel_id", 1), ("original_msg_id", 1)],
+        "max_ratio": 1,
+    },
+    {
+        "name": "registry_msg_ids",
+        "used_by": "media_registry.backfill_registry",
+        "collections": ("media_registry",),
+        "filter": lambda s: {},
+        "projection": {"msg_id": 1, "_id": 0},
+        "collscan_ok": True,  # every registered id is needed
+    },
+    {
+        "name": "registry_by_dedup_key",
+        "used_by": "media_registry.register_media (upsert key)",
+        "collections": ("media_registry",),
+        "filter": lambda s: {"dedup_key": s["dedup_keys"][0]},
+        "index": [("dedup_key", 1)],
+    },
+    # --- Analytics ---
+    {
+        "name": "stats_recent",
+        "used_by": "analytics.refresh_trending",
+        "collections": ("content_stats",),
+        "filter": lambda s: {"score_at": {"$gte": s["now"] - timedelta(days=7)}},
+        "projection": {"score": 1, "score_at": 1, "collection": 1},
+        "index": [("score_at", 1)],
+        "max_ratio": 1,
+    },
+    {
+        "name": "stats_by_id",
+        "used_by": "analytics.write_counters (upsert key)",
+        "collections": ("content_stats",),
+        "filter": lambda s: {"_id": s["stats_id"]},
+    },
+    {
+        "name": "catalog_stats_snapshot",
+        "used_by": "catalog_stats.refresh_catalog_stats, stats_command",
+        "collections": ("catalog_stats",),
+        "filter": lambda s: {"_id": "catalog"},
+    },
+    {
+        "name": "migrations_done",
+        "used_by": "migrations.pending_migrations",
+        "collections": ("schema_migrations",),
+        "filter": lambda s: {"status": "done"},
+        "collscan_ok": True,  # one document per schema version
+    },
+    {
+        "name": "migration_by_version",
+        "used_by": "migrations.run_migration",
+        "collections": ("schema_migrations",),
+        "filter": lambda s: {"_id": 2},
+    },
+    # --- Job queue ---
+    {
+        "name": "jobs_claim",
+        "used_by": "job_queue.claim_job",
+        "collections": ("jobs",),
+        "filter": lambda s: {"$or": [
+            {"status": "pending", "run_at": {"$lte": s["now"]}},
+            {"status": "running", "lease_until": {"$lt": s["now"]}}
+        ]},
+        "sort": [("priority", -1), ("run_at", 1)],
+        "limit": 1,
+        "index": [("status", 1), ("priority", -1), ("run_at", 1)],
+    },
+    {
+        "name": "jobs_claim_kinds",
+        "used_by": "job_queue.claim_job (worker.py --kinds)",
+        "collections": ("jobs",),
+        "filter": lambda s: {
+            "$or": [
+                {"status": "pending", "run_at": {"$lte": s["now"]}},
+                {"status": "running", "lease_until": {"$lt": s["now"]}}
+            ],
+            "kind": {"$in": ["deliver_media"]}
+        },
+        "sort": [("priority", -1), ("run_at", 1)],
+        "limit": 1,
+        "index": [("status", 1), ("kind", 1), ("priority", -1), ("run_at", 1)],
+    },
+    {
+        "name": "jobs_expired_leases",
+        "used_by": "job_queue.claim_job ($or branch)",
+        "collections": ("jobs",),
+        "filter": lambda s: {"status": "running", "lease_until": {"$lt": s["now"]}},
+        "index": [("status", 1), ("lease_until", 1)],
+    },
+    {
+        "name": "jobs_by_id",
+        "used_by": "job_queue.extend_lease, complete_job, fail_job, checkpoint_job",
+        "collections": ("jobs",),
+        "filter": lambda s: {"_id": s["job_id"], "worker": s["worker"]},
+    },
+    # --- Subscriptions ---
+    {
+        "name": "broadcast_audience",
+        "used_by": "subscriptions.run_broadcast",
+        "collections": ("subscribers",),
+        "filter": lambda s: {
+            "$or": [{"all": True}, {"genres": {"$in": ["action"]}}, {"actors": {"$in": ["yash"]}}],
+            "_id": {"$gt": s["subscriber_after"]}
+        },
+        "sort": [("_id", 1)],
+        "limit": 500,
+        "index": [("all", 1), ("_id", 1)],
+    },
+    {
+        "name": "broadcast_audience_genres",
+        "used_by": "subscriptions.run_broadcast ($or branch)",
+        "collections": ("subscribers",),
+        "filter": lambda s: {"genres": {"$in": ["action"]}},
+        "index": [("genres", 1), ("_id", 1)],
+    },
+    {
+        "name": "broadcast_audience_actors",
+        "used_by": "subscriptions.run_broadcast ($or branch)",
+        "collections": ("subscribers",),
+        "filter": lambda s: {"actors": {"$in": ["yash"]}},
+        "index": [("actors", 1), ("_id", 1)],
+    },
+    {
+        "name": "broadcasts_running",
+        "used_by": "subscriptions.resume_broadcasts",
+        "collections": ("broadcasts",),
+        "filter": lambda s: {"status": "running"},
+        "index": [("status", 1)],
+    },
+    # --- Bulk import ---
+    {
+        "name": "import_checkpoint",
+        "used_by": "bulk_import.run_import, _save_checkpoint",
+        "collections": ("import_checkpoints",),
+        "filter": lambda s: {"_id": s["import_id"]},
+    },
+    # --- Series ingestion ---
+    {
+        "name": "staging_upsert",
+        "used_by": "series_ingest.SeriesIngest.add (upsert key)",
+        "collections": ("ingest_staging",),
+        "filter": lambda s: {"ingest_id": s["ingest_id"], "dedup_key": s["dedup_keys"][0]},
+        "index": [("ingest_id", 1), ("dedup_key", 1)],
+    },
+    {
+        "name": "staging_chunk",
+        "used_by": "series_ingest.load_staged_chunk, discard_staged",
+        "collections": ("ingest_staging",),
+        "filter": lambda s: {"ingest_id": s["ingest_id"], "_id": {"$gt": s["staging_after"]}},
+        "sort": [("_id", 1)],
+        "limit": 200,
+        "index": [("ingest_id", 1), ("_id", 1)],
+    },
+]
+
+
+def _key_pattern(keys) -> tuple:
+    """Normalizes an index key list (directions may come back as floats) for comparisons."""
+    return tuple((field, int(direction)) for field, direction in keys)
+
+
+def ensure_query_indexes(database=None) -> List[str]:
+    """
+    Creates every registered index that doesn't exist yet and returns their
+    descriptions. Existing indexes (whatever their name or options) are left alone. Blocking.
+    """
+    database = database if database is not None else db
+    created = []
+    for shape in QUERY_SHAPES:
+        keys = shape.get("index")
+        if not keys:
+            continue
+        for collection_name in shape["collections"]:
+            collection = database[collection_name]
+            existing = {_key_pattern(info["key"]) for info in collection.index_information().values()}
+            if _key_pattern(keys) not in existing:
+                collection.create_index(keys)
+                created.append(f"{collection_name}: {keys}")
+    if created:
+        logger.info("Created %s missing indexes: %s", len(created), created)
+    return created
+
+
+# --- Plan Inspection ---
+def plan_stages(plan) -> List[str]:
+    """Lists every stage name in an explain plan tree, whatever the server's plan layout."""
+    stages = []
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        for value in plan.values():
+            stages.extend(plan_stages(value))
+    elif isinstance(plan, list):
+        for item in plan:
+            stages.extend(plan_stages(item))
+    return stages
+
+
+def audit_shape(database, shape: Dict, sample: Dict, max_ratio: float) -> List[Dict]:
+    """
+    Explains one shape on each of its collections. Returns one report per collection
+    with the winning plan's stages, docs examined/returned and any problems. Blocking.
+    """
+    reports = []
+    for collection_name in shape["collections"]:
+        cursor = database[collection_name].find(shape["filter"](sample), shape.get("projection"))
+        if shape.get("sort"):
+            cursor = cursor.sort(shape["sort"])
+        if shape.get("limit"):
+            cursor = cursor.limit(shape["limit"])
+        explain = cursor.explain()
+
+        stages = plan_stages(explain.get("queryPlanner", {}).get("winningPlan", {}))
+        stats = explain.get("executionStats", {})
+        examined = stats.get("totalDocsExamined", 0)
+        returned = stats.get("nReturned", 0)
+        ratio = examined / max(returned, 1)
+
+        problems = []
+        if "COLLSCAN" in stages and not shape.get("collscan_ok"):
+            problems.append("COLLSCAN")
+        limit = shape.get("max_ratio", max_ratio)
+        if not shape.get("collscan_ok") and ratio > limit:
+            problems.append(f"examined/returned {ratio:.1f} > {limit}")
+
+        reports.append({
+            "shape": shape["name"],
+            "collection": collection_name,
+            "stages": stages,
+            "examined": examined,
+            "returned": returned,
+            "problems": problems,
+        })
+    return reports
+
+
+def audit_all(database, sample: Dict, max_ratio: float, names: Optional[List[str]] = None) -> List[Dict]:
+    """Explains every registered shape (or only the named ones). Blocking."""
+    reports = []
+    for shape in QUERY_SHAPES:
+        if names and shape["name"] not in names:
+            continue
+        reports.extend(audit_shape(database, shape, sample, max_ratio))
+    return reports
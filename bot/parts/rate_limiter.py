@@ -0,0 +1,132 @@
+# bot/parts/rate_limiter.py
+
+import logging
+import time
+from typing import Dict, List, Tuple
+
+from pyrogram import Client, filters
+from pyrogram.types import Message, CallbackQuery, InlineQuery
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+def parse_rate_limits(spec: str) -> Dict[str, Tuple[float, float]]:
+    """
+    Parses "media=5/60,callback=30/60" into {class: (capacity, tokens_per_second)}.
+    Each class allows `capacity` requests in a burst, refilled over `period` seconds.
+    """
+    limits = {}
+    for item in spec.split(","):
+        if "=" not in item:
+            continue
+        name, rule = item.split("=", 1)
+        capacity, period = rule.split("/", 1)
+        limits[name.strip()] = (float(capacity), float(capacity) / float(period))
+    return limits
+
+
+RATE_LIMITS = parse_rate_limits(Config.RATE_LIMITS)
+
+# --- Token Buckets ---
+# (user_id, handler class) -> [tokens, last refill time]
+_buckets: Dict[Tuple[int, str], List[float]] = {}
+# user_id -> time the user was last told to slow down
+_warned: Dict[int, float] = {}
+_last_sweep = time.monotonic()
+
+
+def allow(user_id: int, handler_class: str) -> bool:
+    """Takes one token from the user's bucket for this handler class. O(1)."""
+    limit = RATE_LIMITS.get(handler_class)
+    if limit is None:
+        return True
+    capacity, refill_rate = limit
+    now = time.monotonic()
+    _maybe_sweep(now)
+
+    bucket = _buckets.get((user_id, handler_class))
+    if bucket is None:
+        _buckets[(user_id, handler_class)] = [capacity - 1, now]
+        return True
+
+    bucket[0] = min(capacity, bucket[0] + (now - bucket[1]) * refill_rate)
+    bucket[1] = now
+    if bucket[0] >= 1:
+        bucket[0] -= 1
+        return True
+    return False
+
+
+def _maybe_sweep(now: float):
+    """Every RATE_LIMIT_SWEEP_INTERVAL, drops buckets that have refilled completely (they'd start full anyway)."""
+    global _last_sweep
+    if now - _last_sweep < Config.RATE_LIMIT_SWEEP_INTERVAL:
+        return
+    _last_sweep = now
+    for key, (tokens, last) in list(_buckets.items()):
+        capacity, refill_rate = RATE_LIMITS[key[1]]
+        if tokens + (now - last) * refill_rate >= capacity:
+            del _buckets[key]
+    for user_id, warned_at in list(_warned.items()):
+        if now - warned_at >= Config.RATE_LIMIT_NOTICE_INTERVAL:
+            del _warned[user_id]
+
+
+def should_warn(user_id: int) -> bool:
+    """True at most once per RATE_LIMIT_NOTICE_INTERVAL per user, so throttling stays silent and cheap."""
+    now = time.monotonic()
+    if now - _warned.get(user_id, 0) < Config.RATE_LIMIT_NOTICE_INTERVAL:
+        return False
+    _warned[user_id] = now
+    return True
+
+
+def classify_message(message: Message) -> str:
+    """Deep links that trigger file deliveries get their own, stricter classes."""
+    # message.command is only filled in by filters.command, which hasn't run yet in this group
+    words = message.text.split() if message.text else []
+    if len(words) > 1 and words[0].split("@", 1)[0].lower() == "/start":
+        # A season pack sends a whole season, so it has a budget of its own
+        return "pack" if words[1].startswith("pack-") else "media"
+    return "command"
+
+
+# --- Middleware Handlers ---
+# Registered in a negative group so they run before every feature handler (group 0).
+# Admins are never throttled.
+THROTTLE_TEXT = "⏳ You're going too fast. Please wait a few seconds and try again."
+
+
+@Client.on_message(filters.private & ~filters.user(Config.ADMIN_IDS), group=Config.RATE_LIMIT_GROUP)
+async def throttle_messages(client: Client, message: Message):
+    """Drops private messages from users who exceeded their rate limit."""
+    if not message.from_user or allow(message.from_user.id, classify_message(message)):
+        return
+    if should_warn(message.from_user.id):
+        try:
+            await message.reply_text(THROTTLE_TEXT)
+        except Exception as e:
+            logger.warning("Could not send throttle notice: %s", e)
+    message.stop_propagation()
+
+
+@Client.on_callback_query(~filters.user(Config.ADMIN_IDS), group=Config.RATE_LIMIT_GROUP)
+async def throttle_callbacks(client: Client, callback_query: CallbackQuery):
+    """Drops button presses from users who exceeded their rate limit."""
+    if allow(callback_query.from_user.id, "callback"):
+        return
+    if should_warn(callback_query.from_user.id):
+        try:
+            await callback_query.answer(THROTTLE_TEXT, show_alert=True)
+        except Exception as e:
+            logger.warning("Could not answer throttled callback: %s", e)
+    callback_query.stop_propagation()
+
+
+@Client.on_inline_query(~filters.user(Config.ADMIN_IDS), group=Config.RATE_LIMIT_GROUP)
+async def throttle_inline(client: Client, inline_query: InlineQuery):
+    """Drops inline queries from users who exceeded their rate limit."""
+    if not allow(inline_query.from_user.id, "inline"):
+        inline_query.stop_propagation()
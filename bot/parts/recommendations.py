@@ -0,0 +1,291 @@
+# bot/parts/recommendations.py
+"""
+"More like this" recommendations for the detail view.
+
+Every title becomes a sparse feature vector over its genres, actors, language
+and release period, weighted by how rare each feature is and L2-normalized.
+The top-k cosine neighbours of the whole catalog are computed in batches with
+NumPy: each batch expands the posting lists of its features and accumulates
+the dot products with one bincount, so no dense title x feature matrix is ever
+built. Neighbours are kept in memory per content id, so rendering the detail
+view adds buttons without any query. Saved titles are scored incrementally
+against the current model; a full rebuild runs every RECOMMEND_REFRESH_INTERVAL,
+or soon after a catalog-wide change such as a bulk import.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import Config
+from .caching import register_invalidator
+from .core_bot_functionality import READ_CONTENT_COLLECTIONS, run_detached
+
+logger = logging.getLogger(__name__)
+
+PROJECTION = {"name": 1, "year": 1, "genre": 1, "actors": 1, "language": 1}
+
+# Relative weight of each feature kind before the rarity (idf) weighting
+FEATURE_WEIGHTS = {"g": 1.0, "a": 1.5, "l": 0.5, "y": 0.5}
+YEAR_BUCKET = 5
+# Features shared by at least this many titles (and sqrt(catalog size)) are scored densely
+DENSE_MIN_TITLES = 32
+DENSE_MAX_FEATURES = 256
+# Seconds between checks for a stale or expired model
+RECHECK_INTERVAL = 300
+
+
+def doc_features(doc: dict) -> List[str]:
+    """The feature names of a title, e.g. ["g:action", "a:yash", "l:kannada", "y:404"]."""
+    features = {f"g:{g.strip().lower()}" for g in doc.get("genre") or [] if g and g.strip()}
+    features |= {f"a:{a.strip().lower()}" for a in doc.get("actors") or [] if a and a.strip()}
+    if doc.get("language"):
+        features.add(f"l:{doc['language'].strip().lower()}")
+    if isinstance(doc.get("year"), int):
+        features.add(f"y:{doc['year'] // YEAR_BUCKET}")
+    return sorted(features)
+
+
+class SimilarityModel:
+    """Sparse, normalized feature vectors of the catalog with posting lists per feature."""
+    def __init__(self, ids: List[str], feature_lists: List[List[str]]):
+        self.ids = ids
+        self.positions = {cid: i for i, cid in enumerate(ids)}
+        n = len(ids)
+
+        self.vocab: Dict[str, int] = {}
+        for features in feature_lists:
+            for feature in features:
+                self.vocab.setdefault(feature, len(self.vocab))
+        kinds = np.array([FEATURE_WEIGHTS[f[0]] for f in self.vocab], dtype=np.float64)
+
+        # Row-major (CSR) layout: the features of each title
+        lengths = np.array([len(f) for f in feature_lists], dtype=np.int64)
+        self.indptr = np.concatenate(([0], np.cumsum(lengths)))
+        self.indices = np.array([self.vocab[f] for features in feature_lists for f in features], dtype=np.int64)
+
+        df = np.bincount(self.indices, minlength=len(self.vocab))
+        self.feature_weights = kinds * (np.log((1 + n) / (1 + df)) + 1)
+        data = self.feature_weights[self.indices]
+        rows = np.repeat(np.arange(n), lengths)
+        norms = np.sqrt(np.bincount(rows, weights=data ** 2, minlength=n))
+        self.data = data / np.maximum(norms, 1e-12)[rows]
+
+        # Common features (languages, genres, periods) go into a small dense block scored
+        # with one matrix product; expanding their long posting lists would dominate the cost
+        common = np.argsort(-df, kind="stable")[:DENSE_MAX_FEATURES]
+        common = common[df[common] >= max(DENSE_MIN_TITLES, np.sqrt(n))]
+        self.dense_column = np.full(len(self.vocab), -1, dtype=np.int64)
+        self.dense_column[common] = np.arange(len(common))
+        self.dense = np.zeros((n, len(common)))
+        columns = self.dense_column[self.indices]
+        in_dense = columns >= 0
+        self.dense[rows[in_dense], columns[in_dense]] = self.data[in_dense]
+
+        # Column-major (CSC) layout of the remaining features: the titles having each one
+        sparse_df = np.where(self.dense_column >= 0, 0, df)
+        order = np.argsort(self.indices, kind="stable")
+        order = order[~in_dense[order]]
+        self.post_rows = rows[order]
+        self.post_data = self.data[order]
+        self.post_ptr = np.concatenate(([0], np.cumsum(sparse_df)))
+
+    def vector(self, features: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """The normalized vector of a feature list. Features unknown to the model can't match anything."""
+        known = [self.vocab[f] for f in features if f in self.vocab]
+        indices = np.array(known, dtype=np.int64)
+        weights = self.feature_weights[indices]
+        return indices, weights / max(np.sqrt(np.sum(weights ** 2)), 1e-12)
+
+    def scores(self, rows: np.ndarray, indices: np.ndarray, weights: np.ndarray, batch: int) -> np.ndarray:
+        """
+        Cosine similarities of `batch` query vectors against every title, as a
+        (batch x titles) array. `rows` tells which query each (index, weight) entry belongs to.
+        """
+        n = len(self.ids)
+        columns = self.dense_column[indices]
+        in_dense = columns >= 0
+        query = np.zeros((batch, self.dense.shape[1]))
+        query[rows[in_dense], columns[in_dense]] = weights[in_dense]
+        scores = (query @ self.dense.T).reshape(-1)
+
+        rows, indices, weights = rows[~in_dense], indices[~in_dense], weights[~in_dense]
+        lengths = self.post_ptr[indices + 1] - self.post_ptr[indices]
+        total = int(lengths.sum())
+        if total:
+            # Expand every entry into the posting list of its feature
+            offsets = np.arange(total) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+            positions = np.repeat(self.post_ptr[indices], lengths) + offsets
+            targets = np.repeat(rows, lengths) * n + self.post_rows[positions]
+            scores += np.bincount(targets, weights=np.repeat(weights, lengths) * self.post_data[positions], minlength=batch * n)
+        return scores.reshape(batch, n)
+
+    def top_k(self, k: int, batch_cells: int) -> Dict[str, List[Tuple[float, str]]]:
+        """Top-k neighbours of every title, computed in batches of about `batch_cells` scores."""
+        n = len(self.ids)
+        neighbours = {}
+        batch = max(1, batch_cells // max(n, 1))
+        for start in range(0, n, batch):
+            stop = min(start + batch, n)
+            lo, hi = self.indptr[start], self.indptr[stop]
+            rows = np.repeat(np.arange(stop - start), np.diff(self.indptr[start:stop + 1]))
+            scores = self.scores(rows, self.indices[lo:hi], self.data[lo:hi], stop - start)
+            scores[np.arange(stop - start), np.arange(start, stop)] = 0  # not similar to itself
+            for offset, ranked in enumerate(self.select(scores, k)):
+                neighbours[self.ids[start + offset]] = ranked
+        return neighbours
+
+    def select(self, scores: np.ndarray, k: int) -> List[List[Tuple[float, str]]]:
+        """Picks each row's k best positive scores as (score, id), best first."""
+        k = min(k, scores.shape[1])
+        if k <= 0:
+            return [[] for _ in range(scores.shape[0])]
+        best = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        return [
+            sorted(((float(scores[r, c]), self.ids[c]) for c in candidates if scores[r, c] > 0), reverse=True)
+            for r, candidates in enumerate(best)
+        ]
+
+
+# --- Recommendation State ---
+_model: Optional[SimilarityModel] = None
+_similar: Dict[str, List[Tuple[float, str]]] = {}  # content id -> [(score, neighbour id)], best first
+_titles: Dict[str, Tuple[str, Optional[int]]] = {}  # content id -> (name, year)
+_built_at = 0.0
+_stale = False
+
+
+def build_recommendations() -> dict:
+    """Loads the catalog and computes every title's neighbours. Blocking."""
+    started = time.monotonic()
+    ids, feature_lists, titles = [], [], {}
+    for collection in READ_CONTENT_COLLECTIONS:
+        for doc in collection.find({}, PROJECTION):
+            cid = str(doc["_id"])
+            ids.append(cid)
+            feature_lists.append(doc_features(doc))
+            titles[cid] = (doc.get("name") or "Untitled", doc.get("year"))
+    model = SimilarityModel(ids, feature_lists)
+    similar = model.top_k(Config.RECOMMEND_TOP_K, Config.RECOMMEND_BATCH_CELLS)
+    logger.info("Recommendations for %s titles computed in %.2fs.", len(ids), time.monotonic() - started)
+    return {"model": model, "similar": similar, "titles": titles}
+
+
+def restore_recommendations(state: dict):
+    """Swaps in a built or snapshotted state. A snapshot keeps its original age for RECOMMEND_REFRESH_INTERVAL."""
+    global _model, _similar, _titles, _built_at
+    _model, _similar, _titles = state["model"], state["similar"], state["titles"]
+    _built_at = time.monotonic() - state.get("age", 0.0)
+
+
+def recommendations_snapshot() -> Optional[dict]:
+    """
+    A copy of the current state for an on-disk snapshot, or None before the first build.
+    The model is never changed after it is built; the neighbour lists are replaced, not edited.
+    """
+    if _model is None:
+        return None
+    return {"model": _model, "similar": dict(_similar), "titles": dict(_titles), "age": time.monotonic() - _built_at}
+
+
+async def refresh_recommendations():
+    """Rebuilds every title's neighbours in a worker thread."""
+    from .user_features import invalidate_rendered_details # Avoid circular import
+    global _stale
+
+    # Cleared first, so a change that lands during the build marks the result stale again
+    _stale = False
+    state = await asyncio.to_thread(build_recommendations)
+    restore_recommendations(state)
+    # Cached detail views still carry the old similar-title buttons
+    invalidate_rendered_details()
+
+
+def score_new_title(model: SimilarityModel, features: List[str]) -> np.ndarray:
+    """Similarities of one title against the whole model. Blocking."""
+    indices, weights = model.vector(features)
+    return model.scores(np.zeros(len(indices), dtype=np.int64), indices, weights, 1)[0]
+
+
+async def update_recommendations(content_id: str):
+    """
+    Scores a saved title against the catalog, stores its neighbours and inserts it
+    into the lists of titles it now belongs to, without a full rebuild.
+    """
+    from .inline_search import load_content_doc # Avoid circular import
+    from .user_features import invalidate_rendered_details # Avoid circular import
+    global _stale
+
+    model = _model
+    try:
+        loaded = await asyncio.to_thread(load_content_doc, content_id)
+        if not loaded or model is None:
+            return
+        doc, _ = loaded
+        scores = await asyncio.to_thread(score_new_title, model, doc_features(doc))
+    except Exception as e:
+        logger.error("Error updating recommendations for %s, scheduling a rebuild: %s", content_id, e)
+        _stale = True
+        return
+    if content_id in model.positions:
+        scores[model.positions[content_id]] = 0
+
+    k = Config.RECOMMEND_TOP_K
+    _titles[content_id] = (doc.get("name") or "Untitled", doc.get("year"))
+    _similar[content_id] = model.select(scores[None, :], k)[0]
+    for position in np.flatnonzero(scores > 0):
+        other = model.ids[position]
+        neighbours = [item for item in _similar.get(other, []) if item[1] != content_id]
+        if len(neighbours) < k or scores[position] > neighbours[-1][0]:
+            neighbours.append((float(scores[position]), content_id))
+            neighbours.sort(reverse=True)
+            _similar[other] = neighbours[:k]
+            # Its cached detail view shows the old similar-title buttons
+            invalidate_rendered_details(other)
+
+
+@register_invalidator
+def invalidate_recommendations(content_id: Optional[str] = None):
+    """
+    Scores a single saved title incrementally. When everything may have changed,
+    marks the recommendations as stale and the loop rebuilds them on its next pass.
+    """
+    global _stale
+    if content_id is None or _model is None:
+        _stale = True
+        return
+    try:
+        run_detached(update_recommendations(content_id))
+    except RuntimeError:
+        # Called outside the event loop, fall back to a rebuild
+        _stale = True
+
+
+def similar_titles(content_id: str, limit: int = Config.RECOMMEND_COUNT) -> List[Tuple[str, str, Optional[int]]]:
+    """The best neighbours of a title as (id, name, year), from memory."""
+    result = []
+    for _, other in _similar.get(content_id, []):
+        if other in _titles and other != content_id:
+            result.append((other, *_titles[other]))
+            if len(result) >= limit:
+                break
+    return result
+
+
+async def recommendations_loop(warmup: Optional[asyncio.Task] = None):
+    """
+    Builds the recommendations at startup and refreshes them. The first build
+    waits for the cache warm-up, which may restore them from a snapshot instead.
+    """
+    if warmup is not None:
+        await asyncio.wait([warmup])
+    while True:
+        if _model is None or _stale or time.monotonic() - _built_at >= Config.RECOMMEND_REFRESH_INTERVAL:
+            try:
+                await refresh_recommendations()
+            except Exception as e:
+                logger.error("Error in recommendations_loop: %s", e)
+        await asyncio.sleep(min(Config.RECOMMEND_REFRESH_INTERVAL, RECHECK_INTERVAL))
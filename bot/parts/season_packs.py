@@ -0,0 +1,320 @@
+# bot/parts/season_packs.py
+"""
+Whole-season downloads.
+
+A `pack-<collection>-<content id>-<season>-<quality code>` deep link resolves
+every episode of one season in one quality with a single query on `seasons_data`
+in the title's own collection, then sends
+the files as Telegram media groups of up to PACK_GROUP_SIZE files. Each group
+costs one get_messages call per source channel and one send_media_group call,
+instead of a lookup and a copy_message per episode. The user sees one status
+message that is edited after every group. With the job queue enabled, the job
+checkpoints after every media group it sends, so a FloodWait or a worker
+restart resumes with the next unsent episode instead of starting over.
+"""
+
+import asyncio
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from pyrogram import Client, filters
+from pyrogram.errors import FloodWait
+from pyrogram.types import (
+    Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton,
+    InputMediaDocument, InputMediaVideo
+)
+from bson import ObjectId
+
+from config import Config
+from ..logging_pipeline import instrument
+from .core_bot_functionality import (
+    READ_CONTENT_COLLECTIONS, CONTENT_COLLECTIONS, QUALITY_LABELS, media_quality_label, run_detached
+)
+from .analytics import record_download
+from .job_queue import job_handler, enqueue_job, checkpoint_job, RetryJob
+
+logger = logging.getLogger(__name__)
+
+# Telegram accepts at most 10 items per media group
+MAX_GROUP_SIZE = 10
+# collection name -> (secondary-preferred, primary) handles; links and buttons carry the name
+SERIES_COLLECTIONS = {
+    primary.name: (secondary, primary) for secondary, primary in zip(READ_CONTENT_COLLECTIONS, CONTENT_COLLECTIONS)
+}
+
+
+# --- Links ---
+def pack_link(collection_name: str, content_id: str, season: str, quality: int) -> str:
+    """Deep link to a season pack. Telegram allows 64 characters in a start parameter, this uses about 42."""
+    return f"https://t.me/{Config.BOT_USERNAME}?start=pack-{collection_name}-{content_id}-{season}-{quality}"
+
+
+def parse_pack_param(param: str) -> Optional[Tuple[str, str, str, int]]:
+    """Parses "pack-<collection>-<content id>-<season>-<quality code>", or returns None if it's malformed."""
+    parts = param.split("-")
+    if (len(parts) != 5 or parts[1] not in SERIES_COLLECTIONS or not ObjectId.is_valid(parts[2])
+            or not parts[3].isdigit() or not parts[4].isdigit()):
+        return None
+    return parts[1], parts[2], parts[3], int(parts[4])
+
+
+def _number_order(number: str) -> tuple:
+    """Sorts season and episode keys numerically ("2" before "10"), anything else after them."""
+    return (0, int(number), "") if number.isdigit() else (1, 0, number)
+
+
+def season_pack_files(content: Dict, season: str, quality: int) -> List[Dict]:
+    """One available file per episode of a season in the given quality, in episode order."""
+    label = QUALITY_LABELS.get(quality)
+    media_by_id = {media["msg_id"]: media for media in content.get("media_files", [])}
+    episodes = content.get("seasons_data", {}).get(season, {}).get("episodes", {})
+    files = []
+    for _, episode in sorted(episodes.items(), key=lambda item: _number_order(item[0])):
+        for ref in episode.get("files", []):
+            # Documents not yet migrated to schema 2 store whole media entries here
+            msg_id = ref["msg_id"] if isinstance(ref, dict) else ref
+            media = media_by_id.get(msg_id, ref if isinstance(ref, dict) else None)
+            if media and not media.get("dead") and media_quality_label(media) == label:
+                files.append(media)
+                break
+    return files
+
+
+def season_pack_options(content: Dict) -> List[Tuple[str, List[Tuple[int, int]]]]:
+    """Every season with the qualities it can be packed in: [(season, [(quality code, episodes)])]."""
+    options = []
+    for season in sorted(content.get("seasons_data", {}), key=_number_order):
+        qualities = []
+        for quality in sorted(QUALITY_LABELS):
+            count = len(season_pack_files(content, season, quality))
+            if count:
+                qualities.append((quality, count))
+        if qualities:
+            options.append((season, qualities))
+    return options
+
+
+def load_series(collection_name: str, content_id: str, projection: Dict) -> Optional[Dict]:
+    """
+    Reads a title from its collection with one query. The primary is only asked when
+    the secondary doesn't have it yet (a title added moments ago). Blocking.
+    """
+    for collection in SERIES_COLLECTIONS.get(collection_name, ()):
+        content = collection.find_one({"_id": ObjectId(content_id)}, projection)
+        if content:
+            return content
+    return None
+
+
+# --- Season Menu ---
+@Client.on_callback_query(filters.regex(r"^view_seasons_"))
+@instrument
+async def view_seasons_callback(client: Client, callback_query: CallbackQuery):
+    """Lists a series' seasons with one whole-season download button per quality."""
+    try:
+        _, _, collection_name, content_id = callback_query.data.split("_", 3)
+        projection = {"name": 1, "seasons_data": 1, "media_files.msg_id": 1, "media_files.quality": 1, "media_files.dead": 1}
+        content = await asyncio.to_thread(load_series, collection_name, content_id, projection)
+        options = season_pack_options(content) if content else []
+        if not options:
+            await callback_query.answer("❌ No episodes are available for this title yet.", show_alert=True)
+            return
+
+        buttons = [
+            [
+                InlineKeyboardButton(f"📦 S{season} · {QUALITY_LABELS[quality]} ({count})", url=pack_link(collection_name, content_id, season, quality))
+                for quality, count in qualities
+            ]
+            for season, qualities in options
+        ]
+        buttons.append([InlineKeyboardButton("⬅️ Back to Details", callback_data=f"view_content_{content_id}")])
+        text = (
+            f"📺 **{content.get('name', 'N/A')}**\n\n"
+            "Pick a season and quality to get every episode in one go."
+        )
+        # The detail view may be a photo with a caption
+        if callback_query.message.photo:
+            await callback_query.message.edit_caption(text, reply_markup=InlineKeyboardMarkup(buttons))
+        else:
+            await callback_query.message.edit_text(text, reply_markup=InlineKeyboardMarkup(buttons))
+        await callback_query.answer()
+    except Exception as e:
+        logger.error("Error in view_seasons_callback: %s", e)
+        await callback_query.answer("❌ An error occurred while loading the seasons.", show_alert=True)
+
+
+# --- Pack Requests ---
+def pack_status_text(payload: Dict, sent: int, failed: int, done: bool = False) -> str:
+    total = len(payload["files"])
+    text = f"📦 **{payload['title']}**\n\n"
+    if done:
+        text += f"✅ Sent {sent - failed} of {total} episodes."
+        if failed:
+            text += f"\n⚠️ {failed} could not be sent, they might have been removed from our sources."
+    else:
+        text += f"⬇️ Sending episodes... {sent}/{total}"
+    return text
+
+
+async def handle_pack_request(client: Client, message: Message):
+    """Handles `pack-` deep links: resolves a season's files in one query and starts the delivery."""
+    try:
+        parsed = parse_pack_param(message.command[1])
+        if not parsed or parsed[3] not in QUALITY_LABELS:
+            await message.reply_text("❌ This link is not valid. Please search for the content again.")
+            return
+        collection_name, content_id, season, quality = parsed
+
+        projection = {"name": 1, f"seasons_data.{season}": 1, "media_files": 1}
+        content = await asyncio.to_thread(load_series, collection_name, content_id, projection)
+        files = season_pack_files(content, season, quality) if content else []
+        if not files:
+            await message.reply_text("❌ No episodes were found for this season. Please search for the content again.")
+            return
+        for media in files:
+            record_download(content_id, media["msg_id"], collection_name)
+
+        payload = {
+            "chat_id": message.chat.id,
+            "title": f"{content.get('name', 'N/A')} · Season {season} · {QUALITY_LABELS[quality]}",
+            "files": [
+                {
+                    "msg_id": media["msg_id"],
+                    "channel_id": media["channel_id"],
+                    "message_id": media["original_msg_id"],
+                    "fallbacks": [[copy["channel_id"], copy["original_msg_id"]] for copy in media.get("fallbacks", [])]
+                }
+                for media in files
+            ]
+        }
+        status = await message.reply_text(pack_status_text(payload, 0, 0))
+        payload["status_message_id"] = status.id
+        if Config.JOB_QUEUE_ENABLED:
+            # A worker process sends the groups (see worker.py)
+            await asyncio.to_thread(enqueue_job, "deliver_pack", payload, priority=1)
+        else:
+            run_detached(deliver_pack(client, payload))
+
+    except Exception as e:
+        logger.error("Error in handle_pack_request: %s", e)
+        await message.reply_text("❌ An error occurred while processing your request.")
+
+
+# --- Delivery ---
+async def fetch_sources(client: Client, files: List[Dict]) -> Dict[str, Message]:
+    """
+    Fetches the source post of every file with one get_messages call per channel,
+    then tries the fallback copies of the files whose preferred post is gone.
+    Returns {msg_id: source message}. FloodWait is left to the caller.
+    """
+    sources = {}
+    for attempt in range(1 + max((len(f["fallbacks"]) for f in files), default=0)):
+        by_channel: Dict[int, List[Tuple[int, str]]] = {}
+        for f in files:
+            candidates = [[f["channel_id"], f["message_id"]]] + f["fallbacks"]
+            if f["msg_id"] not in sources and attempt < len(candidates):
+                channel_id, message_id = candidates[attempt]
+                by_channel.setdefault(channel_id, []).append((message_id, f["msg_id"]))
+        for channel_id, wanted in by_channel.items():
+            try:
+                messages = await client.get_messages(channel_id, [message_id for message_id, _ in wanted])
+            except FloodWait:
+                raise
+            except Exception as e:
+                logger.error("Failed to fetch pack sources from %s: %s", channel_id, e)
+                continue
+            for (_, msg_id), msg in zip(wanted, messages):
+                if msg and not msg.empty and (msg.video or msg.document):
+                    sources[msg_id] = msg
+    return sources
+
+
+def media_runs(group: List[Dict], sources: Dict[str, Message]) -> List[Tuple[int, List, int]]:
+    """
+    Turns a group's source posts into input media, split into runs of one kind:
+    Telegram doesn't mix documents with videos in a media group. Returns
+    (files covered, [(source, input media)], files without a source) per run, in
+    file order, so progress can be saved after every run.
+    """
+    runs, kind = [], None
+    for f in group:
+        msg = sources.get(f["msg_id"])
+        if msg is None:
+            if not runs:
+                runs.append([0, [], 0])
+            runs[-1][0] += 1
+            runs[-1][2] += 1
+            continue
+        if msg.video:
+            media, media_kind = InputMediaVideo(msg.video.file_id, caption=msg.caption or ""), "video"
+        else:
+            media, media_kind = InputMediaDocument(msg.document.file_id, caption=msg.caption or ""), "document"
+        if media_kind != kind or not runs:
+            runs.append([0, [], 0])
+            kind = media_kind
+        runs[-1][0] += 1
+        runs[-1][1].append((msg, media))
+    return [tuple(run) for run in runs]
+
+
+async def send_group(client: Client, chat_id: int, run: List):
+    """Sends one run as a media group, or a single copy when it holds one file."""
+    if len(run) == 1:
+        msg, _ = run[0]
+        await client.copy_message(chat_id=chat_id, from_chat_id=msg.chat.id, message_id=msg.id)
+    else:
+        await client.send_media_group(chat_id, [media for _, media in run])
+
+
+async def update_status(client: Client, payload: Dict, sent: int, failed: int, done: bool = False):
+    try:
+        await client.edit_message_text(payload["chat_id"], payload["status_message_id"], pack_status_text(payload, sent, failed, done))
+    except Exception as e:
+        logger.warning("Could not update pack status: %s", e)
+
+
+async def deliver_pack(client: Client, payload: Dict, job: Optional[Dict] = None):
+    """
+    Sends a season pack group by group, starting after the last checkpointed file.
+    Progress is saved after every media group sent, so a retry never sends an
+    episode twice. In a queued job a FloodWait retries the job after the wait.
+    """
+    checkpoint = payload.get("checkpoint", {})
+    sent, failed = checkpoint.get("sent", 0), checkpoint.get("failed", 0)
+    files = payload["files"]
+    group_size = min(Config.PACK_GROUP_SIZE, MAX_GROUP_SIZE)
+
+    while sent < len(files):
+        group = files[sent:sent + group_size]
+        try:
+            sources = await fetch_sources(client, group)
+            for covered, items, missing in media_runs(group, sources):
+                try:
+                    if items:
+                        await send_group(client, payload["chat_id"], items)
+                except FloodWait:
+                    raise
+                except Exception as e:
+                    if job is not None:
+                        raise
+                    # Without the queue nothing retries this run, so count it as failed and go on
+                    logger.error("Failed to send season pack files to %s: %s", payload['chat_id'], e)
+                    missing = covered
+                sent += covered
+                failed += missing
+                if job is not None:
+                    await asyncio.to_thread(checkpoint_job, job["_id"], {"sent": sent, "failed": failed})
+        except FloodWait as e:
+            if job is not None:
+                raise RetryJob(e.value, "FloodWait while delivering a season pack")
+            await asyncio.sleep(e.value)
+            continue
+        await update_status(client, payload, sent, failed, done=sent >= len(files))
+        if sent < len(files):
+            await asyncio.sleep(Config.PACK_GROUP_DELAY)
+
+
+@job_handler("deliver_pack")
+async def deliver_pack_job(client: Client, payload: Dict, job: Dict):
+    """Worker-side season pack delivery for handle_pack_request. Retries resume from the checkpoint."""
+    await deliver_pack(client, payload, job)
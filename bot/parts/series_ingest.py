@@ -0,0 +1,315 @@
+# bot/parts/series_ingest.py
+
+import asyncio
+import logging
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional
+
+from pymongo import UpdateOne
+from pyrogram import Client, filters
+from pyrogram.errors import FloodWait, MessageNotModified
+from pyrogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
+
+from config import Config
+from .core_bot_functionality import db, get_user_session, get_collection_by_type, media_quality_label
+from .admin_upload import compile_search_pattern, matches_search, build_search_result, process_next_name
+from .details_collection import build_media_entries, upsert_content_doc
+from .media_registry import assign_registered_ids, register_media
+from .job_queue import job_handler
+from .caching import invalidate_content
+
+logger = logging.getLogger(__name__)
+
+# Files found by a history scan wait here, one document per distinct file, until
+# the admin finishes the upload. Abandoned scans expire after INGEST_STAGING_TTL.
+ingest_staging = db.ingest_staging
+
+
+def ensure_ingest_indexes():
+    """Creates the staging indexes. Blocking."""
+    ingest_staging.create_index([("ingest_id", 1), ("dedup_key", 1)], unique=True)
+    ingest_staging.create_index("created_at", expireAfterSeconds=Config.INGEST_STAGING_TTL)
+
+
+# --- History Scan ---
+async def latest_message_id(client: Client, channel_id: int) -> Optional[int]:
+    """The id of a channel's newest message, or None if it can't be read."""
+    try:
+        async for msg in client.get_chat_history(channel_id, limit=1):
+            return msg.id
+    except Exception as e:
+        logger.warning("Could not read the latest message of channel %s: %s", channel_id, e)
+    return None
+
+
+async def iter_channel_history(client: Client, channel_id: int) -> AsyncIterator[Message]:
+    """
+    Yields every message of a channel in id order. Messages are fetched by id in
+    batches up to the channel's newest message, so large deleted ranges don't end
+    the scan early. Only when the newest id can't be read does the scan fall back
+    to stopping after INGEST_EMPTY_BATCHES consecutive empty batches.
+    """
+    last_id = await latest_message_id(client, channel_id)
+    if last_id is None:
+        logger.warning("Scanning channel %s until %s empty batches; it may be incomplete.", channel_id, Config.INGEST_EMPTY_BATCHES)
+    start = 1
+    empty_batches = 0
+    while True:
+        if last_id is not None:
+            if start > last_id:
+                break
+        elif empty_batches >= Config.INGEST_EMPTY_BATCHES:
+            break
+        message_ids = list(range(start, start + Config.INGEST_BATCH_SIZE))
+        try:
+            messages = await client.get_messages(channel_id, message_ids)
+        except FloodWait as e:
+            logger.warning("FloodWait of %ss while scanning channel %s.", e.value, channel_id)
+            await asyncio.sleep(e.value)
+            continue
+
+        found = [msg for msg in messages if msg and not msg.empty]
+        empty_batches = 0 if found else empty_batches + 1
+        for msg in found:
+            yield msg
+        start += Config.INGEST_BATCH_SIZE
+
+
+class SeriesIngest:
+    """
+    Streams every file matching a title from the channel history into the staging
+    collection. Files are classified by season/episode as they arrive and written
+    in chunks of INGEST_CHUNK_SIZE, so memory stays bounded however long the series is.
+    """
+    def __init__(self, name: str, ent_type: str):
+        self.ingest_id = uuid.uuid4().hex
+        self.name = name
+        self.ent_type = ent_type
+        self.pattern = compile_search_pattern(name)
+        self.pending: List[UpdateOne] = []
+        self.seen_keys = set()
+        self.seasons = Counter()    # season -> number of files
+        self.qualities = Counter()  # quality -> number of files
+        self.scanned = 0
+
+    @property
+    def files(self) -> int:
+        return len(self.seen_keys)
+
+    def add(self, result: dict):
+        """Classifies one matching file and queues its staging write. Reposts become extra copies."""
+        entry = build_media_entries([result], self.ent_type)[0]
+        entry.pop("fallbacks")
+        if entry["dedup_key"] not in self.seen_keys:
+            self.seen_keys.add(entry["dedup_key"])
+            self.seasons[entry["season"]] += 1
+            self.qualities[media_quality_label(entry)] += 1
+        # Channels are scanned in CHANNEL_IDS order, so the first copy stored is the preferred one
+        self.pending.append(UpdateOne(
+            {"ingest_id": self.ingest_id, "dedup_key": entry["dedup_key"]},
+            {
+                "$setOnInsert": dict(entry, ingest_id=self.ingest_id, created_at=datetime.utcnow()),
+                "$addToSet": {"copies": {"channel_id": entry["channel_id"], "original_msg_id": entry["original_msg_id"]}}
+            },
+            upsert=True
+        ))
+
+    async def flush(self):
+        """Writes the queued files to the staging collection."""
+        if self.pending:
+            ops, self.pending = self.pending, []
+            # Ordered, so two copies of a file in one chunk upsert into the same document
+            await asyncio.to_thread(ingest_staging.bulk_write, ops, ordered=True)
+
+    async def run(self, client: Client, progress=None):
+        """Scans all configured channels. `progress` is awaited with this object every few seconds."""
+        last_progress = time.monotonic()
+        for channel_id in Config.CHANNEL_IDS:
+            try:
+                async for msg in iter_channel_history(client, channel_id):
+                    self.scanned += 1
+                    if msg.video or msg.document:
+                        result = build_search_result(msg, channel_id)
+                        if matches_search(self.pattern, result["file_name"], result["caption"]):
+                            self.add(result)
+                    if len(self.pending) >= Config.INGEST_CHUNK_SIZE:
+                        await self.flush()
+                    if progress and time.monotonic() - last_progress >= Config.INGEST_PROGRESS_INTERVAL:
+                        last_progress = time.monotonic()
+                        await progress(self)
+            except Exception as e:
+                logger.error("Could not scan channel %s: %s", channel_id, e)
+        await self.flush()
+
+    def summary(self) -> str:
+        """Per-season and per-quality file counts for the admin."""
+        seasons = ", ".join(f"S{season}: {count}" for season, count in sorted(self.seasons.items()))
+        qualities = ", ".join(f"{quality}: {count}" for quality, count in self.qualities.most_common())
+        return (
+            f"📁 **Files found:** {self.files}\n"
+            f"📺 **Seasons:** {seasons}\n"
+            f"🎞️ **Qualities:** {qualities}"
+        )
+
+
+def discard_staged(ingest_id: str):
+    """Drops a scan's staged files. Blocking."""
+    ingest_staging.delete_many({"ingest_id": ingest_id})
+
+
+# --- /up Integration ---
+@Client.on_callback_query(filters.regex("^scan_mode$") & filters.user(Config.ADMIN_IDS))
+async def enable_scan_mode(client: Client, callback_query: CallbackQuery):
+    """Switches the current upload to a full history scan."""
+    session = get_user_session(callback_query.from_user.id)
+    session.scan_mode = True
+    await callback_query.message.edit_text(
+        "📚 **Full History Scan enabled.**\n\n"
+        "Every message in the source channels will be checked, so long series are captured completely. "
+        "This takes longer than a normal search.\n\n"
+        "📝 Now, send me the name(s) of the series, separated by commas.",
+        reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("❌ Cancel", callback_data="cancel_upload")]])
+    )
+    await callback_query.answer("Full history scan enabled.")
+
+
+async def ingest_series_item(client: Client, progress_msg: Message, user_id: int, current_name: str):
+    """Runs a history scan for one name and asks the admin to keep or discard what it found."""
+    session = get_user_session(user_id)
+    ingest = SeriesIngest(current_name, session.entertainment_type)
+
+    async def report(progress: SeriesIngest):
+        try:
+            await progress_msg.edit_text(
+                f"📚 **Scanning for:** `{current_name}`\n\n"
+                f"🔎 **Messages checked:** {progress.scanned}\n"
+                f"📁 **Files found:** {progress.files}\n\n"
+                "⏳ Please wait..."
+            )
+        except MessageNotModified:
+            pass
+        except Exception as e:
+            logger.warning("Could not update scan progress: %s", e)
+
+    await ingest.run(client, report)
+
+    if not ingest.files:
+        session.unavailable_list.append(current_name)
+        await progress_msg.edit_text(
+            f"❌ **No files found for:** `{current_name}`\n"
+            "This item has been added to the unavailable list.\n\n"
+            "⏭️ Moving to the next item..."
+        )
+        session.current_name_index += 1
+        await process_next_name(client, progress_msg, user_id)
+        return
+
+    session.staged_items[current_name] = ingest
+    await progress_msg.edit_text(
+        f"📚 **Scan complete for:** `{current_name}`\n"
+        f"🔎 **Messages checked:** {ingest.scanned}\n\n"
+        f"{ingest.summary()}\n\n"
+        "Are these the correct files for this item?",
+        reply_markup=InlineKeyboardMarkup([[
+            InlineKeyboardButton("✅ Correct", callback_data=f"ingest_keep_{current_name}"),
+            InlineKeyboardButton("❌ Discard", callback_data=f"ingest_drop_{current_name}")
+        ]])
+    )
+
+
+@Client.on_callback_query(filters.regex(r"^ingest_(keep|drop)_") & filters.user(Config.ADMIN_IDS))
+async def handle_ingest_action(client: Client, callback_query: CallbackQuery):
+    """Keeps or discards the staged files of a history scan, then moves to the next name."""
+    user_id = callback_query.from_user.id
+    session = get_user_session(user_id)
+    action, name = callback_query.data[len("ingest_"):].split("_", 1)
+
+    try:
+        if action == "drop":
+            ingest = session.staged_items.pop(name, None)
+            if ingest:
+                await asyncio.to_thread(discard_staged, ingest.ingest_id)
+            session.unavailable_list.append(name)
+            await callback_query.answer("Discarded.")
+        else:
+            await callback_query.answer("✅ Correct! Moving to the next item...")
+        session.current_name_index += 1
+        await process_next_name(client, callback_query.message, user_id)
+    except Exception as e:
+        logger.error("Error in handle_ingest_action: %s", e)
+        await callback_query.answer("❌ An error occurred.", show_alert=True)
+
+
+# --- Chunked Merge Into the Content Document ---
+def load_staged_chunk(ingest_id: str, after_id=None) -> List[Dict]:
+    """Returns the next INGEST_CHUNK_SIZE staged files as media entries. Blocking."""
+    query = {"ingest_id": ingest_id}
+    if after_id is not None:
+        query["_id"] = {"$gt": after_id}
+    chunk = []
+    for staged in ingest_staging.find(query).sort("_id", 1).limit(Config.INGEST_CHUNK_SIZE):
+        copies = staged.pop("copies", [])
+        entry = {k: v for k, v in staged.items() if k not in ("ingest_id", "created_at")}
+        primary = (entry["channel_id"], entry["original_msg_id"])
+        entry["fallbacks"] = [c for c in copies if (c["channel_id"], c["original_msg_id"]) != primary]
+        chunk.append(entry)
+    return chunk
+
+
+def push_media_chunk(collection, content_id, content_doc: Dict, chunk: List[Dict]):
+    """Registers one chunk of files and appends it to the content document and its season tree. Blocking."""
+    holder = {"name": content_doc["name"], "year": content_doc["year"], "media_files": chunk}
+    assign_registered_ids([holder])
+
+    pushes = {"media_files": {"$each": chunk}}
+    by_episode = {}
+    for media in chunk:
+        by_episode.setdefault((media["season"], media["episode"]), []).append(media["msg_id"])
+    for (season, episode), files in by_episode.items():
+        pushes[f"seasons_data.{season}.episodes.{episode}.files"] = {"$each": files}
+
+    collection.update_one({"_id": content_id}, {"$push": pushes, "$set": {"updated_at": datetime.utcnow()}})
+    register_media([holder], collection.name)
+
+
+async def save_staged_series(client: Client, message: Optional[Message], doc: Dict, ent_type: str, ingest_id: str):
+    """
+    Upserts a series from a history scan. The document is saved without files first,
+    then the staged files are appended chunk by chunk. Re-running it starts over.
+    """
+    collection = get_collection_by_type(ent_type)
+    doc = dict(doc, media_files=[], seasons_data={})
+    content_id, is_new = await asyncio.to_thread(upsert_content_doc, collection, doc)
+
+    last_id = None
+    total = 0
+    while True:
+        chunk = await asyncio.to_thread(load_staged_chunk, ingest_id, last_id)
+        if not chunk:
+            break
+        last_id = chunk[-1]["_id"]
+        for media in chunk:
+            del media["_id"]
+        await asyncio.to_thread(push_media_chunk, collection, content_id, doc, chunk)
+        total += len(chunk)
+
+    await asyncio.to_thread(discard_staged, ingest_id)
+    logger.info("Saved '%s' from a history scan with %s files.", doc['name'], total)
+    invalidate_content(str(content_id))
+
+    # The blog post lists the series without per-episode download buttons
+    from .blogger_integration import update_blogger_site
+    await update_blogger_site(client, message, doc, ent_type)
+
+    if is_new:
+        from .subscriptions import announce_new_content # Avoid circular import
+        await announce_new_content(client, doc, str(content_id))
+
+
+@job_handler("finalize_series")
+async def finalize_series_job(client: Client, payload: Dict, job: Dict):
+    """Worker-side merge of a history scan into its content document."""
+    await save_staged_series(client, None, payload["doc"], payload["ent_type"], payload["ingest_id"])
@@ -0,0 +1,160 @@
+# bot/parts/snapshots.py
+"""
+On-disk snapshots of the in-memory caches for warm restarts.
+
+The inline title index (titles, token and spelling indexes, latest feed), the
+trending list, the rendered detail views and the similar-title recommendations
+are written periodically and on shutdown to one file: a small JSON header with
+the catalog version stamp, followed by a pickle of the cache states. At startup
+the header is checked against the current stamp before anything else is read;
+a matching snapshot is unpickled straight from a memory map and swapped in, a
+stale one is ignored and the caches are rebuilt from MongoDB as before.
+"""
+
+import asyncio
+import json
+import logging
+import mmap
+import os
+import pickle
+import struct
+import time
+from typing import Dict, Optional
+
+from config import Config
+from .core_bot_functionality import READ_CONTENT_COLLECTIONS, CONTENT_SCHEMA_VERSION
+from .inline_search import title_index_snapshot, restore_title_index
+from .analytics import trending_snapshot, restore_trending
+from .user_features import rendered_details_snapshot, restore_rendered_details
+from .recommendations import recommendations_snapshot, restore_recommendations
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"KEBSNAP1"
+HEADER_LENGTH = struct.Struct(">I")
+
+# name -> (capture, restore). Captures run on the event loop and return copies that
+# later cache updates can't change; a capture returning None leaves that part out.
+SNAPSHOT_PARTS = {
+    "title_index": (title_index_snapshot, restore_title_index),
+    "trending": (trending_snapshot, restore_trending),
+    "rendered_details": (rendered_details_snapshot, restore_rendered_details),
+    "recommendations": (recommendations_snapshot, restore_recommendations),
+}
+
+
+def catalog_stamp() -> Dict:
+    """
+    Identifies the catalog's current version: the document count and latest
+    updated_at of every content collection, plus the schema version. Blocking.
+    """
+    stamp = {"schema": CONTENT_SCHEMA_VERSION}
+    for collection in READ_CONTENT_COLLECTIONS:
+        latest = collection.find_one({}, {"updated_at": 1}, sort=[("updated_at", -1)])
+        stamp[collection.name] = [
+            collection.estimated_document_count(),
+            latest["updated_at"].isoformat() if latest and latest.get("updated_at") else None
+        ]
+    return stamp
+
+
+# --- Writing ---
+def capture_state() -> Dict:
+    """Copies every cache's state. Runs on the event loop, where the caches are updated."""
+    state = {}
+    for name, (capture, _) in SNAPSHOT_PARTS.items():
+        part = capture()
+        if part is not None:
+            state[name] = part
+    return state
+
+
+def write_snapshot(stamp: Dict, state: Dict, path: str) -> int:
+    """Pickles captured state and writes the snapshot atomically. Returns its size in bytes. Blocking."""
+    header = json.dumps({"stamp": stamp, "created_at": time.time()}).encode("utf-8")
+    body = pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(HEADER_LENGTH.pack(len(header)))
+        f.write(header)
+        f.write(body)
+    os.replace(tmp_path, path)
+    return len(body)
+
+
+async def save_snapshot(path: str = Config.SNAPSHOT_PATH) -> bool:
+    """
+    Captures every cache and writes the snapshot. The stamp is taken first, so any
+    write that lands during the capture makes the file stale.
+    """
+    started = time.monotonic()
+    stamp = await asyncio.to_thread(catalog_stamp)
+    state = capture_state()
+    if "title_index" not in state:
+        # Nothing worth restoring without the index
+        return False
+    size = await asyncio.to_thread(write_snapshot, stamp, state, path)
+    logger.info("Cache snapshot of %.1f MB written in %.2fs.", size / 1024 / 1024, time.monotonic() - started)
+    return True
+
+
+# --- Loading ---
+def read_snapshot(path: str = Config.SNAPSHOT_PATH) -> Optional[Dict]:
+    """
+    Returns the cache states from a snapshot matching the current catalog stamp,
+    or None if the file is missing, corrupt or stale. Blocking.
+    """
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return None
+    with f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        if mm[:len(MAGIC)] != MAGIC:
+            logger.warning("Ignoring %s: not a cache snapshot.", path)
+            return None
+        offset = len(MAGIC) + HEADER_LENGTH.size
+        (header_length,) = HEADER_LENGTH.unpack(mm[len(MAGIC):offset])
+        header = json.loads(mm[offset:offset + header_length])
+        if header["stamp"] != catalog_stamp():
+            logger.info("Cache snapshot is stale, the catalog changed since it was written.")
+            return None
+        # Unpickle straight from the mapped file instead of reading a copy into memory first
+        view = memoryview(mm)[offset + header_length:]
+        try:
+            return pickle.loads(view)
+        finally:
+            view.release()
+
+
+async def load_snapshot(path: str = Config.SNAPSHOT_PATH) -> bool:
+    """Restores the caches from a valid snapshot. Returns False when they must be rebuilt."""
+    started = time.monotonic()
+    try:
+        state = await asyncio.to_thread(read_snapshot, path)
+    except Exception as e:
+        logger.error("Could not read cache snapshot %s: %s", path, e)
+        return False
+    if not state or "title_index" not in state:
+        return False
+    # Swapped in on the event loop, like every other cache update
+    for name, (_, restore) in SNAPSHOT_PARTS.items():
+        if name in state:
+            restore(state[name])
+    logger.info(
+        "Caches restored from snapshot in %.2fs "
+        "(%s titles).",
+        time.monotonic() - started, len(state['title_index']['entries'])
+    )
+    return True
+
+
+async def snapshot_loop():
+    """Writes a snapshot every SNAPSHOT_INTERVAL seconds."""
+    while True:
+        await asyncio.sleep(Config.SNAPSHOT_INTERVAL)
+        try:
+            await save_snapshot()
+        except Exception as e:
+            logger.error("Error in snapshot_loop: %s", e)
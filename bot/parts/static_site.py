@@ -0,0 +1,261 @@
+# bot/parts/static_site.py
+"""
+Static site export of the catalog, an alternative to one Blogger post per title.
+
+Every content document is rendered through templates/blog_template.html into a
+detail page, plus paginated index pages, one page per genre and per actor, and a
+sitemap. A manifest in the output directory stores a hash of each page's inputs,
+so a rebuild only renders pages whose source documents (or the template) changed
+and deletes pages of removed titles. Detail pages are rendered across a process
+pool. Run it with `python export_site.py`.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from html import escape
+from typing import Dict, List, Optional, Tuple
+
+from config import Config
+from .core_bot_functionality import read_db
+from .blogger_integration import load_blog_template, render_blog_html
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+# Bump when the listing layout below changes, so every listing page is rebuilt
+LAYOUT_VERSION = 1
+
+CONTENT_COLLECTIONS = ("movies", "series", "shows")
+
+# Only the fields that end up on a page, so unrelated updates don't trigger rebuilds
+PAGE_PROJECTION = {
+    "name": 1, "year": 1, "language": 1, "genre": 1, "actors": 1, "description": 1,
+    "poster_url": 1, "is_dubbed": 1, "created_at": 1,
+    "media_files.msg_id": 1, "media_files.quality": 1, "media_files.size": 1, "media_files.size_bytes": 1,
+    "media_files.dead": 1,
+}
+
+LIST_PAGE = """<!DOCTYPE html>
+<html lang="kn">
+<head>
+    <meta charset="UTF-8">
+    <title>{title}</title>
+    <style>
+        body {{ font-family: sans-serif; padding: 20px; }}
+        .container {{ max-width: 800px; margin: auto; }}
+        .item {{ display: flex; align-items: center; margin: 8px 0; }}
+        .item img {{ width: 60px; margin-right: 12px; }}
+        .pager a {{ margin-right: 12px; }}
+    </style>
+</head>
+<body>
+    <div class="container">
+        <h1>{title}</h1>
+        <hr>
+        {items}
+        <div class="pager">{pager}</div>
+    </div>
+</body>
+</html>
+"""
+
+
+# --- Catalog Loading ---
+def load_catalog() -> List[Dict]:
+    """Loads every content document with the fields pages need. Blocking."""
+    docs = []
+    for collection_name in CONTENT_COLLECTIONS:
+        for doc in read_db[collection_name].find({}, PAGE_PROJECTION):
+            doc["_id"] = str(doc["_id"])
+            doc["collection"] = collection_name
+            docs.append(doc)
+    # Newest first, like the inline "latest" list
+    docs.sort(key=lambda d: d.get("created_at") or 0, reverse=True)
+    return docs
+
+
+def slugify(value: str) -> str:
+    """A URL-safe file name; titles and names in Kannada script fall back to a short hash."""
+    slug = re.sub(r"[^a-z0-9]+", "-", (value or "").lower()).strip("-")
+    return slug or hashlib.sha1((value or "").encode("utf-8")).hexdigest()[:12]
+
+
+def fingerprint(*parts) -> str:
+    """Stable hash of a page's inputs."""
+    payload = json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def detail_path(doc: Dict) -> str:
+    return f"title/{doc['_id']}.html"
+
+
+# --- Page Planning ---
+def listing_pages(path_prefix: str, title: str, docs: List[Dict], page_size: int) -> List[Tuple[str, str, Dict]]:
+    """Splits a list of titles into numbered listing pages: (path, kind, payload)."""
+    chunks = [docs[i:i + page_size] for i in range(0, len(docs), page_size)] or [[]]
+    depth = path_prefix.count("/")
+    root = "../" * depth
+    page_names = [f"{path_prefix}index.html"] + [f"{path_prefix}page-{n}.html" for n in range(2, len(chunks) + 1)]
+    pages = []
+    for number, chunk in enumerate(chunks, start=1):
+        pages.append((page_names[number - 1], "list", {
+            "title": title if number == 1 else f"{title} - Page {number}",
+            "items": [
+                {"href": root + detail_path(d), "name": d.get("name") or "Untitled",
+                 "year": d.get("year"), "poster_url": d.get("poster_url")}
+                for d in chunk
+            ],
+            "prev": os.path.basename(page_names[number - 2]) if number > 1 else None,
+            "next": os.path.basename(page_names[number]) if number < len(chunks) else None,
+        }))
+    return pages
+
+
+def group_by_slug(docs: List[Dict], field: str) -> Dict[str, Tuple[str, List[Dict]]]:
+    """
+    Groups titles by the slug of each value of a list field: {slug: (name, titles)}.
+    Names with the same slug ("Sci-Fi", "sci fi") share one page, named after the
+    first spelling seen, so every path has exactly one payload.
+    """
+    groups = {}
+    for doc in docs:
+        values = {slugify(value): value for value in filter(None, doc.get(field) or [])}
+        for slug, value in values.items():
+            groups.setdefault(slug, (value, []))[1].append(doc)
+    return groups
+
+
+def plan_site(docs: List[Dict], page_size: int) -> List[Tuple[str, str, Dict]]:
+    """Lists every page of the site as (path, kind, payload)."""
+    pages = [(detail_path(doc), "detail", doc) for doc in docs]
+    pages.extend(listing_pages("", "Kannada Movies, Series & Shows", docs, page_size))
+
+    for slug, (genre, members) in group_by_slug(docs, "genre").items():
+        pages.extend(listing_pages(f"genre/{slug}/", f"{genre} Titles", members, page_size))
+    for slug, (actor, members) in group_by_slug(docs, "actors").items():
+        pages.extend(listing_pages(f"actor/{slug}/", f"Starring {actor}", members, page_size))
+    return pages
+
+
+# --- Rendering (runs in the pool processes) ---
+_template: Optional[str] = None
+_output_dir: Optional[str] = None
+
+
+def _init_renderer(template: str, output_dir: str):
+    """Pool initializer: every process receives the template once instead of per page."""
+    global _template, _output_dir
+    _template, _output_dir = template, output_dir
+
+
+def render_list_html(payload: Dict) -> str:
+    items = "".join(
+        f'<div class="item">'
+        + (f'<img src="{escape(item["poster_url"])}" alt="">' if item["poster_url"] else "")
+        + f'<a href="{item["href"]}">{escape(item["name"])} ({item["year"] or "N/A"})</a></div>\n'
+        for item in payload["items"]
+    )
+    pager = ""
+    if payload["prev"]:
+        pager += f'<a href="{payload["prev"]}">&larr; Newer</a>'
+    if payload["next"]:
+        pager += f'<a href="{payload["next"]}">Older &rarr;</a>'
+    return LIST_PAGE.format(title=escape(payload["title"]), items=items, pager=pager)
+
+
+def render_page(job: Tuple[str, str, Dict]) -> str:
+    """Renders one page and writes it under the output directory. Returns its path."""
+    path, kind, payload = job
+    if kind == "detail":
+        content = {k: v for k, v in payload.items() if v is not None}
+        html = render_blog_html(_template, content)
+    else:
+        html = render_list_html(payload)
+    target = os.path.join(_output_dir, path)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    with open(target, "w", encoding="utf-8") as f:
+        f.write(html)
+    return path
+
+
+# --- Build ---
+def load_manifest(output_dir: str) -> Dict:
+    try:
+        with open(os.path.join(output_dir, MANIFEST_NAME), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {"pages": {}}
+
+
+def write_sitemap(output_dir: str, paths: List[str], base_url: str):
+    urls = "".join(f"  <url><loc>{escape(base_url.rstrip('/') + '/' + path)}</loc></url>\n" for path in sorted(paths))
+    with open(os.path.join(output_dir, "sitemap.xml"), "w", encoding="utf-8") as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+                f"{urls}</urlset>\n")
+
+
+def build_site(
+    output_dir: str = Config.SITE_OUTPUT_DIR,
+    full: bool = False,
+    workers: int = Config.SITE_WORKERS,
+    docs: Optional[List[Dict]] = None
+) -> Dict:
+    """
+    Builds or updates the static site and returns build stats. Pages whose input
+    hash matches the manifest are skipped unless `full` is set. Blocking.
+    """
+    started = time.monotonic()
+    template = load_blog_template()
+    docs = load_catalog() if docs is None else docs
+    os.makedirs(output_dir, exist_ok=True)
+
+    previous = {} if full else load_manifest(output_dir)["pages"]
+    template_hash = fingerprint(template, Config.BOT_USERNAME)
+    current, jobs = {}, []
+    for page in plan_site(docs, Config.SITE_PAGE_SIZE):
+        path, kind, payload = page
+        salt = template_hash if kind == "detail" else LAYOUT_VERSION
+        current[path] = fingerprint(salt, payload)
+        if previous.get(path) != current[path] or not os.path.exists(os.path.join(output_dir, path)):
+            jobs.append(page)
+
+    if len(jobs) < 2 * Config.SITE_CHUNK_SIZE or workers == 1:
+        # Not worth starting a pool
+        _init_renderer(template, output_dir)
+        for job in jobs:
+            render_page(job)
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers or None, initializer=_init_renderer, initargs=(template, output_dir)
+        ) as pool:
+            for _ in pool.map(render_page, jobs, chunksize=Config.SITE_CHUNK_SIZE):
+                pass
+
+    removed = [path for path in previous if path not in current]
+    for path in removed:
+        try:
+            os.remove(os.path.join(output_dir, path))
+        except FileNotFoundError:
+            pass
+
+    if jobs or removed or not os.path.exists(os.path.join(output_dir, "sitemap.xml")):
+        write_sitemap(output_dir, list(current), Config.SITE_BASE_URL)
+    with open(os.path.join(output_dir, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump({"built_at": time.time(), "pages": current}, f)
+
+    stats = {
+        "titles": len(docs),
+        "pages": len(current),
+        "rendered": len(jobs),
+        "removed": len(removed),
+        "seconds": round(time.monotonic() - started, 2),
+    }
+    logger.info("Static site built in %s: %s", output_dir, stats)
+    return stats
@@ -0,0 +1,290 @@
+# bot/parts/subscriptions.py
+
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from bson import ObjectId
+from pyrogram import Client, filters
+from pyrogram.errors import FloodWait, UserIsBlocked, InputUserDeactivated, PeerIdInvalid
+from pyrogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton
+
+from config import Config
+from .core_bot_functionality import db, run_detached
+from .job_queue import job_handler, enqueue_job
+
+logger = logging.getLogger(__name__)
+
+# One document per user: {"_id": user_id, "all": bool, "genres": [...], "actors": [...]}
+subscribers = db.subscribers
+# One document per broadcast, holding its message, audience and resumable progress
+broadcasts = db.broadcasts
+
+# Errors meaning the user can never be reached again
+UNREACHABLE_ERRORS = (UserIsBlocked, InputUserDeactivated, PeerIdInvalid)
+
+
+def ensure_subscription_indexes():
+    """Creates the indexes used to page through each audience in _id order. Blocking."""
+    subscribers.create_index([("all", 1), ("_id", 1)])
+    subscribers.create_index([("genres", 1), ("_id", 1)])
+    subscribers.create_index([("actors", 1), ("_id", 1)])
+    broadcasts.create_index("status")
+
+
+def normalize_topic(value: str) -> str:
+    """Genres and actor names are matched case-insensitively."""
+    return " ".join((value or "").lower().split())
+
+
+# --- Subscription Commands ---
+def parse_topic(message: Message):
+    """Parses `/subscribe [genre <name> | actor <name>]` into (field, value); (None, None) means everything."""
+    args = message.text.split(None, 2)[1:]
+    if not args or args[0].lower() == "all":
+        return None, None
+    if args[0].lower() in ("genre", "actor") and len(args) == 2:
+        return args[0].lower() + "s", normalize_topic(args[1])
+    raise ValueError("invalid topic")
+
+
+SUBSCRIBE_USAGE = (
+    "🔔 **Subscriptions**\n\n"
+    "• `/subscribe` - Get every new upload\n"
+    "• `/subscribe genre Action` - Only new titles in a genre\n"
+    "• `/subscribe actor Yash` - Only new titles with an actor\n"
+    "• `/unsubscribe` - Stop all notifications (or `/unsubscribe genre Action`)\n"
+    "• `/subscriptions` - Show what you're subscribed to"
+)
+
+
+@Client.on_message(filters.command("subscribe") & filters.private)
+async def subscribe_command(client: Client, message: Message):
+    """Subscribes the user to all new uploads, or to a genre or actor."""
+    try:
+        field, value = parse_topic(message)
+    except ValueError:
+        await message.reply_text(SUBSCRIBE_USAGE)
+        return
+    try:
+        update = {"$set": {"all": True}} if field is None else {"$addToSet": {field: value}}
+        update.setdefault("$setOnInsert", {})["created_at"] = datetime.utcnow()
+        await asyncio.to_thread(subscribers.update_one, {"_id": message.from_user.id}, update, upsert=True)
+        topic = "every new upload" if field is None else f"new titles with {field[:-1]} **{value.title()}**"
+        await message.reply_text(f"🔔 Subscribed! You'll be notified about {topic}.\n\nUse /unsubscribe to stop.")
+    except Exception as e:
+        logger.error("Error in subscribe_command: %s", e)
+        await message.reply_text("❌ An error occurred. Please try again later.")
+
+
+@Client.on_message(filters.command("unsubscribe") & filters.private)
+async def unsubscribe_command(client: Client, message: Message):
+    """Removes one topic, or the whole subscription."""
+    try:
+        field, value = parse_topic(message)
+    except ValueError:
+        await message.reply_text(SUBSCRIBE_USAGE)
+        return
+    try:
+        if field is None:
+            await asyncio.to_thread(subscribers.delete_one, {"_id": message.from_user.id})
+            await message.reply_text("🔕 Unsubscribed from all notifications.")
+        else:
+            await asyncio.to_thread(subscribers.update_one, {"_id": message.from_user.id}, {"$pull": {field: value}})
+            await message.reply_text(f"🔕 You'll no longer be notified about {field[:-1]} **{value.title()}**.")
+    except Exception as e:
+        logger.error("Error in unsubscribe_command: %s", e)
+        await message.reply_text("❌ An error occurred. Please try again later.")
+
+
+@Client.on_message(filters.command("subscriptions") & filters.private)
+async def subscriptions_command(client: Client, message: Message):
+    """Lists the user's subscriptions."""
+    try:
+        sub = await asyncio.to_thread(subscribers.find_one, {"_id": message.from_user.id})
+        if not sub:
+            await message.reply_text("You have no subscriptions.\n\n" + SUBSCRIBE_USAGE)
+            return
+        text = "🔔 **Your Subscriptions**\n\n"
+        if sub.get("all"):
+            text += "• Every new upload\n"
+        text += "".join(f"• Genre: {g.title()}\n" for g in sub.get("genres", []))
+        text += "".join(f"• Actor: {a.title()}\n" for a in sub.get("actors", []))
+        await message.reply_text(text)
+    except Exception as e:
+        logger.error("Error in subscriptions_command: %s", e)
+        await message.reply_text("❌ An error occurred. Please try again later.")
+
+
+# --- Broadcasts ---
+def audience_query(genres: List[str], actors: List[str]) -> Dict:
+    """Subscribers interested in a title: everyone subscribed to all, or to one of its genres or actors."""
+    branches = [{"all": True}]
+    if genres:
+        branches.append({"genres": {"$in": genres}})
+    if actors:
+        branches.append({"actors": {"$in": actors}})
+    return {"$or": branches}
+
+
+def build_announcement(doc: Dict, content_id: str) -> Dict:
+    """The notification sent for a new title."""
+    year = doc.get("year") or "N/A"
+    text = f"🆕 **New on the bot:** {doc['name']} ({year})\n\n"
+    if doc.get("language"):
+        text += f"🗣️ **Language:** {doc['language']}\n"
+    if doc.get("genre"):
+        text += f"🎭 **Genre:** {', '.join(doc['genre'])}\n"
+    if doc.get("actors"):
+        text += f"👥 **Cast:** {', '.join(doc['actors'][:3])}\n"
+    text += "\nUse /unsubscribe to stop these notifications."
+    return {"text": text, "content_id": content_id}
+
+
+def create_broadcast(doc: Dict, content_id: str) -> ObjectId:
+    """Stores a broadcast for a new title and returns its id. Blocking."""
+    now = datetime.utcnow()
+    result = broadcasts.insert_one({
+        "message": build_announcement(doc, content_id),
+        "genres": [normalize_topic(g) for g in doc.get("genre", []) if g],
+        "actors": [normalize_topic(a) for a in doc.get("actors", []) if a],
+        "status": "running",
+        "last_id": None,
+        "sent": 0,
+        "failed": 0,
+        "removed": 0,
+        "created_at": now,
+        "updated_at": now
+    })
+    return result.inserted_id
+
+
+async def announce_new_content(client: Client, doc: Dict, content_id: str):
+    """Starts a broadcast for a newly saved title, on the job queue when it is enabled."""
+    if not Config.BROADCAST_ON_UPLOAD:
+        return
+    try:
+        broadcast_id = await asyncio.to_thread(create_broadcast, doc, content_id)
+        if Config.JOB_QUEUE_ENABLED:
+            await asyncio.to_thread(enqueue_job, "broadcast", {"broadcast_id": str(broadcast_id)})
+        else:
+            run_detached(run_broadcast(client, broadcast_id))
+    except Exception as e:
+        logger.error("Could not start broadcast for '%s': %s", doc.get('name'), e)
+
+
+# --- Pacing ---
+# Monotonic time of the next free send slot. Shared by every broadcast in this process,
+# so concurrent broadcasts (one per new title) together stay under BROADCAST_RATE.
+_next_send_at = 0.0
+
+
+async def wait_for_send_slot():
+    """Reserves the next free send slot of this process and sleeps until it comes."""
+    global _next_send_at
+    now = time.monotonic()
+    slot = max(now, _next_send_at)
+    _next_send_at = slot + 1.0 / Config.BROADCAST_RATE
+    await asyncio.sleep(slot - now)
+
+
+def hold_sends(seconds: float):
+    """Pauses every broadcast of this process, e.g. for a FloodWait."""
+    global _next_send_at
+    _next_send_at = max(_next_send_at, time.monotonic() + seconds)
+
+
+async def send_paced(client: Client, user_id: int, message: Dict) -> str:
+    """
+    Sends one notification in the next shared send slot, so all broadcasts together
+    never exceed BROADCAST_RATE messages per second. Returns "sent", "failed" or "removed".
+    """
+    keyboard = InlineKeyboardMarkup([[
+        InlineKeyboardButton("🎬 View Details", callback_data=f"view_content_{message['content_id']}")
+    ]])
+    outcome = "failed"
+    while True:
+        await wait_for_send_slot()
+        try:
+            await client.send_message(user_id, message["text"], reply_markup=keyboard)
+            outcome = "sent"
+        except FloodWait as e:
+            logger.warning("FloodWait of %ss during broadcast.", e.value)
+            hold_sends(e.value)
+            continue
+        except UNREACHABLE_ERRORS:
+            outcome = "removed"
+        except Exception as e:
+            logger.warning("Broadcast to %s failed: %s", user_id, e)
+        break
+    return outcome
+
+
+async def run_broadcast(client: Client, broadcast_id):
+    """
+    Sends a broadcast to its audience in _id order, one batch at a time. Progress
+    is saved after every batch, so a restarted broadcast resumes after the last
+    finished batch. Users who blocked the bot are unsubscribed.
+    """
+    broadcast_id = ObjectId(broadcast_id)
+    broadcast = await asyncio.to_thread(broadcasts.find_one, {"_id": broadcast_id})
+    if not broadcast or broadcast["status"] == "done":
+        return
+
+    audience = audience_query(broadcast["genres"], broadcast["actors"])
+    last_id = broadcast.get("last_id")
+    started = time.monotonic()
+
+    while True:
+        query = dict(audience)
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        batch = await asyncio.to_thread(
+            lambda: [sub["_id"] for sub in subscribers.find(query, {"_id": 1}).sort("_id", 1).limit(Config.BROADCAST_BATCH_SIZE)]
+        )
+        if not batch:
+            break
+
+        counts = {"sent": 0, "failed": 0, "removed": 0}
+        unreachable = []
+        for user_id in batch:
+            outcome = await send_paced(client, user_id, broadcast["message"])
+            counts[outcome] += 1
+            if outcome == "removed":
+                unreachable.append(user_id)
+
+        if unreachable:
+            await asyncio.to_thread(subscribers.delete_many, {"_id": {"$in": unreachable}})
+        last_id = batch[-1]
+        await asyncio.to_thread(
+            broadcasts.update_one,
+            {"_id": broadcast_id},
+            {"$set": {"last_id": last_id, "updated_at": datetime.utcnow()}, "$inc": counts}
+        )
+
+    done = await asyncio.to_thread(
+        broadcasts.find_one_and_update,
+        {"_id": broadcast_id},
+        {"$set": {"status": "done", "finished_at": datetime.utcnow()}},
+    )
+    logger.info(
+        "Broadcast %s finished in %.0fs: "
+        "%s sent, %s failed, %s unsubscribed.",
+        broadcast_id, time.monotonic() - started, done['sent'], done['failed'], done['removed']
+    )
+
+
+@job_handler("broadcast")
+async def broadcast_job(client: Client, payload: Dict, job: Dict):
+    """Worker-side broadcast. The broadcast document holds the checkpoint, so retries resume."""
+    await run_broadcast(client, payload["broadcast_id"])
+
+
+async def resume_broadcasts(client: Client):
+    """Restarts broadcasts that were interrupted by a restart (only without the job queue)."""
+    pending = await asyncio.to_thread(lambda: [b["_id"] for b in broadcasts.find({"status": "running"}, {"_id": 1})])
+    for broadcast_id in pending:
+        logger.info("Resuming broadcast %s.", broadcast_id)
+        await run_broadcast(client, broadcast_id)
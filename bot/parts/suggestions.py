@@ -0,0 +1,95 @@
+# bot/parts/suggestions.py
+
+import logging
+from typing import Dict, List, Set
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+def edit_distance(a: str, b: str, max_distance: int) -> int:
+    """
+    Optimal string alignment distance (Levenshtein plus adjacent transpositions).
+    Returns max_distance + 1 as soon as the distance is known to exceed max_distance.
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    prev_prev = None
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(prev[j] + 1, current[j - 1] + 1, prev[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], prev_prev[j - 2] + 1)
+        if min(current) > max_distance:
+            return max_distance + 1
+        prev_prev, prev = prev, current
+    return prev[-1]
+
+
+class SymSpell:
+    """
+    A symmetric delete spelling index (SymSpell). Every term is stored under all the
+    strings reachable by deleting up to max_distance characters from its prefix, so a
+    lookup only generates the deletes of the input and checks a handful of candidates
+    instead of scanning the whole vocabulary.
+    """
+    def __init__(self, max_distance: int = Config.SUGGESTION_MAX_DISTANCE,
+                 prefix_length: int = Config.SUGGESTION_PREFIX_LENGTH):
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self.words: Dict[str, int] = {}         # term -> number of titles using it
+        self.deletes: Dict[str, Set[str]] = {}  # delete variant -> terms
+
+    def _delete_variants(self, word: str) -> Set[str]:
+        """All strings reachable from the word's prefix with up to max_distance deletions."""
+        word = word[:self.prefix_length]
+        variants = {word}
+        frontier = {word}
+        for _ in range(self.max_distance):
+            frontier = {w[:i] + w[i + 1:] for w in frontier if len(w) > 1 for i in range(len(w))}
+            variants |= frontier
+        return variants
+
+    def add(self, term: str, count: int = 1):
+        """Adds a term, or raises its count if it is already known."""
+        if term in self.words:
+            self.words[term] += count
+            return
+        self.words[term] = count
+        for variant in self._delete_variants(term):
+            self.deletes.setdefault(variant, set()).add(term)
+
+    def remove(self, term: str, count: int = 1):
+        """Lowers a term's count. Terms at zero stay in the delete map but are never suggested."""
+        if term in self.words:
+            self.words[term] = max(0, self.words[term] - count)
+
+    def lookup(self, term: str, limit: int = Config.SUGGESTION_COUNT) -> List[str]:
+        """Returns up to `limit` known terms closest to the input, most used first among equals."""
+        if self.words.get(term):
+            return [term]
+        # Short words get a tighter bound, otherwise everything is "one typo away"
+        max_distance = min(self.max_distance, max(1, len(term) // 3))
+        scored = {}
+        for variant in self._delete_variants(term):
+            for candidate in self.deletes.get(variant, ()):
+                if candidate in scored or not self.words.get(candidate):
+                    continue
+                distance = edit_distance(term, candidate, max_distance)
+                if distance <= max_distance:
+                    scored[candidate] = (distance, -self.words[candidate], candidate)
+        return sorted(scored, key=scored.get)[:limit]
+
+    def copy(self) -> "SymSpell":
+        """An independent copy, e.g. for a snapshot taken while the live index keeps changing."""
+        clone = SymSpell(self.max_distance, self.prefix_length)
+        clone.words = dict(self.words)
+        clone.deletes = {variant: set(terms) for variant, terms in self.deletes.items()}
+        return clone
+
+    def __len__(self):
+        return sum(1 for count in self.words.values() if count)
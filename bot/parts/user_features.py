@@ -1,7 +1,9 @@
 # bot/parts/user_features.py
 
+import asyncio
 import logging
 from pyrogram import Client, filters
+from pyrogram.errors import FloodWait
 from pyrogram.types import (
     Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton,
     InputMediaPhoto
@@ -9,90 +11,147 @@ from pyrogram.types import (
 from bson import ObjectId
 
 from config import Config
+from ..logging_pipeline import instrument
 from .core_bot_functionality import (
-    movies_collection, series_collection, shows_collection, get_collection_by_type
+    read_db, CONTENT_COLLECTIONS, READ_CONTENT_COLLECTIONS, get_collection_by_type,
+    media_quality_label, media_size_label
 )
+from .caching import TTLCache, register_invalidator
+from .analytics import record_view, record_download
+from .recommendations import similar_titles
+from .job_queue import job_handler, enqueue_job, checkpoint_job, RetryJob
 
 logger = logging.getLogger(__name__)
 
 # --- /search Command ---
+SEARCH_MENU_TEXT = "🔍 **Search for Content**\n\nHow would you like to find your entertainment?"
+SEARCH_MENU_KEYBOARD = InlineKeyboardMarkup([
+    [InlineKeyboardButton("🔤 By Name", callback_data="search_name")],
+    [
+        InlineKeyboardButton("🎭 By Genre", callback_data="search_genre"),
+        InlineKeyboardButton("👥 By Actor", callback_data="search_actor")
+    ],
+    [
+        InlineKeyboardButton("📅 By Year", callback_data="search_year"),
+        InlineKeyboardButton("🗣️ Dubbed Only", callback_data="search_dubbed")
+    ],
+    [InlineKeyboardButton("⬅️ Back to Main Menu", callback_data="back_to_main")]
+])
+
 @Client.on_message(filters.command("search") & filters.private)
 @Client.on_callback_query(filters.regex("^search_content$"))
+@instrument
 async def search_command(client: Client, update: Message | CallbackQuery):
     """Presents the main search menu to the user."""
-    text = "🔍 **Search for Content**\n\nHow would you like to find your entertainment?"
-    keyboard = InlineKeyboardMarkup([
-        [InlineKeyboardButton("🔤 By Name", callback_data="search_name")],
-        [
-            InlineKeyboardButton("🎭 By Genre", callback_data="search_genre"),
-            InlineKeyboardButton("👥 By Actor", callback_data="search_actor")
-        ],
-        [
-            InlineKeyboardButton("📅 By Year", callback_data="search_year"),
-            InlineKeyboardButton("🗣️ Dubbed Only", callback_data="search_dubbed")
-        ],
-        [InlineKeyboardButton("⬅️ Back to Main Menu", callback_data="back_to_main")]
-    ])
-    
     if isinstance(update, Message):
-        await update.reply_text(text, reply_markup=keyboard)
+        await update.reply_text(SEARCH_MENU_TEXT, reply_markup=SEARCH_MENU_KEYBOARD)
     else:
-        await update.message.edit_text(text, reply_markup=keyboard)
+        await update.message.edit_text(SEARCH_MENU_TEXT, reply_markup=SEARCH_MENU_KEYBOARD)
         await update.answer()
 
 # --- Content Display ---
+# content_id -> {"version", "collection", "caption", "keyboard", "poster_url", "title"}
+_detail_render_cache = TTLCache(maxsize=Config.RENDER_CACHE_SIZE, ttl=Config.RENDER_CACHE_TTL)
+
+@register_invalidator
+def invalidate_rendered_details(content_id: str | None = None):
+    """Drops rendered detail views for a changed title (or all of them)."""
+    if content_id is None:
+        _detail_render_cache.clear()
+    else:
+        _detail_render_cache.pop(content_id)
+
+def render_content_details(content: dict, content_id_str: str, collection_name: str) -> dict:
+    """Builds the caption and keyboard for a title's detail view."""
+    title = content.get('name', 'N/A')
+    year = content.get('year', 'N/A')
+    lang = content.get('language', 'N/A')
+    genre = ", ".join(content.get('genre', []))
+    actors = ", ".join(content.get('actors', [])[:3])
+    description = content.get('description') or 'No description available.'
+
+    caption = f"🎬 **{title}** ({year})\n\n"
+    caption += f"🗣️ **Language:** {lang}\n"
+    caption += f"🎭 **Genre:** {genre}\n"
+    caption += f"👥 **Cast:** {actors}...\n\n"
+    caption += f"📖 **Plot:** {description[:200]}...\n\n"
+
+    buttons = []
+    # --- Download Buttons ---
+    # Files whose source posts are gone (see link_verifier.py) are hidden
+    available_files = [media for media in content.get('media_files', []) if not media.get('dead')]
+    if available_files:
+        caption += "💾 **Available Downloads:**\n"
+        for media in available_files:
+            buttons.append([
+                InlineKeyboardButton(
+                    f"📥 {media_quality_label(media)} ({media_size_label(media)})",
+                    url=f"https://t.me/{Config.BOT_USERNAME}?start=media-{media['msg_id']}"
+                )
+            ])
+    if content.get('seasons_data'): # For Series/Shows
+        # Whole seasons are sent as packs (see season_packs.py)
+        caption += "📺 **Whole seasons are available as packs.**\n"
+        buttons.append([InlineKeyboardButton("➡️ View Seasons & Episodes", callback_data=f"view_seasons_{collection_name}_{content_id_str}")])
+
+    # --- Similar Titles (precomputed, see recommendations.py) ---
+    for similar_id, name, similar_year in similar_titles(content_id_str):
+        label = f"🎬 {name} ({similar_year})" if similar_year else f"🎬 {name}"
+        buttons.append([InlineKeyboardButton(label, callback_data=f"view_content_{similar_id}")])
+
+    buttons.append([InlineKeyboardButton("⬅️ Back to Search", callback_data="search_content")])
+    return {
+        "title": title,
+        "caption": caption,
+        "keyboard": InlineKeyboardMarkup(buttons),
+        "poster_url": content.get("poster_url")
+    }
+
+def rendered_details_snapshot() -> list:
+    """The cached detail views, for an on-disk snapshot. Each one is still checked against updated_at on use."""
+    return _detail_render_cache.items()
+
+def restore_rendered_details(items: list):
+    for content_id, rendered in items:
+        _detail_render_cache.set(content_id, rendered)
+
+def get_rendered_details(content_id_str: str) -> dict | None:
+    """
+    Returns the rendered detail view for a title. A cached render is reused as long
+    as the document's updated_at still matches, which costs one tiny indexed lookup
+    instead of a full fetch and re-render. Blocking.
+    """
+    content_id = ObjectId(content_id_str)
+    cached = _detail_render_cache.get(content_id_str)
+    if cached:
+        current = read_db[cached["collection"]].find_one({"_id": content_id}, {"updated_at": 1})
+        if current and current.get("updated_at") == cached["version"]:
+            return cached
+        _detail_render_cache.pop(content_id_str)
+
+    # Search all collections for the content
+    for collection in READ_CONTENT_COLLECTIONS:
+        content = collection.find_one({"_id": content_id})
+        if content:
+            rendered = render_content_details(content, content_id_str, collection.name)
+            rendered["version"] = content.get("updated_at")
+            rendered["collection"] = collection.name
+            _detail_render_cache.set(content_id_str, rendered)
+            return rendered
+    return None
+
 async def show_content_details(client: Client, callback_query: CallbackQuery, content_id_str: str):
     """Displays the full details of a selected movie or series."""
     try:
-        content_id = ObjectId(content_id_str)
-        content = None
-        
-        # Search all collections for the content
-        for collection in [movies_collection, series_collection, shows_collection]:
-            content = collection.find_one({"_id": content_id})
-            if content:
-                break
+        rendered = await asyncio.to_thread(get_rendered_details, content_id_str)
         
-        if not content:
+        if not rendered:
             await callback_query.answer("❌ Content not found. It might have been removed.", show_alert=True)
             return
 
-        # --- Format Details ---
-        title = content.get('name', 'N/A')
-        year = content.get('year', 'N/A')
-        lang = content.get('language', 'N/A')
-        genre = ", ".join(content.get('genre', []))
-        actors = ", ".join(content.get('actors', [])[:3])
-        description = content.get('description', 'No description available.')
-
-        caption = f"🎬 **{title}** ({year})\n\n"
-        caption += f"🗣️ **Language:** {lang}\n"
-        caption += f"🎭 **Genre:** {genre}\n"
-        caption += f"👥 **Cast:** {actors}...\n\n"
-        caption += f"📖 **Plot:** {description[:200]}...\n\n"
-
-        buttons = []
-        # --- Download Buttons ---
-        if content.get('media_files'): # For Movies
-            caption += "💾 **Available Downloads:**\n"
-            for media in content['media_files']:
-                buttons.append([
-                    InlineKeyboardButton(
-                        f"📥 {media['quality']} ({media['size']})",
-                        url=f"https://t.me/{Config.BOT_USERNAME}?start=media-{media['msg_id']}"
-                    )
-                ])
-        elif content.get('seasons_data'): # For Series/Shows
-            caption += "📺 **Select a Season to View Episodes:**\n"
-            # In a real scenario, this would lead to another callback to show episodes.
-            # For simplicity, we can show the first season's first episode as an example.
-            # A full implementation would create buttons for each season.
-            buttons.append([InlineKeyboardButton("➡️ View Seasons & Episodes", callback_data=f"view_seasons_{content_id_str}")])
-
-        buttons.append([InlineKeyboardButton("⬅️ Back to Search", callback_data="search_content")])
-        keyboard = InlineKeyboardMarkup(buttons)
-        
-        poster_url = content.get("poster_url")
+        record_view(content_id_str, rendered["collection"])
+        caption, keyboard = rendered["caption"], rendered["keyboard"]
+        poster_url = rendered["poster_url"]
         try:
             if poster_url:
                 await callback_query.message.reply_photo(
@@ -104,13 +163,13 @@ async def show_content_details(client: Client, callback_query: CallbackQuery, co
             else:
                 await callback_query.message.edit_text(caption, reply_markup=keyboard)
         except Exception as e:
-            logger.warning(f"Could not send poster for {title}, sending text instead. Error: {e}")
+            logger.warning("Could not send poster for %s, sending text instead. Error: %s", rendered['title'], e)
             await callback_query.message.edit_text(caption, reply_markup=keyboard)
 
         await callback_query.answer()
 
     except Exception as e:
-        logger.error(f"Error in show_content_details: {e}", exc_info=True)
+        logger.error("Error in show_content_details: %s", e, exc_info=True)
         await callback_query.answer("❌ An error occurred while fetching details.", show_alert=True)
 
 # --- Media Serving ---
@@ -120,8 +179,9 @@ async def handle_media_request(client: Client, message: Message):
         media_id = message.command[1].replace("media-", "")
         
         target_file = None
-        # Find the media file across all collections
-        for collection in [movies_collection, series_collection, shows_collection]:
+        # Find the media file across all collections. Secondaries are tried first; the
+        # primary is the fallback for links to files added moments ago (replication lag).
+        for collection in READ_CONTENT_COLLECTIONS + CONTENT_COLLECTIONS:
             result = collection.find_one({"media_files.msg_id": media_id})
             if result:
                 for f in result["media_files"]:
@@ -129,36 +189,84 @@ async def handle_media_request(client: Client, message: Message):
                         target_file = f
                         break
                 if target_file:
+                    record_download(str(result["_id"]), media_id, collection.name)
                     break
         
         if not target_file:
             await message.reply_text("❌ Media not found or the link has expired. Please search for the content again.")
             return
+        if target_file.get("dead"):
+            await message.reply_text("❌ This file was removed from our sources. Please try another quality or contact an admin.")
+            return
 
-        await message.reply_text(f"✅ **File Found!**\n\n**Name:** `{target_file['file_name']}`\n**Size:** `{target_file['size']}`\n\n⬇️ Your download will start shortly...")
+        await message.reply_text(f"✅ **File Found!**\n\n**Name:** `{target_file['file_name']}`\n**Size:** `{media_size_label(target_file)}`\n\n⬇️ Your download will start shortly...")
 
-        try:
-            await client.copy_message(
-                chat_id=message.chat.id,
-                from_chat_id=target_file["channel_id"],
-                message_id=target_file["original_msg_id"]
-            )
-        except Exception as e:
-            logger.error(f"Failed to forward media {media_id}: {e}")
-            await message.reply_text("❌ Failed to send the file. It might have been removed from the source channel. Please try another quality or contact an admin.")
+        payload = {
+            "chat_id": message.chat.id,
+            "media_id": media_id,
+            "channel_id": target_file["channel_id"],
+            "message_id": target_file["original_msg_id"],
+            "fallbacks": [
+                [copy["channel_id"], copy["original_msg_id"]] for copy in target_file.get("fallbacks", [])
+            ]
+        }
+        if Config.JOB_QUEUE_ENABLED:
+            # A worker process performs the copy (see worker.py)
+            await asyncio.to_thread(enqueue_job, "deliver_media", payload, priority=2)
+        else:
+            await deliver_media(client, payload)
 
     except Exception as e:
-        logger.error(f"Error in handle_media_request: {e}")
+        logger.error("Error in handle_media_request: %s", e)
         await message.reply_text("❌ An error occurred while processing your request.")
 
+async def deliver_media(client: Client, payload: dict, job: dict | None = None):
+    """
+    Copies a media file into the user's chat from its preferred source channel,
+    falling back to the other channels holding the same file. A queued job that hits
+    a FloodWait resumes with the same source.
+    """
+    sources = [(payload["channel_id"], payload["message_id"])] + [tuple(f) for f in payload.get("fallbacks", [])]
+    first = payload.get("checkpoint", {}).get("source", 0)
+    for index, (channel_id, message_id) in enumerate(sources[first:], start=first):
+        while True:
+            try:
+                await client.copy_message(
+                    chat_id=payload["chat_id"],
+                    from_chat_id=channel_id,
+                    message_id=message_id
+                )
+                return
+            except FloodWait as e:
+                if job is not None:
+                    await asyncio.to_thread(checkpoint_job, job["_id"], {"source": index})
+                    raise RetryJob(e.value, "FloodWait while delivering media")
+                # The source is fine, only the rate was exceeded: retry the same copy
+                await asyncio.sleep(e.value)
+            except Exception as e:
+                logger.error("Failed to forward media %s from %s/%s: %s", payload['media_id'], channel_id, message_id, e)
+                break
+
+    await client.send_message(
+        payload["chat_id"],
+        "❌ Failed to send the file. It might have been removed from the source channel. Please try another quality or contact an admin."
+    )
+
+@job_handler("deliver_media")
+async def deliver_media_job(client: Client, payload: dict, job: dict):
+    """Worker-side file delivery for handle_media_request."""
+    await deliver_media(client, payload, job)
+
 # Placeholder for a content view callback handler
 @Client.on_callback_query(filters.regex(r"^view_content_"))
+@instrument
 async def view_content_callback(client: Client, callback_query: CallbackQuery):
     content_id = callback_query.data.split("_", 2)[2]
     await show_content_details(client, callback_query, content_id)
 
 # Placeholder for back to main menu
 @Client.on_callback_query(filters.regex("^back_to_main$"))
+@instrument
 async def back_to_main_callback(client: Client, callback_query: CallbackQuery):
     # This re-uses the /start command's logic
     from .core_bot_functionality import start_command
@@ -0,0 +1,169 @@
+# bot/startup.py
+"""
+Startup sequencing for the bot.
+
+Tracks how long each startup phase takes and exposes the liveness/readiness
+state used by the health check server. Heavy modules (pymongo, the handler
+parts) are only imported inside the phases that need them.
+"""
+
+import asyncio
+import importlib
+import logging
+import time
+from contextlib import contextmanager
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+PROCESS_STARTED = time.monotonic()
+
+# Each check must pass before the instance reports itself as ready
+readiness_checks = {"client": False, "database": False}
+phase_timings = {}
+background_tasks = []
+
+# (module, function) pairs that create each part's indexes; all are idempotent
+INDEX_BOOTSTRAPS = [
+    (".parts.core_bot_functionality", "ensure_indexes"),
+    (".parts.job_queue", "ensure_job_indexes"),
+    (".parts.media_registry", "ensure_registry_indexes"),
+    (".parts.analytics", "ensure_stats_indexes"),
+    (".parts.series_ingest", "ensure_ingest_indexes"),
+    (".parts.subscriptions", "ensure_subscription_indexes"),
+    # Last: fills in any index a registered query shape needs that the parts above didn't create
+    (".parts.query_shapes", "ensure_query_indexes"),
+]
+
+
+@contextmanager
+def phase(name: str):
+    """Times a startup phase and logs how long it took."""
+    started = time.monotonic()
+    try:
+        yield
+    finally:
+        elapsed = time.monotonic() - started
+        phase_timings[name] = round(elapsed, 3)
+        logger.info("Startup phase '%s' finished in %.3fs.", name, elapsed)
+
+
+def set_check(name: str, ok: bool):
+    """Updates one readiness check and logs when the overall state flips."""
+    was_ready = is_ready()
+    readiness_checks[name] = ok
+    if is_ready() and not was_ready:
+        logger.info("Bot is ready after %.3fs.", time.monotonic() - PROCESS_STARTED)
+    elif was_ready and not is_ready():
+        logger.warning("Bot is no longer ready: '%s' check failed.", name)
+
+
+def is_ready() -> bool:
+    """True once the Telegram client and the database are both up."""
+    return all(readiness_checks.values())
+
+
+def status() -> dict:
+    """Returns a snapshot of the startup state for the health check endpoints."""
+    return {
+        "ready": is_ready(),
+        "checks": dict(readiness_checks),
+        "phases": dict(phase_timings),
+        "uptime": round(time.monotonic() - PROCESS_STARTED, 3),
+    }
+
+
+async def connect_database():
+    """Pings MongoDB off the event loop, retrying until it answers."""
+    from .parts.core_bot_functionality import db
+
+    delay = Config.STARTUP_DB_RETRY_DELAY
+    while True:
+        try:
+            await asyncio.to_thread(db.command, "ping")
+            set_check("database", True)
+            return
+        except Exception as e:
+            logger.error("MongoDB is not reachable yet, retrying in %ss: %s", delay, e)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 60)
+
+
+async def warm_caches():
+    """Preloads in-memory caches from the catalog so the first users hit warm data."""
+    try:
+        from .parts.inline_search import rebuild_title_index
+        with phase("cache_warmup"):
+            restored = False
+            if Config.SNAPSHOT_PATH:
+                from .parts.snapshots import load_snapshot
+                restored = await load_snapshot()
+            if not restored:
+                await rebuild_title_index()
+    except Exception as e:
+        logger.error("Cache warm-up failed: %s", e)
+
+
+async def bootstrap(client):
+    """
+    Runs the post-connect startup phases: database connection, index bootstrap
+    and optional cache warm-up. Call it once the Telegram client has started.
+    """
+    with phase("mongo_connect"):
+        await connect_database()
+
+    try:
+        with phase("index_bootstrap"):
+            for module_name, func_name in INDEX_BOOTSTRAPS:
+                module = importlib.import_module(module_name, __package__)
+                await asyncio.to_thread(getattr(module, func_name))
+    except Exception as e:
+        logger.error("Index bootstrap failed: %s", e)
+
+    # Background maintenance loops
+    from .parts.analytics import analytics_loop
+    background_tasks.append(asyncio.create_task(analytics_loop()))
+    if not Config.JOB_QUEUE_ENABLED:
+        # Queued broadcasts are resumed by the workers instead
+        from .parts.subscriptions import resume_broadcasts
+        background_tasks.append(asyncio.create_task(resume_broadcasts(client)))
+    if Config.LINK_VERIFY_INTERVAL > 0:
+        from .parts.link_verifier import link_verifier_loop
+        background_tasks.append(asyncio.create_task(link_verifier_loop(client)))
+    if Config.CHANGE_FEED_MODE != "off":
+        from .parts.change_feed import change_feed_loop
+        background_tasks.append(asyncio.create_task(change_feed_loop()))
+    from .parts.catalog_stats import catalog_stats_loop
+    background_tasks.append(asyncio.create_task(catalog_stats_loop()))
+    if Config.SNAPSHOT_PATH and Config.SNAPSHOT_INTERVAL > 0:
+        from .parts.snapshots import snapshot_loop
+        background_tasks.append(asyncio.create_task(snapshot_loop()))
+
+    warmup = None
+    if Config.WARM_CACHES:
+        # Warm-up runs in the background; readiness doesn't wait for it
+        warmup = asyncio.create_task(warm_caches())
+        background_tasks.append(warmup)
+    # Waits for the warm-up, which may restore the recommendations from a snapshot
+    from .parts.recommendations import recommendations_loop
+    background_tasks.append(asyncio.create_task(recommendations_loop(warmup)))
+
+    logger.info("Startup timings: %s", phase_timings)
+
+
+async def shutdown():
+    """Stops background loops and flushes buffered state before the process exits."""
+    for task in background_tasks:
+        task.cancel()
+    try:
+        from .parts.analytics import flush_counters
+        await flush_counters()
+    except Exception as e:
+        logger.error("Failed to flush counters on shutdown: %s", e)
+    if Config.SNAPSHOT_PATH:
+        try:
+            from .parts.snapshots import save_snapshot
+            await save_snapshot()
+        except Exception as e:
+            logger.error("Failed to write cache snapshot on shutdown: %s", e)
@@ -24,6 +24,22 @@ class Config:
     # Database Configuration
     MONGO_URL = os.environ.get("MONGO_URL", "mongodb://localhost:27017/")
     DATABASE_NAME = os.environ.get("DATABASE_NAME", "kannada_entertainment")
+    MONGO_CONNECT_TIMEOUT_MS = int(os.environ.get("MONGO_CONNECT_TIMEOUT_MS", 5000))
+
+    # Write profile: admin uploads, imports and queues always go to the primary
+    MONGO_WRITE_CONCERN = os.environ.get("MONGO_WRITE_CONCERN", "majority")
+    MONGO_WRITE_TIMEOUT_MS = int(os.environ.get("MONGO_WRITE_TIMEOUT_MS", 10000))
+    MONGO_WRITE_POOL_SIZE = int(os.environ.get("MONGO_WRITE_POOL_SIZE", 20))
+
+    # Read profile: user-facing lookups. MONGO_READ_URL may list the replica set members
+    # to read from (defaults to MONGO_URL). The pool size applies per server, so read
+    # capacity grows with the number of secondaries.
+    MONGO_READ_URL = os.environ.get("MONGO_READ_URL", "")
+    MONGO_READ_PREFERENCE = os.environ.get("MONGO_READ_PREFERENCE", "secondaryPreferred")
+    MONGO_READ_POOL_SIZE = int(os.environ.get("MONGO_READ_POOL_SIZE", 50))
+    MONGO_READ_TIMEOUT_MS = int(os.environ.get("MONGO_READ_TIMEOUT_MS", 2000))
+    # Skip secondaries lagging more than this many seconds (0 = no limit, minimum 90 otherwise)
+    MONGO_READ_MAX_STALENESS = int(os.environ.get("MONGO_READ_MAX_STALENESS", 0))
 
     # Blogger Configuration
     BLOGGER_API_KEY = os.environ.get("BLOGGER_API_KEY", "")
@@ -33,5 +49,126 @@ class Config:
     # Bot Configuration
     BOT_USERNAME = os.environ.get("BOT_USERNAME", "").replace("@", "")
 
+    # Inline Search Configuration
+    # Seconds Telegram may cache an inline answer on its side
+    INLINE_CACHE_TIME = int(os.environ.get("INLINE_CACHE_TIME", 300))
+    INLINE_RESULTS_PER_PAGE = min(int(os.environ.get("INLINE_RESULTS_PER_PAGE", 20)), 50)
+    # Server-side cache of ranked results per normalized query
+    INLINE_QUERY_CACHE_SIZE = int(os.environ.get("INLINE_QUERY_CACHE_SIZE", 2048))
+    INLINE_QUERY_CACHE_TTL = int(os.environ.get("INLINE_QUERY_CACHE_TTL", 600))
+    # Maximum age of the in-memory title index before it is rebuilt in the background
+    INLINE_INDEX_REFRESH = int(os.environ.get("INLINE_INDEX_REFRESH", 1800))
+    # "Did you mean" corrections for searches with no matches
+    SUGGESTION_MAX_DISTANCE = int(os.environ.get("SUGGESTION_MAX_DISTANCE", 2))
+    SUGGESTION_PREFIX_LENGTH = int(os.environ.get("SUGGESTION_PREFIX_LENGTH", 7))
+    SUGGESTION_COUNT = int(os.environ.get("SUGGESTION_COUNT", 3))
+    SUGGESTION_MAX_TRIES = int(os.environ.get("SUGGESTION_MAX_TRIES", 20))  # corrected queries searched per suggestion
+
+    # Render Cache Configuration (rendered detail captions and keyboards)
+    RENDER_CACHE_SIZE = int(os.environ.get("RENDER_CACHE_SIZE", 2000))
+    RENDER_CACHE_TTL = int(os.environ.get("RENDER_CACHE_TTL", 3600))
+
+    # Rate Limiting Configuration
+    # Per-user token buckets per handler class, as "class=requests/seconds".
+    # media: /start deep links that deliver files, command: other private messages,
+    # callback: button presses, inline: inline queries. Admins are never throttled.
+    RATE_LIMITS = os.environ.get("RATE_LIMITS", "media=5/60,pack=3/600,command=20/60,callback=40/60,inline=60/60")
+    RATE_LIMIT_SWEEP_INTERVAL = int(os.environ.get("RATE_LIMIT_SWEEP_INTERVAL", 300))
+    RATE_LIMIT_NOTICE_INTERVAL = int(os.environ.get("RATE_LIMIT_NOTICE_INTERVAL", 30))
+    # Handler group for the limiter; must be lower than the feature handlers' group (0)
+    RATE_LIMIT_GROUP = int(os.environ.get("RATE_LIMIT_GROUP", -1))
+
+    # Analytics Configuration
+    # View/download counters are buffered in memory and written in one bulk batch per interval
+    COUNTER_FLUSH_INTERVAL = int(os.environ.get("COUNTER_FLUSH_INTERVAL", 30))
+    TRENDING_REFRESH_INTERVAL = int(os.environ.get("TRENDING_REFRESH_INTERVAL", 300))
+    TRENDING_HALF_LIFE_HOURS = float(os.environ.get("TRENDING_HALF_LIFE_HOURS", 24))
+    TRENDING_WINDOW_DAYS = int(os.environ.get("TRENDING_WINDOW_DAYS", 14))
+    TRENDING_SIZE = int(os.environ.get("TRENDING_SIZE", 10))
+
+    # Job Queue Configuration
+    # When enabled, upload persistence and file deliveries are queued for worker.py processes
+    JOB_QUEUE_ENABLED = os.environ.get("JOB_QUEUE_ENABLED", "false").lower() in ("1", "true", "yes")
+    JOB_LEASE_SECONDS = int(os.environ.get("JOB_LEASE_SECONDS", 120))
+    JOB_MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", 5))
+    JOB_RETRY_BASE_DELAY = int(os.environ.get("JOB_RETRY_BASE_DELAY", 10))
+    JOB_POLL_INTERVAL = float(os.environ.get("JOB_POLL_INTERVAL", 2))
+    WORKER_CONCURRENCY = int(os.environ.get("WORKER_CONCURRENCY", 4))
+
+    # Admin Search Configuration
+    # Maximum search hits per channel for /up (0 = no cap, results are streamed page by page)
+    SEARCH_LIMIT_PER_CHANNEL = int(os.environ.get("SEARCH_LIMIT_PER_CHANNEL", 0))
+
+    # Series Ingestion Configuration (full history scan for long series in /up)
+    INGEST_BATCH_SIZE = min(int(os.environ.get("INGEST_BATCH_SIZE", 200)), 200)  # message ids per request
+    INGEST_EMPTY_BATCHES = int(os.environ.get("INGEST_EMPTY_BATCHES", 5))  # fallback stop when a channel's newest id is unknown
+    INGEST_CHUNK_SIZE = int(os.environ.get("INGEST_CHUNK_SIZE", 200))  # files per staging/database write
+    INGEST_PROGRESS_INTERVAL = int(os.environ.get("INGEST_PROGRESS_INTERVAL", 5))  # seconds between progress edits
+    INGEST_STAGING_TTL = int(os.environ.get("INGEST_STAGING_TTL", 7 * 24 * 3600))
+
+    # Broadcast Configuration (new upload notifications to subscribers)
+    BROADCAST_ON_UPLOAD = os.environ.get("BROADCAST_ON_UPLOAD", "true").lower() in ("1", "true", "yes")
+    # Messages per second for all broadcasts of one process together. Telegram allows about
+    # 30/s per bot overall; the rest is left for interactive replies. 100k subscribers take
+    # ~1.4h at 20/s. Run broadcast jobs on a single worker process to keep this bot-wide.
+    BROADCAST_RATE = float(os.environ.get("BROADCAST_RATE", 20))
+    BROADCAST_BATCH_SIZE = int(os.environ.get("BROADCAST_BATCH_SIZE", 500))  # subscribers per checkpoint
+
+    # Link Verification Configuration (background checks that source posts still exist)
+    LINK_VERIFY_INTERVAL = int(os.environ.get("LINK_VERIFY_INTERVAL", 6 * 3600))  # 0 disables the loop
+    LINK_VERIFY_BATCH_SIZE = min(int(os.environ.get("LINK_VERIFY_BATCH_SIZE", 200)), 200)
+    LINK_VERIFY_BATCH_DELAY = float(os.environ.get("LINK_VERIFY_BATCH_DELAY", 2.0))  # seconds between batches
+    LINK_VERIFY_REPORT_LIMIT = int(os.environ.get("LINK_VERIFY_REPORT_LIMIT", 30))
+
+    # Catalog Statistics Configuration (admin /stats dashboard)
+    STATS_REFRESH_INTERVAL = int(os.environ.get("STATS_REFRESH_INTERVAL", 3600))  # seconds a snapshot stays fresh
+
+    # Recommendation Configuration ("similar titles" on the detail view)
+    RECOMMEND_COUNT = int(os.environ.get("RECOMMEND_COUNT", 4))  # buttons shown per title
+    RECOMMEND_TOP_K = int(os.environ.get("RECOMMEND_TOP_K", 10))  # neighbours kept per title
+    RECOMMEND_REFRESH_INTERVAL = int(os.environ.get("RECOMMEND_REFRESH_INTERVAL", 6 * 3600))  # seconds between full rebuilds
+    RECOMMEND_BATCH_CELLS = int(os.environ.get("RECOMMEND_BATCH_CELLS", 4_000_000))  # similarity scores held in memory at once
+
+    # Season Pack Configuration (whole-season downloads as media groups)
+    PACK_GROUP_SIZE = int(os.environ.get("PACK_GROUP_SIZE", 10))  # files per media group, Telegram allows at most 10
+    PACK_GROUP_DELAY = float(os.environ.get("PACK_GROUP_DELAY", 3.0))  # seconds between groups
+
+    # Change Feed Configuration (cache coherence across replicas and worker processes)
+    CHANGE_FEED_MODE = os.environ.get("CHANGE_FEED_MODE", "auto").lower()  # "auto", "stream", "poll" or "off"
+    CHANGE_FEED_POLL_INTERVAL = float(os.environ.get("CHANGE_FEED_POLL_INTERVAL", 5))  # seconds between polls
+    CHANGE_FEED_POLL_LAG = int(os.environ.get("CHANGE_FEED_POLL_LAG", 30))  # seconds re-read for late writes and clock skew
+    CHANGE_FEED_MAX_BATCH = int(os.environ.get("CHANGE_FEED_MAX_BATCH", 500))  # larger bursts invalidate every cache
+
+    # Static Site Configuration (export_site.py)
+    SITE_OUTPUT_DIR = os.environ.get("SITE_OUTPUT_DIR", "site")
+    SITE_BASE_URL = os.environ.get("SITE_BASE_URL", "https://example.com")  # used for sitemap URLs
+    SITE_PAGE_SIZE = int(os.environ.get("SITE_PAGE_SIZE", 100))  # titles per listing page
+    SITE_WORKERS = int(os.environ.get("SITE_WORKERS", 0))  # render processes, 0 = one per CPU
+    SITE_CHUNK_SIZE = int(os.environ.get("SITE_CHUNK_SIZE", 200))  # pages handed to a process at a time
+
+    # Migration Configuration (migrate.py)
+    MIGRATION_BATCH_SIZE = int(os.environ.get("MIGRATION_BATCH_SIZE", 200))  # documents per checkpoint
+
+    # Bulk Import Configuration
+    IMPORT_BATCH_SIZE = int(os.environ.get("IMPORT_BATCH_SIZE", 200))
+    IMPORT_MAX_REPORTED_ERRORS = int(os.environ.get("IMPORT_MAX_REPORTED_ERRORS", 50))
+    # Optional JSONL export of channel files; when set, imports match against it instead of searching channels
+    IMPORT_CATALOG_PATH = os.environ.get("IMPORT_CATALOG_PATH", "")
+
     # Server Configuration (for health checks on deployment platforms)
     PORT = int(os.environ.get("PORT", 8080))
+
+    # Logging Configuration
+    LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+    LOG_FORMAT = os.environ.get("LOG_FORMAT", "json").lower()  # "json" or "text"
+    # Fraction of INFO/DEBUG records kept per logger prefix (warnings and errors are always kept)
+    LOG_SAMPLING = os.environ.get("LOG_SAMPLING", "bot.timing=0.1")
+
+    # Startup Configuration
+    # Preload in-memory caches (e.g. the inline title index) once the database is up
+    WARM_CACHES = os.environ.get("WARM_CACHES", "true").lower() in ("1", "true", "yes")
+    # On-disk cache snapshot for warm restarts (empty path disables it)
+    SNAPSHOT_PATH = os.environ.get("SNAPSHOT_PATH", "temp_data/cache_snapshot.bin")
+    SNAPSHOT_INTERVAL = int(os.environ.get("SNAPSHOT_INTERVAL", 600))  # seconds between periodic snapshots
+    # Initial delay between MongoDB connection attempts at startup (doubles up to 60s)
+    STARTUP_DB_RETRY_DELAY = int(os.environ.get("STARTUP_DB_RETRY_DELAY", 2))
@@ -0,0 +1,50 @@
+# export_site.py
+"""
+Static site export from the command line.
+
+Renders the catalog into a static HTML site (detail, index, genre and actor
+pages plus a sitemap) that can be served by any static host:
+
+    python export_site.py
+    python export_site.py --out public --workers 8
+    python export_site.py --full          # ignore the manifest and render every page
+
+Only pages whose source documents changed since the last build are rendered again.
+"""
+
+import sys
+import argparse
+import logging
+
+from config import Config
+
+logging.basicConfig(
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    level=logging.INFO,
+    handlers=[logging.StreamHandler(sys.stdout)]
+)
+logger = logging.getLogger(__name__)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Export the Kannada Entertainment catalog as a static site.")
+    parser.add_argument("--out", default=Config.SITE_OUTPUT_DIR, help="Output directory.")
+    parser.add_argument("--full", action="store_true", help="Render every page, ignoring the manifest.")
+    parser.add_argument("--workers", type=int, default=Config.SITE_WORKERS,
+                        help="Render processes (0 = one per CPU, 1 = render in this process).")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    from bot.parts.static_site import build_site
+
+    stats = build_site(args.out, full=args.full, workers=args.workers)
+    print(
+        f"{stats['titles']} titles, {stats['pages']} pages: {stats['rendered']} rendered, "
+        f"{stats['removed']} removed in {stats['seconds']}s."
+    )
+
+
+if __name__ == "__main__":
+    main()
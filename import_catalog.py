@@ -0,0 +1,90 @@
+# import_catalog.py
+"""
+Bulk catalog import from the command line.
+
+Streams a CSV or JSONL file of titles, matches each row to channel files and
+bulk-upserts the results, exactly like the admin `/import` command:
+
+    python import_catalog.py titles.csv --catalog channel_files.jsonl
+    python import_catalog.py series.jsonl --type webseries --telegram
+
+Files are matched against a local catalog export (--catalog) or, with
+--telegram, by searching the configured channels through the bot. Running
+the same file again resumes after the last committed batch.
+"""
+
+import sys
+import asyncio
+import argparse
+import logging
+
+from config import Config
+
+logging.basicConfig(
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    level=logging.INFO,
+    handlers=[logging.StreamHandler(sys.stdout)]
+)
+logger = logging.getLogger(__name__)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Bulk-import titles into the Kannada Entertainment catalog.")
+    parser.add_argument("path", help="CSV or JSONL file with one title per row.")
+    parser.add_argument("--type", dest="default_type", default=None,
+                        help="Entertainment type for rows without a 'type' column (movies, webseries, tvseries, shows).")
+    parser.add_argument("--catalog", default=Config.IMPORT_CATALOG_PATH or None,
+                        help="JSONL export of channel files to match rows against.")
+    parser.add_argument("--telegram", action="store_true",
+                        help="Match rows by searching the configured channels through the bot.")
+    return parser.parse_args()
+
+
+async def run(args):
+    from bot.parts.bulk_import import LocalCatalog, run_import, format_import_report
+
+    catalog = None
+    if args.catalog:
+        logger.info("Loading local catalog from %s...", args.catalog)
+        catalog = await asyncio.to_thread(LocalCatalog, args.catalog)
+        logger.info("Catalog loaded with %s files.", len(catalog.files))
+
+    client = None
+    if args.telegram:
+        from pyrogram import Client
+        client = Client(
+            "kannada_import",
+            api_id=Config.API_ID,
+            api_hash=Config.API_HASH,
+            bot_token=Config.BOT_TOKEN,
+            in_memory=True,
+            no_updates=True
+        )
+        await client.start()
+
+    if catalog is None and client is None:
+        logger.error("Nothing to match files against: pass --catalog or --telegram.")
+        sys.exit(1)
+
+    async def print_progress(stats):
+        logger.info(
+            "%s rows processed: %s saved, "
+            "%s without files, %s invalid",
+            stats['rows'], stats['saved'], stats['unmatched'], stats['invalid']
+        )
+
+    try:
+        stats = await run_import(args.path, client=client, catalog=catalog,
+                                 default_type=args.default_type, progress=print_progress)
+        print(format_import_report(stats).replace("**", "").replace("`", ""))
+    finally:
+        if client is not None:
+            await client.stop()
+
+
+def main():
+    asyncio.run(run(parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,18 +3,15 @@
 import sys
 import logging
 from threading import Thread
-from flask import Flask, jsonify
-from pyrogram import Client
+from pyrogram import Client, idle
 
 # Import configuration
 from config import Config
+from bot import startup
+from bot.logging_pipeline import setup_logging
 
-# Configure logging
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO,
-    handlers=[logging.StreamHandler(sys.stdout)]
-)
+# Configure logging (queued, written to stdout by a background thread)
+setup_logging()
 logger = logging.getLogger(__name__)
 
 # Validate required configuration
@@ -30,38 +27,71 @@ app = Client(
     bot_token=Config.BOT_TOKEN
 )
 
-# Import bot handlers AFTER client initialization
-# This ensures the client instance is available for the decorators
-from bot import handlers
-logger.info("Bot handlers imported.")
+def create_health_app():
+    """
+    Builds the Flask app for health checks. Flask is imported here so it
+    doesn't slow down the bot's own startup.
+
+    /health is the liveness probe (the process is up), /ready turns green
+    only once the Telegram client and MongoDB are both available.
+    """
+    from flask import Flask, jsonify
+
+    flask_app = Flask(__name__)
+
+    @flask_app.route('/health')
+    def health_check():
+        """Liveness endpoint: the process is running."""
+        return jsonify({"status": "healthy"}), 200
 
-# Flask app for health checks
-flask_app = Flask(__name__)
+    @flask_app.route('/ready')
+    def readiness_check():
+        """Readiness endpoint for deployment platforms like Koyeb."""
+        state = startup.status()
+        return jsonify(state), 200 if state["ready"] else 503
 
-@flask_app.route('/health')
-def health_check():
-    """Health check endpoint for deployment platforms like Koyeb."""
-    return jsonify({"status": "healthy"}), 200
+    return flask_app
 
 def run_flask():
     """Runs the Flask web server in a separate thread."""
+    with startup.phase("health_server_import"):
+        flask_app = create_health_app()
     flask_app.run(host='0.0.0.0', port=Config.PORT, debug=False)
 
+async def run_bot():
+    """Imports the handlers, starts the client, runs the startup phases and idles until stopped."""
+    # The handler parts (pymongo, numpy, the inline index) are imported only once the
+    # health server thread is running, so /health answers while they load
+    with startup.phase("import_handlers"):
+        from bot import handlers
+    logger.info("Bot handlers imported.")
+
+    with startup.phase("client_start"):
+        await app.start()
+    startup.set_check("client", True)
+
+    await startup.bootstrap(app)
+    await idle()
+
+    startup.set_check("client", False)
+    await startup.shutdown()
+    await app.stop()
+
 def main():
     """Main function to start the bot and health check server."""
     try:
         # Start Flask in a separate thread for health checks
         flask_thread = Thread(target=run_flask, daemon=True)
         flask_thread.start()
-        logger.info(f"Health check server running on port {Config.PORT}")
+        logger.info("Health check server running on port %s", Config.PORT)
 
         # Start the Pyrogram bot
         logger.info("Starting Kannada Entertainment Bot...")
-        app.run()
+        app.run(run_bot())
         logger.info("Bot stopped.")
 
     except Exception as e:
-        logger.error(f"An error occurred while starting the bot: {e}", exc_info=True)
+        logger.error("An error occurred while starting the bot: %s", e, exc_info=True)
         sys.exit(1)
 
 if __name__ == "__main__":
@@ -0,0 +1,65 @@
+# migrate.py
+"""
+Content schema migrations from the command line.
+
+Rewrites existing content documents into the current schema version in
+streamed, resumable batches (see bot/parts/migrations.py):
+
+    python migrate.py --status
+    python migrate.py --dry-run           # measure the size change without writing
+    python migrate.py --batch-size 500
+
+Running it again after an interruption resumes after the last finished batch.
+Deploy the bot version that reads the new format before migrating.
+"""
+
+import sys
+import argparse
+import logging
+
+from config import Config
+
+logging.basicConfig(
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    level=logging.INFO,
+    handlers=[logging.StreamHandler(sys.stdout)]
+)
+logger = logging.getLogger(__name__)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Migrate the Kannada Entertainment catalog to the current schema.")
+    parser.add_argument("--status", action="store_true", help="Show migration progress and exit.")
+    parser.add_argument("--dry-run", action="store_true", help="Measure the rewrite without saving anything.")
+    parser.add_argument("--batch-size", type=int, default=Config.MIGRATION_BATCH_SIZE,
+                        help="Documents read and rewritten per batch.")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    from bot.parts.migrations import (
+        MIGRATIONS, schema_migrations, pending_migrations, run_migration, format_migration_report
+    )
+
+    if args.status:
+        for version in sorted(MIGRATIONS):
+            state = schema_migrations.find_one({"_id": version})
+            print(format_migration_report(state) if state else f"Migration {version} ({MIGRATIONS[version]['name']}): not started")
+        return
+
+    pending = pending_migrations()
+    if not pending:
+        print("The catalog is already at the current schema version.")
+        return
+
+    def print_progress(state):
+        logger.info("Migration %s: %s documents scanned, %s rewritten", state['_id'], state['scanned'], state['migrated'])
+
+    for version in pending:
+        state = run_migration(version, batch_size=args.batch_size, dry_run=args.dry_run, progress=print_progress)
+        print(format_migration_report(state) + ("\n  (dry run, nothing was written)" if args.dry_run else ""))
+
+
+if __name__ == "__main__":
+    main()
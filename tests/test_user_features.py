@@ -0,0 +1,38 @@
+# tests/test_user_features.py
+
+import pytest
+
+pytest.importorskip("pyrogram")
+pytest.importorskip("pymongo")
+pytest.importorskip("dotenv")
+
+from bot.parts.user_features import render_content_details
+
+
+def callback_buttons(rendered: dict) -> list:
+    return [button.callback_data for row in rendered["keyboard"].inline_keyboard for button in row if button.callback_data]
+
+
+def test_series_with_files_offers_season_packs():
+    content_id = "65a000000000000000000001"
+    series = {
+        "name": "Sample Series",
+        "year": 2024,
+        "media_files": [
+            {"msg_id": "a", "quality": 2, "size_bytes": 500 * 1024 ** 2, "season": 1, "episode": 1},
+            {"msg_id": "b", "quality": 2, "size_bytes": 500 * 1024 ** 2, "season": 1, "episode": 2},
+        ],
+        "seasons_data": {"1": {"episodes": {"1": {"files": ["a"]}, "2": {"files": ["b"]}}}},
+    }
+
+    rendered = render_content_details(series, content_id, "series")
+
+    assert f"view_seasons_series_{content_id}" in callback_buttons(rendered)
+
+
+def test_movie_has_no_season_button():
+    movie = {"name": "Sample Movie", "media_files": [{"msg_id": "a", "quality": 2, "size_bytes": 1024 ** 3}]}
+
+    rendered = render_content_details(movie, "65a000000000000000000002", "movies")
+
+    assert not any(data.startswith("view_seasons_") for data in callback_buttons(rendered))
@@ -0,0 +1,82 @@
+# worker.py
+"""
+Background job worker.
+
+Runs jobs from the MongoDB job queue (bot/parts/job_queue.py) in a process
+separate from the interactive bot, so slow work like database persistence,
+blog publishing and file deliveries doesn't compete with user callbacks.
+Start as many worker processes as needed, on one or several instances:
+
+    python worker.py
+    python worker.py --kinds deliver_media --concurrency 8
+"""
+
+import sys
+import asyncio
+import argparse
+import logging
+from pyrogram import Client, idle
+
+from config import Config
+
+from bot.logging_pipeline import setup_logging
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run background job workers for the Kannada Entertainment Bot.")
+    parser.add_argument("--kinds", default="", help="Comma-separated job kinds to run (default: all).")
+    parser.add_argument("--concurrency", type=int, default=Config.WORKER_CONCURRENCY,
+                        help="Number of jobs this process runs at the same time.")
+    return parser.parse_args()
+
+
+async def run_workers(kinds, concurrency: int):
+    """Starts a bot client for API calls and runs the job loops until stopped."""
+    # Importing the handlers registers every @job_handler
+    from bot import handlers
+    from bot.parts.job_queue import ensure_job_indexes, worker_loop, make_worker_id
+
+    # Each worker process gets its own in-memory session so several can run side by side
+    client = Client(
+        "kannada_worker",
+        api_id=Config.API_ID,
+        api_hash=Config.API_HASH,
+        bot_token=Config.BOT_TOKEN,
+        in_memory=True,
+        no_updates=True
+    )
+    await client.start()
+    await asyncio.to_thread(ensure_job_indexes)
+
+    worker_id = make_worker_id()
+    loops = [
+        asyncio.create_task(worker_loop(client, f"{worker_id}#{n}", kinds))
+        for n in range(concurrency)
+    ]
+    logger.info("Worker %s running %s job loop(s) for kinds: %s", worker_id, concurrency, kinds or 'all')
+
+    await idle()
+    for task in loops:
+        task.cancel()
+    await client.stop()
+
+
+def main():
+    if not all([Config.API_ID, Config.API_HASH, Config.BOT_TOKEN]):
+        logger.error("FATAL: Missing required environment variables: API_ID, API_HASH, BOT_TOKEN")
+        sys.exit(1)
+
+    args = parse_args()
+    kinds = [k.strip() for k in args.kinds.split(",") if k.strip()] or None
+    try:
+        asyncio.run(run_workers(kinds, max(1, args.concurrency)))
+    except KeyboardInterrupt:
+        pass
+    logger.info("Worker stopped.")
+
+
+if __name__ == "__main__":
+    main()